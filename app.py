@@ -1,993 +1,251 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from flask import Flask, jsonify
+from flask.cli import with_appcontext
 import os
+import sqlite3
 from dotenv import load_dotenv
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import io
 import json
+from functools import partial
+import click
 import time
-from werkzeug.utils import secure_filename
 
-load_dotenv()
-
-app = Flask(__name__)
-
-# Настройка SECRET_KEY
-secret_key = os.getenv('SECRET_KEY')
-if not secret_key:
-    # Генерируем SECRET_KEY если его нет
-    import secrets
-    secret_key = secrets.token_hex(32)
-    print(f"Generated SECRET_KEY: {secret_key[:16]}...")
-app.config['SECRET_KEY'] = secret_key
-
-# Настройка базы данных
-database_url = os.getenv('DATABASE_URL')
-print(f"Database URL from env: {database_url}")
-
-# Для Railway PostgreSQL
-if database_url and database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
-
-if database_url and (database_url.startswith('sqlite://') or database_url.startswith('postgresql://') or database_url.startswith('mysql://')):
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///fleet.db'
-
-print(f"Final Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Настройки для загрузки файлов
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB максимум
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-db = SQLAlchemy(app)
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-
-# Флаг для отслеживания инициализации БД
-db_initialized = False
-# Модели данных
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
-    role = db.Column(db.String(20), default='user')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class Vehicle(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    brand = db.Column(db.String(50), nullable=False)  # Марка
-    model = db.Column(db.String(50), nullable=False)  # Модель
-    year = db.Column(db.Integer, nullable=False)  # Год
-    engine_volume = db.Column(db.Float)  # Объем двигателя
-    vin_code = db.Column(db.String(17), unique=True, nullable=False)  # VIN код
-    license_plate = db.Column(db.String(20), unique=True, nullable=False)  # Госномер
-    call_sign = db.Column(db.String(20), unique=True, nullable=False)  # Позывной
-    mileage = db.Column(db.Integer, default=0)  # Пробег
-    last_to_date = db.Column(db.Date)  # Дата последнего ТО (из журнала событий)
-    breakdown_history = db.Column(db.Text)  # История поломок (из журнала событий)
-    cost = db.Column(db.Float, default=0)  # Стоимость
-    payback_weeks = db.Column(db.Integer)  # Недель до окупаемости
-    payment_history = db.Column(db.Text)  # История платежей (из журнала событий)
-    status = db.Column(db.String(20), default='active')
-    photo_filename = db.Column(db.String(255))  # Имя файла фото
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class CashFlow(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False)  # Дата
-    income = db.Column(db.Float, default=0)  # Надходження
-    expenses = db.Column(db.Float, default=0)  # Видатки
-    balance = db.Column(db.Float, default=0)  # Сальдо
-    credit_load = db.Column(db.Float, default=0)  # Кредитне навантаження
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class Contractor(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    contractor_type = db.Column(db.String(50), nullable=False)  # Тип контрагента
-    subtype = db.Column(db.String(100))  # Підтип
-    name = db.Column(db.String(200), nullable=False)  # Найменування
-    phone = db.Column(db.String(20))  # Телефон
-    location = db.Column(db.String(200))  # Геолокація
-    notes = db.Column(db.Text)  # Примітки
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class EventJournal(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Дата события
-    event_type = db.Column(db.String(50), nullable=False)  # ТИП события
-    subtype = db.Column(db.String(100), nullable=False)  # ПІДТИП события
-    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))  # ОБ'ЄКТ (ТС)
-    contractor_id = db.Column(db.Integer, db.ForeignKey('contractor.id'))  # Контрагент
-    amount = db.Column(db.Float, default=0)  # Сумма
-    description = db.Column(db.Text)  # Описание события
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    vehicle = db.relationship('Vehicle', backref='events')
-    contractor = db.relationship('Contractor', backref='events')
-    user = db.relationship('User', backref='events')
-
-class Notification(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    type = db.Column(db.String(50), nullable=False)  # 'insurance' или 'rental_payment'
-    title = db.Column(db.String(200), nullable=False)
-    message = db.Column(db.Text, nullable=False)
-    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
-    contractor_id = db.Column(db.Integer, db.ForeignKey('contractor.id'))
-    due_date = db.Column(db.Date, nullable=False)  # Дата, когда должно произойти событие
-    amount = db.Column(db.Float, default=0)  # Сумма для платежа
-    is_read = db.Column(db.Boolean, default=False)
-    is_processed = db.Column(db.Boolean, default=False)  # Обработано ли уведомление
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    vehicle = db.relationship('Vehicle', backref='notifications')
-    contractor = db.relationship('Contractor', backref='notifications')
+from models import db
+from services import (
+    login_manager, init_database, inject_unread_notifications, check_and_create_notifications,
+    import_events, import_vehicles, read_import_rows, reconcile_cashflow, format_cashflow_difference,
+    IMPORT_BATCH_SIZE, RECONCILE_CHUNK_SIZE,
+)
+from instrumentation import (
+    setup_sql_log, before_sql_execute, after_sql_execute, start_sql_timing, report_sql_timing,
+    start_request_metrics, record_request_metrics, remember_response_status, update_pool_metrics,
+)
 
-# Автоматическая инициализация базы данных
-def init_database():
-    with app.app_context():
-        try:
-            print("🗄️ Создаем таблицы базы данных...")
-            db.create_all()
-            print("✅ Таблицы созданы успешно")
-            
-            # Создаем администратора по умолчанию
-            print("👤 Проверяем администратора...")
-            admin = User.query.filter_by(username='admin').first()
-            if not admin:
-                admin = User(
-                    username='admin',
-                    email='admin@fleet.com',
-                    password_hash=generate_password_hash('admin123'),
-                    role='admin'
-                )
-                db.session.add(admin)
-                db.session.commit()
-                print("✅ Администратор создан: admin/admin123")
-            else:
-                print("ℹ️ Администратор уже существует")
-                
-            print("🎉 База данных инициализирована успешно!")
-            
-        except Exception as e:
-            print(f"❌ Ошибка инициализации БД: {e}")
-            db.session.rollback()
-            # Не прерываем работу приложения при ошибке БД
-
-# Инициализируем БД при запуске (только если это не Railway)
-if not os.getenv('RAILWAY_ENVIRONMENT'):
-    init_database()
-    db_initialized = True
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-@app.context_processor
-def inject_unread_notifications():
-    """Добавляет количество непрочитанных уведомлений во все шаблоны"""
-    if current_user.is_authenticated:
-        unread_count = Notification.query.filter_by(is_read=False).count()
-        return {
-            'unread_notifications': unread_count,
-            'timedelta': timedelta,
-            'now': datetime.now()
-        }
-    return {
-        'unread_notifications': 0,
-        'timedelta': timedelta,
-        'now': datetime.now()
-    }
-
-# Константы для типов событий
-EVENT_TYPES = [
-    'інвестиції', 'видатки', 'надходження', 'державні'
-]
-
-EVENT_SUBTYPES = {
-    'інвестиції': ['ЛІЗИНГ', 'ПОКУПКА', 'ГОТІВКА', 'ОБЛАДНАННЯ', 'КРЕДИТ'],
-    'видатки': ['ПОСТАНОВКА НА ТО', 'ПОЛОМКА', 'ПЛАНОВИЙ РЕМОНТ', 'ПОЗАПЛАНОВИЙ РЕМОНТ', 'ЗАРПЛАТА', 'ЛОГІСТИКА', 'ДТП'],
-    'надходження': ['ОРЕНДА', 'ЗАВДАТОК', 'КОМПЕНСАЦІЯ', 'ПРОДАЖ ЗА РОЗТЕРМІНУВАННЯМ', 'ПРОДАЖ'],
-    'державні': ['ДОКУМЕНТИ', 'ШТРАФ', 'СТАХУВАННЯ', 'ПОДАТКИ']
-}
+load_dotenv()
 
-def update_cashflow_from_event(event_date, event_type, event_subtype, amount, operation='add'):
+def default_report_workers():
     """
-    Автоматически обновляет денежный поток при добавлении или удалении события
-    operation: 'add' для добавления, 'remove' для удаления
+    Процессов отчетов на один воркер gunicorn: у каждого воркера свой пул,
+    поэтому CPU делятся между WEB_CONCURRENCY воркерами, и не больше 2 на воркер
     """
-    # Получаем дату события
-    event_date_only = event_date.date() if hasattr(event_date, 'date') else event_date
-    
-    # Ищем существующую запись денежного потока на эту дату
-    cashflow_entry = CashFlow.query.filter_by(date=event_date_only).first()
-    
-    # Определяем множитель: +1 для добавления, -1 для удаления
-    multiplier = 1 if operation == 'add' else -1
-    adjusted_amount = amount * multiplier
-    
-    if cashflow_entry:
-        # Обновляем существующую запись
-        if event_type in ['надходження']:
-            cashflow_entry.income += adjusted_amount
-        elif event_type in ['видатки', 'державні']:
-            cashflow_entry.expenses += adjusted_amount
-        elif event_type in ['інвестиції']:
-            # Проверяем подтип события для правильной классификации
-            if event_subtype == 'КРЕДИТ':
-                # Кредиты идут в кредитное нагружение
-                cashflow_entry.credit_load += adjusted_amount
-            else:
-                # Остальные инвестиции идут в расходы
-                cashflow_entry.expenses += adjusted_amount
-        elif event_type in ['видатки', 'державні']:
-            # Расходы и государственные платежи идут в расходы
-            cashflow_entry.expenses += adjusted_amount
-        elif event_type in ['надходження']:
-            # Доходы идут в доходы
-            cashflow_entry.income += adjusted_amount
-        
-        # Пересчитываем баланс
-        cashflow_entry.balance = cashflow_entry.income - cashflow_entry.expenses - cashflow_entry.credit_load
-        
-        # Если все суммы стали 0, удаляем запись
-        if cashflow_entry.income == 0 and cashflow_entry.expenses == 0 and cashflow_entry.credit_load == 0:
-            db.session.delete(cashflow_entry)
+    web_workers = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+    return max(1, min(2, (os.cpu_count() or 1) // web_workers))
+
+def configure_app(app):
+    """Настройки приложения из переменных окружения"""
+    # Настройка SECRET_KEY
+    secret_key = os.getenv('SECRET_KEY')
+    if not secret_key:
+        # Генерируем SECRET_KEY если его нет
+        import secrets
+        secret_key = secrets.token_hex(32)
+        print(f"Generated SECRET_KEY: {secret_key[:16]}...")
+    app.config['SECRET_KEY'] = secret_key
+
+    # Настройка базы данных
+    database_url = os.getenv('DATABASE_URL')
+    print(f"Database URL from env: {database_url}")
+
+    # Для Railway PostgreSQL
+    if database_url and database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+
+    if database_url and (database_url.startswith('sqlite://') or database_url.startswith('postgresql://') or database_url.startswith('mysql://')):
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     else:
-        if operation == 'add':
-            # Создаем новую запись только при добавлении
-            income = amount if event_type in ['надходження'] else 0
-            expenses = amount if event_type in ['видатки', 'державні'] else 0
-            credit_load = amount if event_type in ['інвестиції'] and event_subtype == 'КРЕДИТ' else 0
-            investment_expenses = amount if event_type in ['інвестиції'] and event_subtype != 'КРЕДИТ' else 0
-            
-            cashflow_entry = CashFlow(
-                date=event_date_only,
-                income=income,
-                expenses=expenses + investment_expenses,
-                credit_load=credit_load,
-                balance=income - expenses - investment_expenses - credit_load
-            )
-            db.session.add(cashflow_entry)
-    
-    db.session.commit()
-    return cashflow_entry
-
-CONTRACTOR_TYPES = [
-    'Постачальник', 'СТО', 'Орендар', 'Продавець', 'Лізингодавець', 
-    'Банк', 'Покупець', 'Послуги', 'Державні установи'
-]
-
-def create_rental_payment_notification(vehicle, contractor, amount, last_payment_date):
-    """Создает уведомление о следующем арендном платеже"""
-    # Следующий платеж через неделю после последнего
-    next_payment_date = last_payment_date + timedelta(days=7)
-    
-    # Проверяем, что дата уведомления не в прошлом
-    today = datetime.now().date()
-    if next_payment_date >= today:
-        notification = Notification(
-            type='rental_payment',
-            title=f'Нагадування про орендний платіж',
-            message=f'Сьогодні має бути черговий платіж за оренду {vehicle.brand} {vehicle.model} ({vehicle.license_plate}) від {contractor.name}. Сума: {amount:,.2f} ₴',
-            vehicle_id=vehicle.id,
-            contractor_id=contractor.id,
-            due_date=next_payment_date,
-            amount=amount
-        )
-        db.session.add(notification)
-        db.session.commit()
-
-def create_insurance_notification(vehicle, insurance_date):
-    """Создает уведомление о страховке за 7 дней до окончания"""
-    # Уведомление за 7 дней до окончания страховки
-    reminder_date = insurance_date - timedelta(days=7)
-    
-    notification = Notification(
-        type='insurance',
-        title=f'Нагадування про страховку',
-        message=f'Страховка для {vehicle.brand} {vehicle.model} ({vehicle.license_plate}) закінчується через 7 днів ({insurance_date.strftime("%d.%m.%Y")})',
-        vehicle_id=vehicle.id,
-        due_date=reminder_date,
-        amount=0
-    )
-    db.session.add(notification)
-    db.session.commit()
-
-def check_and_create_notifications():
-    """Проверяет и создает уведомления"""
-    today = datetime.now().date()
-    
-    # Проверяем арендные платежи
-    rental_events = EventJournal.query.filter_by(
-        event_type='надходження',
-        subtype='ОРЕНДА'
-    ).all()
-    
-    for event in rental_events:
-        if event.vehicle and event.contractor:
-            # Вычисляем дату следующего платежа (через неделю после последнего)
-            last_payment_date = event.date.date()
-            next_payment_date = last_payment_date + timedelta(days=7)
-            
-            # Проверяем, есть ли уже уведомление на эту дату
-            existing_notification = Notification.query.filter_by(
-                type='rental_payment',
-                vehicle_id=event.vehicle.id,
-                contractor_id=event.contractor.id,
-                due_date=next_payment_date
-            ).first()
-            
-            if not existing_notification and next_payment_date >= today:
-                # Создаем уведомление о следующем платеже
-                create_rental_payment_notification(
-                    event.vehicle, 
-                    event.contractor, 
-                    event.amount, 
-                    last_payment_date
-                )
-    
-    # Проверяем страховки (здесь нужно будет добавить логику для отслеживания дат страховки)
-    # Пока создаем тестовые уведомления
-
-# Маршруты
-@app.route('/')
-def index():
-    global db_initialized
-    
-    # Автоматическая инициализация БД при первом запросе
-    if not db_initialized:
-        try:
-            init_database()
-            db_initialized = True
-            print("✅ База данных инициализирована при первом запросе")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации БД: {e}")
-    
-    try:
-        if current_user.is_authenticated:
-            return redirect(url_for('dashboard'))
-        return render_template('index.html')
-    except Exception as e:
-        print(f"Error in index route: {e}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/health')
-def health_check():
-    return jsonify({
-        'status': 'healthy', 
-        'timestamp': datetime.utcnow(),
-        'message': 'Application is running'
-    })
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///fleet.db'
+
+    print(f"Final Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Профиль движка БД. PostgreSQL: пул соединений с проверкой перед выдачей (pre-ping),
+    # пересозданием старых соединений и ограничением времени запроса
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql://'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+            'connect_args': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+                'options': f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))}",
+            },
+        }
 
-@app.route('/init-db')
-def init_db_route():
-    """Маршрут для инициализации базы данных"""
-    try:
-        init_database()
-        return jsonify({
-            'status': 'success',
-            'message': 'База данных инициализирована успешно'
-        })
-    except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': f'Ошибка инициализации: {str(e)}'
-        }), 500
+    # SQLite: PRAGMA для каждого нового соединения. WAL - читатели не блокируются писателем,
+    # synchronous=NORMAL - без fsync на каждый коммит (в режиме WAL это безопасно для целостности),
+    # busy_timeout - ждать блокировку вместо ошибки "database is locked". SQLITE_TUNING=0 отключает.
+    if os.getenv('SQLITE_TUNING', '1') != '0':
+        app.config['SQLITE_PRAGMAS'] = {
+            'journal_mode': 'WAL',
+            'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE_MB', 256)) * 1024 * 1024,
+            'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536)),
+        }
+    else:
+        app.config['SQLITE_PRAGMAS'] = {}
+
+    # Замер SQL по запросам (SQL_TIMING=1): число запросов, время в БД и самые медленные
+    # выражения - в заголовке Server-Timing и строке лога. Выражения дольше SLOW_QUERY_MS
+    # пишутся в журнал медленных запросов (SLOW_QUERY_LOG - файл, иначе stderr)
+    app.config['SQL_TIMING'] = os.getenv('SQL_TIMING', '0') == '1'
+    app.config['SQL_TIMING_TOP'] = int(os.getenv('SQL_TIMING_TOP', 3))
+    app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 100))
+    app.config['SLOW_REQUEST_QUERIES'] = int(os.getenv('SLOW_REQUEST_QUERIES', 50))
+    app.config['SLOW_QUERY_LOG'] = os.getenv('SLOW_QUERY_LOG')
+
+    # Настройки для загрузки файлов
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB максимум
+    # Настройки фоновой генерации отчетов
+    app.config['REPORTS_FOLDER'] = os.getenv('REPORTS_FOLDER', 'reports')
+    # Пулы процессов на воркер: долгие отчеты (события) и быстрые (ТС, денежный поток) - см. REPORT_QUEUES
+    app.config['REPORT_WORKERS'] = int(os.getenv('REPORT_WORKERS', default_report_workers()))
+    app.config['REPORT_SMALL_WORKERS'] = int(os.getenv('REPORT_SMALL_WORKERS', 1))
+    app.config['REPORT_JOB_TTL_HOURS'] = int(os.getenv('REPORT_JOB_TTL_HOURS', 24))
+    # Задача дольше этого в queued/running считается потерянной (воркер перезапустился вместе с пулом)
+    app.config['REPORT_JOB_TIMEOUT_MINUTES'] = int(os.getenv('REPORT_JOB_TIMEOUT_MINUTES', 60))
+    app.config['REPORT_CACHE_FOLDER'] = os.getenv('REPORT_CACHE_FOLDER', os.path.join(app.config['REPORTS_FOLDER'], 'cache'))
+    app.config['REPORT_CACHE_MAX_MB'] = int(os.getenv('REPORT_CACHE_MAX_MB', 200))
+
+    # Метрики Prometheus: токен для /metrics; без токена /metrics закрыт,
+    # если явно не разрешен открытый доступ (METRICS_PUBLIC=1, например за внутренней сетью)
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+    app.config['METRICS_PUBLIC'] = os.getenv('METRICS_PUBLIC', '0') == '1'
+    # Сколько секунд воркер держит значение счетчика в памяти
+    app.config['COUNTER_CACHE_TTL'] = float(os.getenv('COUNTER_CACHE_TTL', 5))
+    # Сколько секунд воркер держит пользователя в памяти
+    app.config['USER_CACHE_TTL'] = float(os.getenv('USER_CACHE_TTL', 60))
+
+
+def set_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Создает таблицы, индексы и администратора по умолчанию (шаг релиза)"""
+    started = time.perf_counter()
+    init_database()
+    print(f"⏱️ Инициализация заняла {time.perf_counter() - started:.2f} с")
+
+@click.command('import-vehicles')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_vehicles_command(path):
+    """Массово добавляет ТС из CSV или XLSX"""
+    started = time.perf_counter()
+    with open(path, 'rb') as file:
+        imported, errors = import_vehicles(read_import_rows(file, path))
+    for error in errors:
+        print(f"❌ {error}")
+    print(f"✅ Добавлено ТС: {imported}, строк с ошибками: {len(errors)} ({time.perf_counter() - started:.2f} с)")
+
+@click.command('import-events')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Событий в одном INSERT')
+def import_events_command(path, batch_size):
+    """Импортирует события журнала из CSV или XLSX"""
+    started = time.perf_counter()
+    with open(path, 'rb') as file:
+        imported, errors = import_events(read_import_rows(file, path), batch_size=batch_size)
+    for error in errors:
+        print(f"❌ {error}")
+    if errors:
+        print("ℹ️ Файл не импортирован, исправьте ошибки и повторите")
+    else:
+        print(f"✅ Импортировано событий: {imported} ({time.perf_counter() - started:.2f} с)")
+
+@click.command('reconcile-cashflow')
+@with_appcontext
+@click.option('--apply', 'apply_fix', is_flag=True, help='Исправить расхождения в БД')
+@click.option('--chunk-size', default=RECONCILE_CHUNK_SIZE, show_default=True, help='Строк за одно чтение')
+def reconcile_cashflow_command(apply_fix, chunk_size):
+    """Пересчитывает денежный поток из журнала событий и показывает расхождения"""
+    started = time.perf_counter()
+    summary, differences = reconcile_cashflow(apply=apply_fix, chunk_size=chunk_size)
+    for difference in differences:
+        print(json.dumps(format_cashflow_difference(*difference), ensure_ascii=False))
+    print(f"📊 Дней: {summary['days_checked']}, расхождений: {summary['mismatched']}, "
+          f"нет записи: {summary['missing']}, лишних записей: {summary['extra']} "
+          f"({time.perf_counter() - started:.2f} с)")
+    if summary['applied']:
+        print("✅ Денежный поток исправлен")
+    elif differences:
+        print("ℹ️ Для исправления запустите с --apply")
+
+@click.command('generate-notifications')
+@with_appcontext
+def generate_notifications_command():
+    """Создает уведомления по новым событиям журнала (для запуска по расписанию)"""
+    created = check_and_create_notifications()
+    print(f"✅ Создано уведомлений: {created}")
 
-@app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return jsonify({'error': 'Internal server error'}), 500
 
-@app.errorhandler(404)
 def not_found_error(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        try:
-            username = request.form['username']
-            password = request.form['password']
-            
-            # Проверяем, инициализирована ли БД
-            global db_initialized
-            if not db_initialized:
-                try:
-                    init_database()
-                    db_initialized = True
-                except Exception as e:
-                    print(f"Ошибка инициализации БД: {e}")
-                    flash('Помилка ініціалізації бази даних. Спробуйте пізніше.', 'error')
-                    return render_template('login.html')
-            
-            user = User.query.filter_by(username=username).first()
-            
-            if user and check_password_hash(user.password_hash, password):
-                login_user(user)
-                return redirect(url_for('dashboard'))
-            else:
-                flash('Невірне ім\'я користувача або пароль', 'error')
-        except Exception as e:
-            print(f"Ошибка при входе: {e}")
-            flash('Помилка підключення до бази даних. Спробуйте пізніше.', 'error')
-    
-    return render_template('login.html')
-
-@app.route('/logout')
-@login_required
-def logout():
-    logout_user()
-    return redirect(url_for('index'))
-
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    vehicles = Vehicle.query.all()
-    recent_events = EventJournal.query.order_by(EventJournal.date.desc()).limit(10).all()
-    
-    # Статистика
-    total_vehicles = len(vehicles)
-    active_vehicles = len([v for v in vehicles if v.status == 'active'])
-    
-    # Последние события
-    latest_events = EventJournal.query.join(Vehicle).order_by(EventJournal.date.desc()).limit(5).all()
-    
-    # Непрочитанные уведомления
-    unread_notifications = Notification.query.filter_by(is_read=False).count()
-    
-    return render_template('dashboard.html', 
-                         vehicles=vehicles,
-                         recent_events=recent_events,
-                         total_vehicles=total_vehicles,
-                         active_vehicles=active_vehicles,
-                         latest_events=latest_events,
-                         unread_notifications=unread_notifications)
-
-@app.route('/vehicles')
-@login_required
-def vehicles():
-    vehicles = Vehicle.query.all()
-    return render_template('vehicles.html', vehicles=vehicles)
-
-@app.route('/vehicles/add', methods=['GET', 'POST'])
-@login_required
-def add_vehicle():
-    if request.method == 'POST':
-        # Проверяем, не существует ли уже автомобиль с таким номером, позывным или VIN-кодом
-        print(f"DEBUG: Checking for license_plate: '{request.form['license_plate']}'")
-        print(f"DEBUG: Checking for call_sign: '{request.form['call_sign']}'")
-        print(f"DEBUG: Checking for vin_code: '{request.form['vin_code']}'")
-        
-        existing_license = Vehicle.query.filter_by(license_plate=request.form['license_plate']).first()
-        existing_call_sign = Vehicle.query.filter_by(call_sign=request.form['call_sign']).first()
-        existing_vin = Vehicle.query.filter_by(vin_code=request.form['vin_code']).first()
-        
-        print(f"DEBUG: existing_license: {existing_license}")
-        print(f"DEBUG: existing_call_sign: {existing_call_sign}")
-        print(f"DEBUG: existing_vin: {existing_vin}")
-        
-        if existing_license:
-            flash(f'Автомобіль з номером {request.form["license_plate"]} вже існує!', 'error')
-            return render_template('add_vehicle.html')
-        
-        if existing_call_sign:
-            flash(f'Автомобіль з позивним {request.form["call_sign"]} вже існує!', 'error')
-            return render_template('add_vehicle.html')
-        
-        if existing_vin:
-            flash(f'Автомобіль з VIN-кодом {request.form["vin_code"]} вже існує!', 'error')
-            return render_template('add_vehicle.html')
-        
-        try:
-            print(f"DEBUG: Creating vehicle with VIN: '{request.form['vin_code']}'")
-            vehicle = Vehicle(
-                brand=request.form['brand'],
-                model=request.form['model'],
-                year=int(request.form['year']),
-                engine_volume=float(request.form['engine_volume']) if request.form['engine_volume'] else None,
-                vin_code=request.form['vin_code'],
-                license_plate=request.form['license_plate'],
-                call_sign=request.form['call_sign'],
-                mileage=int(request.form['mileage']) if request.form['mileage'] else 0,
-                cost=float(request.form['cost']) if request.form['cost'] else 0
-            )
-            print(f"DEBUG: Vehicle object created, adding to session...")
-            db.session.add(vehicle)
-            db.session.flush()  # Получаем ID автомобиля
-            
-            # Обрабатываем загруженное фото
-            if 'photo' in request.files and request.files['photo'].filename:
-                photo = request.files['photo']
-                if photo and allowed_file(photo.filename):
-                    # Генерируем уникальное имя файла
-                    filename = secure_filename(f"vehicle_{vehicle.id}_{int(time.time())}_{photo.filename}")
-                    photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    
-                    # Создаем папку если её нет
-                    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-                    
-                    # Сохраняем файл
-                    photo.save(photo_path)
-                    vehicle.photo_filename = filename
-            
-            print(f"DEBUG: Committing to database...")
-            db.session.commit()
-            print(f"DEBUG: Successfully committed!")
-            flash('Транспортний засіб додано', 'success')
-            return redirect(url_for('vehicles'))
-        except Exception as e:
-            print(f"DEBUG: Exception occurred: {type(e).__name__}: {str(e)}")
-            db.session.rollback()
-            flash(f'Помилка при додаванні автомобіля: {str(e)}', 'error')
-            return render_template('add_vehicle.html')
-    
-    return render_template('add_vehicle.html')
-
-@app.route('/vehicles/photo/<int:vehicle_id>')
-@login_required
-def vehicle_photo(vehicle_id):
-    """Отдает фото автомобиля"""
-    vehicle = Vehicle.query.get_or_404(vehicle_id)
-    if vehicle.photo_filename:
-        photo_path = os.path.join(app.config['UPLOAD_FOLDER'], vehicle.photo_filename)
-        if os.path.exists(photo_path):
-            return send_file(photo_path)
-    return '', 404
-
-@app.route('/events')
-@login_required
-def events():
-    events = EventJournal.query.join(Vehicle).join(Contractor, isouter=True).order_by(EventJournal.date.desc()).all()
-    return render_template('events.html', events=events)
-
-@app.route('/events/add', methods=['GET', 'POST'])
-@login_required
-def add_event():
-    if request.method == 'POST':
-        # Гибкий парсинг даты - поддерживает как YYYY-MM-DD, так и YYYY-MM-DDTHH:MM
-        date_str = request.form['date']
-        print(f"DEBUG: Received date string: '{date_str}'")
-        try:
-            if 'T' in date_str:
-                event_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
-            else:
-                event_date = datetime.strptime(date_str, '%Y-%m-%d')
-        except ValueError:
-            # Если не удалось распарсить, используем текущую дату
-            event_date = datetime.now()
-            
-        amount = float(request.form['amount']) if request.form['amount'] else 0
-        
-        event = EventJournal(
-            date=event_date,
-            event_type=request.form['event_type'],
-            subtype=request.form['subtype'],
-            vehicle_id=int(request.form['vehicle_id']) if request.form['vehicle_id'] else None,
-            contractor_id=int(request.form['contractor_id']) if request.form['contractor_id'] else None,
-            amount=amount,
-            description=request.form['description'],
-            created_by=current_user.id
-        )
-        db.session.add(event)
-        db.session.commit()
-        
-        # Автоматически обновляем денежный поток
-        if amount > 0:
-            try:
-                update_cashflow_from_event(event_date, request.form['event_type'], request.form['subtype'], amount)
-                
-                # Если это арендный платеж, создаем уведомление о следующем платеже
-                if request.form['event_type'] == 'надходження' and request.form['subtype'] == 'ОРЕНДА':
-                    vehicle = Vehicle.query.get(int(request.form['vehicle_id'])) if request.form['vehicle_id'] else None
-                    contractor = Contractor.query.get(int(request.form['contractor_id'])) if request.form['contractor_id'] else None
-                    
-                    if vehicle and contractor:
-                        # Проверяем, есть ли уже уведомление на следующую неделю
-                        next_payment_date = event_date.date() + timedelta(days=7)
-                        existing_notification = Notification.query.filter_by(
-                            type='rental_payment',
-                            vehicle_id=vehicle.id,
-                            contractor_id=contractor.id,
-                            due_date=next_payment_date
-                        ).first()
-                        
-                        if not existing_notification:
-                            create_rental_payment_notification(
-                                vehicle, 
-                                contractor, 
-                                amount, 
-                                event_date.date()
-                            )
-                
-                flash('Подію додано та оновлено грошовий потік', 'success')
-            except Exception as e:
-                flash(f'Подію додано, але помилка при оновленні грошового потоку: {str(e)}', 'warning')
-        else:
-            flash('Подію додано', 'success')
-            
-        return redirect(url_for('events'))
-    
-    vehicles = Vehicle.query.all()
-    contractors = Contractor.query.all()
-    return render_template('add_event.html', 
-                         vehicles=vehicles, 
-                         contractors=contractors,
-                         event_types=EVENT_TYPES,
-                         event_subtypes=EVENT_SUBTYPES)
-
-@app.route('/events/delete/<int:event_id>', methods=['POST'])
-@login_required
-def delete_event(event_id):
-    event = EventJournal.query.get_or_404(event_id)
-    
-    try:
-        # Корректируем денежный поток при удалении события
-        if event.amount > 0:
-            update_cashflow_from_event(event.date, event.event_type, event.subtype, event.amount, 'remove')
-        
-        # Удаляем событие
-        db.session.delete(event)
-        db.session.commit()
-        flash('Подію видалено та оновлено грошовий потік', 'success')
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Помилка при видаленні події: {str(e)}', 'error')
-    
-    return redirect(url_for('events'))
-
-@app.route('/events/by_contractor/<int:contractor_id>')
-@login_required
-def events_by_contractor(contractor_id):
-    contractor = Contractor.query.get_or_404(contractor_id)
-    events = EventJournal.query.filter_by(contractor_id=contractor_id).order_by(EventJournal.date.desc()).all()
-    return render_template('events_by_contractor.html', events=events, contractor=contractor)
-
-@app.route('/events/by_vehicle/<int:vehicle_id>')
-@login_required
-def events_by_vehicle(vehicle_id):
-    vehicle = Vehicle.query.get_or_404(vehicle_id)
-    events = EventJournal.query.filter_by(vehicle_id=vehicle_id).order_by(EventJournal.date.desc()).all()
-    return render_template('events_by_vehicle.html', events=events, vehicle=vehicle)
-
-@app.route('/contractors')
-@login_required
-def contractors():
-    contractors = Contractor.query.all()
-    return render_template('contractors.html', contractors=contractors)
-
-@app.route('/contractors/add', methods=['GET', 'POST'])
-@login_required
-def add_contractor():
-    if request.method == 'POST':
-        contractor = Contractor(
-            contractor_type=request.form['contractor_type'],
-            subtype=request.form['subtype'],
-            name=request.form['name'],
-            phone=request.form['phone'],
-            location=request.form['location'],
-            notes=request.form['notes']
-        )
-        db.session.add(contractor)
-        db.session.commit()
-        flash('Контрагента додано', 'success')
-        return redirect(url_for('contractors'))
-    
-    return render_template('add_contractor.html', contractor_types=CONTRACTOR_TYPES)
-
-@app.route('/cashflow')
-@login_required
-def cashflow():
-    cashflow_entries = CashFlow.query.order_by(CashFlow.date.desc()).all()
-    return render_template('cashflow.html', cashflow_entries=cashflow_entries)
-
-@app.route('/cashflow/add', methods=['GET', 'POST'])
-@login_required
-def add_cashflow():
-    if request.method == 'POST':
-        # Проверяем, существует ли уже запись на эту дату
-        entry_date = datetime.strptime(request.form['date'], '%Y-%m-%d').date()
-        existing_entry = CashFlow.query.filter_by(date=entry_date).first()
-        
-        if existing_entry:
-            # Обновляем существующую запись
-            existing_entry.income += float(request.form['income']) if request.form['income'] else 0
-            existing_entry.expenses += float(request.form['expenses']) if request.form['expenses'] else 0
-            existing_entry.credit_load += float(request.form['credit_load']) if request.form['credit_load'] else 0
-            existing_entry.balance = existing_entry.income - existing_entry.expenses - existing_entry.credit_load
-            flash('Запис оновлено', 'success')
-        else:
-            # Создаем новую запись
-            cashflow = CashFlow(
-                date=entry_date,
-                income=float(request.form['income']) if request.form['income'] else 0,
-                expenses=float(request.form['expenses']) if request.form['expenses'] else 0,
-                credit_load=float(request.form['credit_load']) if request.form['credit_load'] else 0
-            )
-            # Автоматический расчет сальдо
-            cashflow.balance = cashflow.income - cashflow.expenses - cashflow.credit_load
-            db.session.add(cashflow)
-            flash('Запис додано', 'success')
-        
-        db.session.commit()
-        return redirect(url_for('cashflow'))
-    
-    return render_template('add_cashflow.html')
-
-@app.route('/notifications')
-@login_required
-def notifications():
-    """Страница входящих уведомлений"""
-    # Проверяем и создаем новые уведомления
-    check_and_create_notifications()
-    
-    # Получаем все уведомления, отсортированные: непроведенные вверху, проведенные внизу
-    notifications_list = Notification.query.order_by(
-        Notification.is_processed.asc(),  # Сначала непроведенные (False)
-        Notification.created_at.desc()    # Затем по дате создания
-    ).all()
-    
-    return render_template('notifications.html', notifications=notifications_list)
-
-@app.route('/notifications/mark_read/<int:notification_id>', methods=['POST'])
-@login_required
-def mark_notification_read(notification_id):
-    """Отмечает уведомление как прочитанное"""
-    notification = Notification.query.get_or_404(notification_id)
-    notification.is_read = True
-    db.session.commit()
-    return redirect(url_for('notifications'))
-
-@app.route('/notifications/process_payment/<int:notification_id>', methods=['POST'])
-@login_required
-def process_payment_notification(notification_id):
-    """Обрабатывает уведомление о платеже - создает событие и обновляет кешфлоу"""
-    notification = Notification.query.get_or_404(notification_id)
-    
-    if notification.type == 'rental_payment' and notification.vehicle and notification.contractor:
-        # Создаем событие о получении арендного платежа
-        event = EventJournal(
-            date=datetime.now(),
-            event_type='надходження',
-            subtype='ОРЕНДА',
-            vehicle_id=notification.vehicle.id,
-            contractor_id=notification.contractor.id,
-            amount=notification.amount,
-            description=f'Орендний платіж від {notification.contractor.name}',
-            created_by=current_user.id
-        )
-        db.session.add(event)
-        
-        # Обновляем денежный поток
-        update_cashflow_from_event(
-            event.date, 
-            event.event_type, 
-            event.subtype, 
-            event.amount
-        )
-        
-        # Создаем уведомление о следующем платеже только если его еще нет
-        next_payment_date = datetime.now().date() + timedelta(days=7)
-        existing_next_notification = Notification.query.filter_by(
-            type='rental_payment',
-            vehicle_id=notification.vehicle.id,
-            contractor_id=notification.contractor.id,
-            due_date=next_payment_date
-        ).first()
-        
-        if not existing_next_notification:
-            create_rental_payment_notification(
-                notification.vehicle,
-                notification.contractor,
-                notification.amount,
-                datetime.now().date()
-            )
-        
-        # Отмечаем текущее уведомление как обработанное
-        notification.is_processed = True
-        notification.is_read = True
-        
-        db.session.commit()
-        flash('Платіж проведено успішно!', 'success')
-    
-    return redirect(url_for('notifications'))
-
-@app.route('/documents')
-@login_required
-def documents():
-    return render_template('documents.html')
-
-@app.route('/generate_report/<report_type>')
-@login_required
-def generate_report(report_type):
-    if report_type == 'vehicles':
-        vehicles = Vehicle.query.all()
-        return generate_vehicles_report(vehicles)
-    elif report_type == 'events':
-        events = EventJournal.query.join(Vehicle).join(Contractor, isouter=True).all()
-        return generate_events_report(events)
-    elif report_type == 'cashflow':
-        cashflow_entries = CashFlow.query.all()
-        return generate_cashflow_report(cashflow_entries)
-    
-    return redirect(url_for('documents'))
-
-def generate_vehicles_report(vehicles):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    story = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
-    )
-    
-    story.append(Paragraph("Отчет по транспортным средствам", title_style))
-    story.append(Spacer(1, 12))
-    
-    data = [['Позывной', 'Марка', 'Модель', 'Год', 'Гос. номер', 'Пробег', 'Стоимость', 'Статус']]
-    for vehicle in vehicles:
-        data.append([
-            vehicle.call_sign,
-            vehicle.brand,
-            vehicle.model,
-            str(vehicle.year),
-            vehicle.license_plate,
-            f"{vehicle.mileage:,} км",
-            f"{vehicle.cost:,.2f} ₴",
-            vehicle.status
-        ])
-    
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    story.append(table)
-    doc.build(story)
-    
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name='vehicles_report.pdf')
+def create_app(config=None):
+    """
+    Собирает приложение: настройки из окружения (config их дополняет или заменяет),
+    движок БД, вход, метрики, команды flask и разделы с маршрутами
+    """
+    app = Flask(__name__)
+    configure_app(app)
+    if config:
+        app.config.update(config)
 
-def generate_events_report(events):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    story = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
-    )
-    
-    story.append(Paragraph("Отчет по событиям", title_style))
-    story.append(Spacer(1, 12))
-    
-    data = [['Дата', 'Тип', 'Подтип', 'ТС', 'Контрагент', 'Сумма', 'Описание']]
-    for event in events:
-        data.append([
-            event.date.strftime('%d.%m.%Y'),
-            event.event_type,
-            event.subtype,
-            event.vehicle.call_sign if event.vehicle else '-',
-            event.contractor.name if event.contractor else '-',
-            f"{event.amount:,.2f} ₴",
-            event.description[:50] + '...' if event.description and len(event.description) > 50 else event.description or '-'
-        ])
-    
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    story.append(table)
-    doc.build(story)
-    
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name='events_report.pdf')
+    db.init_app(app)
+    login_manager.init_app(app)
 
-def generate_cashflow_report(cashflow_entries):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    story = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
-    )
-    
-    story.append(Paragraph("Отчет по денежным потокам", title_style))
-    story.append(Spacer(1, 12))
-    
-    data = [['Дата', 'Надходження', 'Видатки', 'Кредитне навантаження', 'Сальдо']]
-    for entry in cashflow_entries:
-        data.append([
-            entry.date.strftime('%d.%m.%Y'),
-             f"{entry.income:,.2f} ₴",
-             f"{entry.expenses:,.2f} ₴",
-             f"{entry.credit_load:,.2f} ₴",
-             f"{entry.balance:,.2f} ₴"
-         ])
-    
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    story.append(table)
-    doc.build(story)
-    
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name='cashflow_report.pdf')
+    # Движок БД этого приложения: PRAGMA SQLite, метрики пула и замер SQL
+    with app.app_context():
+        engine = db.engine
+    db.event.listen(engine, 'connect', partial(set_sqlite_pragmas, app.config['SQLITE_PRAGMAS']))
+    db.event.listen(engine, 'checkout', partial(update_pool_metrics, engine))
+    db.event.listen(engine, 'checkin', partial(update_pool_metrics, engine))
+    if app.config['SQL_TIMING']:
+        setup_sql_log(app.config['SLOW_QUERY_LOG'])
+        db.event.listen(engine, 'before_cursor_execute', before_sql_execute)
+        db.event.listen(engine, 'after_cursor_execute', partial(after_sql_execute, app.config))
+        app.before_request(start_sql_timing)
+        app.after_request(report_sql_timing)
+
+    app.before_request(start_request_metrics)
+    app.teardown_request(record_request_metrics)
+    app.after_request(remember_response_status)
+    app.context_processor(inject_unread_notifications)
+    app.register_error_handler(500, internal_error)
+    app.register_error_handler(404, not_found_error)
+
+    for command in (init_db_command, import_vehicles_command, import_events_command,
+                    reconcile_cashflow_command, generate_notifications_command):
+        app.cli.add_command(command)
+
+    # Разделы импортируются здесь, при сборке приложения, а не при импорте модуля
+    from views.main import main_bp
+    from views.vehicles import vehicles_bp, vehicle_photo_url
+    from views.events import events_bp
+    from views.cashflow import cashflow_bp
+    from views.notifications import notifications_bp
+    from views.reports import reports_bp
+    for blueprint in (main_bp, vehicles_bp, events_bp, cashflow_bp, notifications_bp, reports_bp):
+        app.register_blueprint(blueprint)
+    app.jinja_env.globals['vehicle_photo_url'] = vehicle_photo_url
+    return app
 
 if __name__ == '__main__':
-    # Для локальной разработки
+    # Для локальной разработки: схема создается здесь, в продакшене - `flask init-db`
+    app = create_app()
+    init_database(app)
     app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
-
-# Инициализация базы данных только при запуске
-def init_db():
-    with app.app_context():
-        try:
-            db.create_all()
-            
-            # Создаем администратора по умолчанию
-            admin = User.query.filter_by(username='admin').first()
-            if not admin:
-                admin = User(
-                    username='admin',
-                    email='admin@fleet.com',
-                    password_hash=generate_password_hash('admin123'),
-                    role='admin'
-                )
-                db.session.add(admin)
-                db.session.commit()
-                print("✅ База данных инициализирована успешно")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации БД: {e}")
-            db.session.rollback() 
\ No newline at end of file
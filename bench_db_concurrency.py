@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк параллельного чтения и записи через маршруты приложения.
+Читатели и писатели - отдельные процессы, как воркеры gunicorn: читатели листают
+журнал, писатели добавляют события с обновлением денежного потока. Уровень db
+выполняет те же запросы напрямую через сессию (видна разница именно в движке БД),
+уровень http - через маршруты приложения (с затратами Flask и шаблонов). Прогон
+выполняется дважды на свежей временной базе: с настройками SQLite по умолчанию
+(SQLITE_TUNING=0) и с профилем приложения (WAL, synchronous=NORMAL, busy_timeout, mmap, cache_size),
+после чего печатается сравнение пропускной способности и задержек.
+
+Запуск: python bench_db_concurrency.py [--level db|http] [--readers 4] [--writers 2] [--seconds 10] [--events 20000]
+        python bench_db_concurrency.py --database-url postgresql://...   # один прогон на своей БД
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Параллельное чтение/запись: до и после настройки движка БД')
+    parser.add_argument('--readers', type=int, default=4, help='Процессов-читателей')
+    parser.add_argument('--writers', type=int, default=2, help='Процессов-писателей')
+    parser.add_argument('--seconds', type=float, default=10, help='Длительность прогона')
+    parser.add_argument('--events', type=int, default=20000, help='Событий в журнале перед прогоном')
+    parser.add_argument('--level', choices=['db', 'http'], default='db', help='Запросы напрямую или через маршруты')
+    parser.add_argument('--database-url', help='Своя база (без сравнения профилей)')
+    parser.add_argument('--profile', choices=['baseline', 'tuned'], help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def run_profile(args):
+    """Один прогон в текущем процессе; возвращает словарь с результатами"""
+    from models import db, Vehicle, EventJournal, CashFlow
+    from services import update_cashflow_from_event, init_database
+    from app import create_app
+
+    app = create_app()
+    init_database(app)
+    with app.app_context():
+        if not Vehicle.query.filter_by(call_sign='BENCH').first():
+            db.session.add(Vehicle(brand='Bench', model='Car', year=2020, vin_code='BENCH0000000000001',
+                                   license_plate='BENCH', call_sign='BENCH'))
+            db.session.commit()
+        vehicle_id = Vehicle.query.filter_by(call_sign='BENCH').one().id
+        start = datetime(2020, 1, 1)
+        db.session.execute(db.insert(EventJournal), [
+            {'date': start + timedelta(minutes=index), 'event_type': 'видатки', 'subtype': 'ПОЛОМКА',
+             'vehicle_id': vehicle_id, 'amount': 0, 'description': f'bench {index}'}
+            for index in range(args.events)
+        ])
+        db.session.commit()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar() \
+            if db.engine.dialect.name == 'sqlite' else db.engine.dialect.name
+
+    # Соединения родителя не должны достаться дочерним процессам
+    with app.app_context():
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    ready = context.Barrier(args.readers + args.writers + 1)
+    deadline = context.Value('d', 0.0)
+
+    def db_read(index):
+        if index % 2:
+            db.session.query(EventJournal.id, EventJournal.date, EventJournal.amount).order_by(
+                EventJournal.date.desc(), EventJournal.id.desc()
+            ).limit(50).all()
+        else:
+            db.session.query(CashFlow.date, CashFlow.balance).order_by(CashFlow.date.desc()).limit(50).all()
+        db.session.rollback()
+        return True
+
+    def db_write(index, number):
+        event_date = start + timedelta(days=(index * 7 + number) % 365)
+        db.session.add(EventJournal(date=event_date, event_type='надходження', subtype='КОМПЕНСАЦІЯ',
+                                    vehicle_id=vehicle_id, amount=10, description=f'writer {number}'))
+        update_cashflow_from_event(event_date, 'надходження', 'КОМПЕНСАЦІЯ', 10)
+        db.session.commit()
+        return True
+
+    def worker(kind, number):
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        context = app.app_context()
+        context.push()
+        latencies, errors, index = [], 0, 0
+        ready.wait()
+        while time.time() < deadline.value:
+            index += 1
+            started = time.perf_counter()
+            try:
+                if args.level == 'db':
+                    ok = db_read(index) if kind == 'read' else db_write(index, number)
+                elif kind == 'read':
+                    url = '/api/v1/events?limit=50' if index % 2 else '/api/v1/cashflow?limit=50'
+                    ok = client.get(url).status_code == 200
+                else:
+                    response = client.post('/events/add', data={
+                        'date': (start + timedelta(days=(index * 7 + number) % 365)).strftime('%Y-%m-%d'),
+                        'event_type': 'надходження', 'subtype': 'КОМПЕНСАЦІЯ',
+                        'vehicle_id': str(vehicle_id), 'contractor_id': '',
+                        'amount': '10', 'description': f'writer {number}',
+                    })
+                    ok = response.status_code == 302 and '/events/add' not in response.headers.get('Location', '')
+            except Exception:
+                db.session.rollback()
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        queue.put((kind, latencies, errors))
+
+    processes = [context.Process(target=worker, args=('read', number)) for number in range(args.readers)]
+    processes += [context.Process(target=worker, args=('write', number)) for number in range(args.writers)]
+    for process in processes:
+        process.start()
+    deadline.value = time.time() + 3600
+    ready.wait()
+    deadline.value = time.time() + args.seconds
+
+    results = {'read': [], 'write': [], 'errors': 0}
+    for _ in processes:
+        kind, latencies, errors = queue.get()
+        results[kind].extend(latencies)
+        results['errors'] += errors
+    for process in processes:
+        process.join()
+
+    return {
+        'journal_mode': journal_mode,
+        'reads_per_s': round(len(results['read']) / args.seconds, 1),
+        'writes_per_s': round(len(results['write']) / args.seconds, 1),
+        'read_p50_ms': round(percentile(results['read'], 0.5) * 1000, 1),
+        'read_p95_ms': round(percentile(results['read'], 0.95) * 1000, 1),
+        'write_p50_ms': round(percentile(results['write'], 0.5) * 1000, 1),
+        'write_p95_ms': round(percentile(results['write'], 0.95) * 1000, 1),
+        'errors': results['errors'],
+    }
+
+def run_subprocess(args, profile):
+    """Прогон профиля в отдельном процессе на новой временной базе SQLite"""
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fleet_bench.db')
+    env['SQLITE_TUNING'] = '1' if profile == 'tuned' else '0'
+    command = [sys.executable, os.path.abspath(__file__), '--profile', profile, '--level', args.level,
+               '--readers', str(args.readers), '--writers', str(args.writers),
+               '--seconds', str(args.seconds), '--events', str(args.events)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def print_result(title, result):
+    print(f"📊 {title} ({result['journal_mode']}): "
+          f"чтение {result['reads_per_s']}/с (p50 {result['read_p50_ms']} мс, p95 {result['read_p95_ms']} мс), "
+          f"запись {result['writes_per_s']}/с (p50 {result['write_p50_ms']} мс, p95 {result['write_p95_ms']} мс), "
+          f"ошибок {result['errors']}")
+
+def main():
+    args = parse_args()
+
+    if args.profile:
+        # Дочерний процесс: печатаем результат последней строкой
+        print(json.dumps(run_profile(args)))
+        return 0
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+        print_result('Текущий профиль', run_profile(args))
+        return 0
+
+    print(f"🚀 {args.readers} читателей и {args.writers} писателей, уровень {args.level}, {args.seconds:g} с на профиль...")
+    baseline = run_subprocess(args, 'baseline')
+    print_result('По умолчанию', baseline)
+    tuned = run_subprocess(args, 'tuned')
+    print_result('Профиль приложения', tuned)
+
+    for key, title in (('reads_per_s', 'Чтение'), ('writes_per_s', 'Запись')):
+        if baseline[key]:
+            print(f"✅ {title}: x{tuned[key] / baseline[key]:.2f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки горячих функций на нескольких размерах данных:
+update_cashflow_from_event, check_and_create_notifications, три генератора PDF-отчетов
+и vehicle_payback (окупаемость на странице событий ТС).
+
+Для каждого размера создается временная SQLite и заполняется generate_fleet_data.py
+(событий = размер, ТС и контрагентов ~ корень из размера, уведомлений 1%), замер идет
+в отдельном процессе. Каждая функция выполняется --repeat раз после прогрева; печатаются
+медиана, среднее и разброс. Пик памяти Python снимается отдельным запуском под tracemalloc
+(трассировка замедляет код, поэтому в замер времени не попадает). По медианам строится
+кривая роста: показатель k в time ~ size^k (0 - не зависит от объема данных, 1 - линейно).
+
+Результат сохраняется в JSON; --compare сравнивает с сохраненной базовой линией, а
+--max-regression завершает скрипт с кодом 1, если медиана или пик памяти выросли больше N %.
+
+Запуск: python bench_functions.py [--sizes 1000,5000,20000] [--repeat 5] [--only cashflow,payback]
+        [--output bench_functions.json] [--compare baseline.json] [--max-regression 20]
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Сколько событий проводить через денежный поток за один замер
+CASHFLOW_CALLS = 100
+
+# Быстрые функции повторяются в цикле, пока один замер не займет столько секунд
+MIN_SAMPLE_SECONDS = 0.02
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Микробенчмарки функций предметной области')
+    parser.add_argument('--sizes', default='1000,5000,20000', help='Размеры набора (число событий) через запятую')
+    parser.add_argument('--repeat', type=int, default=5, help='Замеров на функцию и размер')
+    parser.add_argument('--only', default='', help='Только эти функции: name,... (по умолчанию все BENCHMARKS)')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора данных')
+    parser.add_argument('--output', default='bench_functions.json', help='Куда сохранить результат')
+    parser.add_argument('--compare', help='Базовая линия для сравнения')
+    parser.add_argument('--max-regression', type=float,
+                        help='Код выхода 1, если медиана или пик памяти выросли больше чем на N %%')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def dataset_for(size):
+    """Параметры generate_fleet_data для размера: события растут линейно, справочники - как корень"""
+    side = max(20, int(math.sqrt(size)))
+    return {'vehicles': side, 'contractors': side, 'events': size, 'notifications': size // 100}
+
+def bench_cashflow():
+    """update_cashflow_from_event: CASHFLOW_CALLS событий в одной транзакции, затем откат"""
+    from models import db, CashFlow
+    from services import as_date, update_cashflow_from_event, EVENT_SUBTYPES
+    rng = random.Random(0)
+    first, last = db.session.query(db.func.min(CashFlow.date), db.func.max(CashFlow.date)).one()
+    first, last = as_date(first), as_date(last)
+    kinds = [(event_type, subtype) for event_type, subtypes in EVENT_SUBTYPES.items() for subtype in subtypes]
+    events = [
+        (datetime.combine(first + timedelta(days=rng.randrange((last - first).days + 1)), datetime.min.time()),
+         *rng.choice(kinds), round(rng.uniform(100, 10000), 2))
+        for _ in range(CASHFLOW_CALLS)
+    ]
+
+    def run():
+        for event_date, event_type, subtype, amount in events:
+            update_cashflow_from_event(event_date, event_type, subtype, amount)
+
+    return CASHFLOW_CALLS, run, db.session.rollback
+
+def bench_notifications():
+    """check_and_create_notifications: догоняет последние 10% событий журнала, затем все откатывается"""
+    from models import db, AppCounter, EventJournal, Notification
+    from services import check_and_create_notifications, recount_unread_notifications, RENTAL_NOTIFICATIONS_WATERMARK
+    last_event = db.session.query(db.func.max(EventJournal.id)).scalar()
+    last_notification = db.session.query(db.func.max(Notification.id)).scalar() or 0
+    backlog = max(1, last_event // 10)
+
+    def set_watermark(value):
+        db.session.execute(
+            db.update(AppCounter)
+            .where(AppCounter.name == RENTAL_NOTIFICATIONS_WATERMARK)
+            .values(value=value)
+        )
+
+    def reset():
+        # Функция фиксирует каждую пачку сама, поэтому созданное удаляется явно
+        db.session.rollback()
+        db.session.execute(db.delete(Notification).where(Notification.id > last_notification))
+        set_watermark(last_event - backlog)
+        db.session.commit()
+        recount_unread_notifications()
+
+    def run():
+        check_and_create_notifications()
+
+    return backlog, run, reset
+
+def report_bench(query_name, builder_name, table_name):
+    def bench():
+        import models
+        import reporting
+        db = models.db
+        rows = db.session.query(db.func.count()).select_from(getattr(models, table_name)).scalar()
+        query, builder = getattr(reporting, query_name), getattr(reporting, builder_name)
+
+        def run():
+            builder(query(), io.BytesIO())
+
+        return rows, run, db.session.rollback
+    bench.__doc__ = f"{builder_name}: верстка PDF в память по всем строкам {table_name}"
+    return bench
+
+def bench_payback():
+    """vehicle_payback: окупаемость ТС с наибольшим числом событий (события загружены заранее)"""
+    from models import db, EventJournal, Vehicle
+    from services import vehicle_payback
+    vehicle_id = db.session.query(EventJournal.vehicle_id).group_by(EventJournal.vehicle_id).order_by(
+        db.func.count().desc()).limit(1).scalar()
+    vehicle = db.session.get(Vehicle, vehicle_id)
+    events = EventJournal.query.filter_by(vehicle_id=vehicle_id).order_by(EventJournal.date.desc()).all()
+
+    def run():
+        vehicle_payback(vehicle, events)
+
+    return len(events), run, None
+
+# Имя -> функция, которая готовит замер и возвращает (объем входа, замеряемый вызов, сброс состояния)
+BENCHMARKS = {
+    'cashflow': bench_cashflow,
+    'notifications': bench_notifications,
+    'report_vehicles': report_bench('vehicles_report_query', 'generate_vehicles_report', 'Vehicle'),
+    'report_events': report_bench('events_report_query', 'generate_events_report', 'EventJournal'),
+    'report_cashflow': report_bench('cashflow_report_query', 'generate_cashflow_report', 'CashFlow'),
+    'payback': bench_payback,
+}
+
+def measure(run, reset, repeat):
+    """Время одного вызова в секундах (repeat замеров после прогрева), пик памяти под tracemalloc и число вызовов в замере"""
+    stateless = reset is None
+    reset = reset or (lambda: None)
+
+    def sample(loops):
+        reset()
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        return (time.perf_counter() - started) / loops
+
+    # Прогрев; для быстрых функций без состояния подбирается число вызовов в одном замере
+    loops = 1
+    while stateless and sample(loops) * loops < MIN_SAMPLE_SECONDS:
+        loops *= 10
+    if not stateless:
+        sample(loops)
+
+    timings = [sample(loops) for _ in range(repeat)]
+
+    reset()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    reset()
+    return timings, peak, loops
+
+def run_child(args):
+    """Заполняет базу размера args.child, замеряет функции и печатает результат JSON последней строкой"""
+    from generate_fleet_data import generate
+
+    generate(**dataset_for(args.child), seed=args.seed)
+
+    from app import create_app
+    results = {}
+    with create_app().app_context():
+        for name in selected_benchmarks(args.only):
+            n, run, reset = BENCHMARKS[name]()
+            timings, peak, loops = measure(run, reset, args.repeat)
+            results[name] = {
+                'n': n,
+                'loops': loops,
+                'median_ms': round(statistics.median(timings) * 1000, 4),
+                'mean_ms': round(statistics.mean(timings) * 1000, 4),
+                'stdev_ms': round(statistics.stdev(timings) * 1000, 4) if len(timings) > 1 else 0.0,
+                'min_ms': round(min(timings) * 1000, 4),
+                'max_ms': round(max(timings) * 1000, 4),
+                'peak_kb': round(peak / 1024, 1),
+            }
+    print(json.dumps(results))
+    return 0
+
+def selected_benchmarks(only):
+    names = [name.strip() for name in only.split(',') if name.strip()] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"❌ Неизвестные функции {', '.join(unknown)}, доступны: {', '.join(BENCHMARKS)}")
+    return names
+
+def scaling_exponent(points):
+    """Наклон прямой по МНК в координатах log(size) - log(time): показатель k в time ~ size^k"""
+    points = [(math.log(size), math.log(value)) for size, value in points if value > 0]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.mean(x for x, _ in points)
+    mean_y = statistics.mean(y for _, y in points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / spread, 2)
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_result(result):
+    print(f"\n{'функция':<18}{'размер':>9}{'вход':>9}{'медиана мс':>13}{'разброс мс':>13}{'пик КБ':>11}")
+    for name, by_size in result['results'].items():
+        for size, stats in by_size.items():
+            print(f"{name:<18}{size:>9}{stats['n']:>9}{stats['median_ms']:>13.3f}{stats['stdev_ms']:>13.3f}"
+                  f"{stats['peak_kb']:>11.1f}")
+        exponent = result['scaling'].get(name)
+        if exponent is not None:
+            print(f"{'':<18}рост: time ~ size^{exponent}")
+
+def compare_results(old, new, max_regression):
+    """Печатает изменения медианы и пика памяти; возвращает (функция, размер) с регрессией"""
+    def change(before, after):
+        return (after - before) / before * 100 if before else 0.0
+
+    regressions = []
+    print(f"\n📈 Сравнение с {old['meta'].get('git_revision') or 'базовой линией'} "
+          f"({old['meta'].get('created_at')}):")
+    for name, by_size in new['results'].items():
+        for size, stats in by_size.items():
+            before = old['results'].get(name, {}).get(size)
+            if not before:
+                continue
+            time_change = change(before['median_ms'], stats['median_ms'])
+            memory_change = change(before['peak_kb'], stats['peak_kb'])
+            flag = ''
+            if max_regression is not None and max(time_change, memory_change) > max_regression:
+                regressions.append(f'{name}@{size}')
+                flag = ' ❌'
+            print(f"{name:<18}{size:>9}  медиана {time_change:+6.1f}%  память {memory_change:+6.1f}%{flag}")
+    return regressions
+
+def main():
+    args = parse_args()
+    if args.child:
+        return run_child(args)
+
+    names = selected_benchmarks(args.only)
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    results = {name: {} for name in names}
+    folder = tempfile.mkdtemp()
+    try:
+        for size in sizes:
+            print(f"📏 Размер {size}: {dataset_for(size)}")
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(folder, f'fleet_{size}.db'))
+            child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(size),
+                                    '--repeat', str(args.repeat), '--seed', str(args.seed), '--only', ','.join(names)],
+                                   env=env, capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+            if child.returncode != 0:
+                print(child.stderr)
+                raise SystemExit(f'❌ Замер размера {size} завершился с ошибкой')
+            for name, stats in json.loads(child.stdout.strip().splitlines()[-1]).items():
+                results[name][str(size)] = stats
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    result = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'sizes': sizes,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+        'scaling': {
+            name: scaling_exponent([(int(size), stats['median_ms']) for size, stats in by_size.items()])
+            for name, by_size in results.items()
+        },
+    }
+    print_result(result)
+
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(result, output, ensure_ascii=False, indent=2)
+    print(f"💾 Результат сохранен в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline:
+            regressions = compare_results(json.load(baseline), result, args.max_regression)
+        if regressions:
+            print(f"❌ Рост больше чем на {args.max_regression:g}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
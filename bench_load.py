@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест приложения через WSGI: смешанный поток запросов (панель управления,
+журнал, поиск по журналу, добавление событий, уведомления, PDF-отчет) от нескольких
+процессов-клиентов, как от воркеров gunicorn. Для каждого маршрута считаются пропускная
+способность и задержки p50/p95/p99; результат сохраняется в JSON, который можно сравнить
+с прогоном прошлого релиза (--compare, --max-regression для CI).
+
+Без --database-url создается временная SQLite и заполняется generate_fleet_data.py
+(размер набора задается --vehicles/--contractors/--events/--notifications).
+
+Запуск: python bench_load.py [--concurrency 4] [--seconds 30] [--mix dashboard=20,events=25,add_event=10]
+        [--output bench_load.json] [--compare old.json] [--max-regression 20] [--database-url URL]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SEARCH_WORDS = ['масла', 'шини', 'діагностика', 'колодки', 'мийка', 'FM-00042', 'ремонт']
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест маршрутов приложения')
+    parser.add_argument('--concurrency', type=int, default=4, help='Параллельных клиентов (процессов)')
+    parser.add_argument('--seconds', type=float, default=30, help='Длительность прогона')
+    parser.add_argument('--mix', default='', help='Веса маршрутов: name=weight,... (по умолчанию WORKLOAD)')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно последовательности запросов')
+    parser.add_argument('--output', default='bench_load.json', help='Куда сохранить результат')
+    parser.add_argument('--compare', help='Прошлый результат для сравнения')
+    parser.add_argument('--max-regression', type=float,
+                        help='Код выхода 1, если p95 какого-либо маршрута вырос больше чем на N %%')
+    parser.add_argument('--database-url', help='Готовая база (по умолчанию временная SQLite с синтетикой)')
+    parser.add_argument('--vehicles', type=int, default=1000, help='ТС во временной базе')
+    parser.add_argument('--contractors', type=int, default=500, help='Контрагентов во временной базе')
+    parser.add_argument('--events', type=int, default=200000, help='Событий во временной базе')
+    parser.add_argument('--notifications', type=int, default=2000, help='Уведомлений во временной базе')
+    return parser.parse_args()
+
+def request_dashboard(client, rng, fleet):
+    return client.get('/dashboard')
+
+def request_events(client, rng, fleet):
+    query = {'type': rng.choice(fleet['event_types'])} if rng.random() < 0.3 else {}
+    return client.get('/events', query_string=query)
+
+def request_events_search(client, rng, fleet):
+    return client.get('/events', query_string={'q': rng.choice(SEARCH_WORDS)})
+
+def request_add_event(client, rng, fleet):
+    return client.post('/events/add', data={
+        'date': fleet['today'],
+        'event_type': 'надходження',
+        'subtype': 'ОРЕНДА',
+        'vehicle_id': str(rng.randint(1, fleet['vehicles'])),
+        'contractor_id': str(rng.choice(fleet['renters'])),
+        'amount': f'{rng.uniform(1500, 6000):.2f}',
+        'description': 'bench_load',
+    })
+
+def request_notifications(client, rng, fleet):
+    return client.get('/notifications')
+
+def request_report(client, rng, fleet):
+    # Из кеша - 200, при промахе отчет ставится в очередь - 202
+    return client.get('/generate_report/vehicles', headers={'Accept': 'application/json'})
+
+# Маршрут -> (вес по умолчанию, функция запроса)
+WORKLOAD = {
+    'dashboard': (20, request_dashboard),
+    'events': (25, request_events),
+    'events_search': (10, request_events_search),
+    'add_event': (15, request_add_event),
+    'notifications': (20, request_notifications),
+    'report': (10, request_report),
+}
+
+def parse_mix(text):
+    """'dashboard=20,events=5' -> {'dashboard': 20, 'events': 5}; пустая строка - веса WORKLOAD"""
+    if not text:
+        return {name: weight for name, (weight, _) in WORKLOAD.items()}
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in WORKLOAD:
+            raise SystemExit(f"❌ Неизвестный маршрут {name!r}, доступны: {', '.join(WORKLOAD)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def response_ok(name, response):
+    if name == 'add_event':
+        # Успешное добавление - редирект в журнал, ошибка - обратно на форму
+        return response.status_code == 302 and '/events/add' not in response.headers.get('Location', '')
+    if name == 'report':
+        return response.status_code in (200, 202)
+    return response.status_code == 200
+
+def wait_report_job(client, status_url):
+    """Ждет, пока задача отчета из прогрева попадет в кеш"""
+    while True:
+        status = client.get(status_url).get_json()['status']
+        if status == 'done':
+            return
+        if status == 'failed':
+            raise SystemExit('❌ Отчет при прогреве не сформирован')
+        time.sleep(0.5)
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def route_stats(latencies, errors, seconds):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / seconds, 2),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_load(args, mix):
+    from models import db, Vehicle, Contractor, EventJournal, Notification
+    from services import EVENT_TYPES
+    from app import create_app
+
+    app = create_app()
+
+    with app.app_context():
+        fleet = {
+            'vehicles': db.session.query(db.func.max(Vehicle.id)).scalar() or 0,
+            'renters': [row[0] for row in db.session.query(Contractor.id).filter_by(contractor_type='Орендар')],
+            'event_types': EVENT_TYPES,
+            'today': datetime.now().strftime('%Y-%m-%d'),
+        }
+        dataset = {
+            'vehicles': db.session.query(db.func.count(Vehicle.id)).scalar(),
+            'contractors': db.session.query(db.func.count(Contractor.id)).scalar(),
+            'events': db.session.query(db.func.count(EventJournal.id)).scalar(),
+            'notifications': db.session.query(db.func.count(Notification.id)).scalar(),
+        }
+        dialect = db.engine.dialect.name
+    if not fleet['vehicles'] or not fleet['renters']:
+        raise SystemExit('❌ В базе нет ТС или арендаторов, заполните ее generate_fleet_data.py')
+
+    # Прогрев: по одному запросу на маршрут (шаблоны, кеш отчета) вне замера
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    for name in mix:
+        response = WORKLOAD[name][1](client, random.Random(args.seed), fleet)
+        response.get_data()
+        response.close()
+        if not response_ok(name, response):
+            raise SystemExit(f'❌ Маршрут {name} вернул HTTP {response.status_code} при прогреве')
+        if name == 'report' and response.status_code == 202:
+            wait_report_job(client, response.headers['Location'])
+
+    # Соединения родителя не должны достаться дочерним процессам
+    with app.app_context():
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    ready = context.Barrier(args.concurrency + 1)
+    deadline = context.Value('d', 0.0)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    def worker(number):
+        rng = random.Random(args.seed + number)
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        latencies = {name: [] for name in names}
+        errors = {name: 0 for name in names}
+        ready.wait()
+        while time.time() < deadline.value:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = WORKLOAD[name][1](client, rng, fleet)
+                response.get_data()
+                response.close()
+                ok = response_ok(name, response)
+            except Exception:
+                ok = False
+            if ok:
+                latencies[name].append(time.perf_counter() - started)
+            else:
+                errors[name] += 1
+        queue.put((latencies, errors))
+
+    processes = [context.Process(target=worker, args=(number,)) for number in range(args.concurrency)]
+    for process in processes:
+        process.start()
+    deadline.value = time.time() + 3600
+    ready.wait()
+    deadline.value = time.time() + args.seconds
+
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    for _ in processes:
+        worker_latencies, worker_errors = queue.get()
+        for name in names:
+            latencies[name].extend(worker_latencies[name])
+            errors[name] += worker_errors[name]
+    for process in processes:
+        process.join()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'database': dialect,
+            'dataset': dataset,
+            'concurrency': args.concurrency,
+            'seconds': args.seconds,
+            'seed': args.seed,
+            'mix': mix,
+        },
+        'routes': {name: route_stats(latencies[name], errors[name], args.seconds) for name in names},
+        'total': route_stats(all_latencies, sum(errors.values()), args.seconds),
+    }
+
+def print_result(result):
+    print(f"{'маршрут':<16}{'запросов':>9}{'ошибок':>8}{'rps':>9}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}")
+    for name, stats in list(result['routes'].items()) + [('ИТОГО', result['total'])]:
+        print(f"{name:<16}{stats['requests']:>9}{stats['errors']:>8}{stats['rps']:>9}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+def compare_results(old, new, max_regression):
+    """Печатает изменения p50/p95/p99 и rps по маршрутам; возвращает маршруты с регрессией p95"""
+    def change(before, after):
+        return (after - before) / before * 100 if before else 0.0
+
+    regressions = []
+    print(f"\n📈 Сравнение с {old['meta'].get('git_revision') or 'прошлым прогоном'} "
+          f"({old['meta'].get('created_at')}):")
+    for name, stats in list(new['routes'].items()) + [('ИТОГО', new['total'])]:
+        before = old['total'] if name == 'ИТОГО' else old['routes'].get(name)
+        if not before:
+            continue
+        p95_change = change(before['p95_ms'], stats['p95_ms'])
+        flag = ''
+        if max_regression is not None and p95_change > max_regression and name != 'ИТОГО':
+            regressions.append(name)
+            flag = ' ❌'
+        print(f"{name:<16} p50 {change(before['p50_ms'], stats['p50_ms']):+6.1f}%  p95 {p95_change:+6.1f}%  "
+              f"p99 {change(before['p99_ms'], stats['p99_ms']):+6.1f}%  rps {change(before['rps'], stats['rps']):+6.1f}%{flag}")
+    return regressions
+
+def main():
+    args = parse_args()
+    mix = parse_mix(args.mix)
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fleet_load.db')
+        from generate_fleet_data import generate
+        print(f"🗄️ Готовим временную базу: {args.events} событий...")
+        generate(args.vehicles, args.contractors, args.events, args.notifications, seed=args.seed)
+
+    print(f"🚀 {args.concurrency} клиентов, {args.seconds:g} с, маршруты: "
+          f"{', '.join(f'{name}={weight:g}' for name, weight in mix.items())}")
+    result = run_load(args, mix)
+    print_result(result)
+
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(result, output, ensure_ascii=False, indent=2)
+    print(f"💾 Результат сохранен в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous:
+            regressions = compare_results(json.load(previous), result, args.max_regression)
+        if regressions:
+            print(f"❌ p95 вырос больше чем на {args.max_regression:g}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
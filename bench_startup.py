@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Замер старта воркера: сколько стоят `import app` и create_app() в свежем интерпретаторе
+и сколько SQL-запросов при этом уходит в БД. База заранее инициализируется
+отдельным процессом (как шаг релиза), затем старт повторяется несколько раз
+и печатаются медиана и максимум.
+
+С --workers N дополнительно запускается gunicorn с N воркерами без --preload и с ним,
+и для воркеров печатается память: RSS и PSS (PSS делит общие copy-on-write страницы
+между процессами, поэтому показывает реальную цену воркера).
+
+Запуск: python bench_startup.py [--runs 5] [--workers 4] [--database-url URL]
+По умолчанию используется временная база SQLite.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Код, который выполняется в дочернем интерпретаторе
+IMPORT_PROBE = """
+import json, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+sql = {'started': 0.0, 'total': 0.0}
+def before_execute(*args):
+    statements.append(args[2])
+    sql['started'] = time.perf_counter()
+def after_execute(*args):
+    sql['total'] += time.perf_counter() - sql['started']
+event.listen(Engine, 'before_cursor_execute', before_execute)
+event.listen(Engine, 'after_cursor_execute', after_execute)
+import app
+app.create_app()
+print(json.dumps({'import_s': time.perf_counter() - started, 'statements': len(statements), 'sql_s': sql['total']}))
+"""
+
+INIT_PROBE = """
+import app
+app.init_database(app.create_app())
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Время импорта приложения в воркере')
+    parser.add_argument('--runs', type=int, default=5, help='Сколько раз импортировать')
+    parser.add_argument('--workers', type=int, default=0, help='Замерить память N воркеров gunicorn')
+    parser.add_argument('--database-url', help='База для замера (по умолчанию временная SQLite)')
+    return parser.parse_args()
+
+def run_probe(code, env):
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout.strip().splitlines()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as children:
+        return [int(pid) for pid in children.read().split()]
+
+def process_memory_kb(pid):
+    """RSS и PSS процесса в КБ"""
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                memory[name] = int(value.split()[0])
+    return memory['Rss'], memory['Pss']
+
+def measure_gunicorn(env, workers, preload):
+    """Запускает gunicorn, прогревает воркеры запросами и возвращает (RSS, PSS) каждого воркера"""
+    port = free_port()
+    env = dict(env, GUNICORN_PRELOAD='1' if preload else '0')
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+                               '--log-level', 'warning', 'app:create_app()'],
+                              env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1).read()
+                if len(worker_pids(master.pid)) == workers:
+                    break
+            except OSError:
+                pass
+            if time.time() > deadline or master.poll() is not None:
+                raise RuntimeError('gunicorn не запустился')
+            time.sleep(0.2)
+        for _ in range(workers * 10):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/login').read()
+        return [process_memory_kb(pid) for pid in worker_pids(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait()
+
+def main():
+    args = parse_args()
+    env = dict(os.environ)
+    env['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fleet_startup.db')
+
+    print("🗄️ Инициализируем базу отдельным процессом...")
+    run_probe(INIT_PROBE, env)
+
+    timings, statements, sql_timings = [], [], []
+    for _ in range(args.runs):
+        sample = json.loads(run_probe(IMPORT_PROBE, env)[-1])
+        timings.append(sample['import_s'] * 1000)
+        statements.append(sample['statements'])
+        sql_timings.append(sample['sql_s'] * 1000)
+
+    print(f"⏱️ import app + create_app(): медиана {statistics.median(timings):.0f} мс, максимум {max(timings):.0f} мс "
+          f"({args.runs} запусков)")
+    print(f"📊 SQL-запросов при старте: {max(statements)}, время в БД: медиана {statistics.median(sql_timings):.0f} мс")
+
+    if args.workers:
+        for preload in (False, True):
+            memory = measure_gunicorn(env, args.workers, preload)
+            rss = statistics.mean(value[0] for value in memory) / 1024
+            pss = statistics.mean(value[1] for value in memory) / 1024
+            print(f"🧠 gunicorn -w {args.workers}{' --preload' if preload else ''}: "
+                  f"RSS воркера {rss:.1f} МБ, PSS воркера {pss:.1f} МБ, PSS всех воркеров {pss * len(memory):.1f} МБ")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Проверка, что параллельные записи событий не теряют обновления денежного потока
+и помесячной сводки. Несколько потоков одновременно добавляют (а затем удаляют)
+события на одну дату нового месяца через обычные маршруты приложения, после чего
+итоги сверяются с точными суммами.
+
+Запуск: python check_cashflow_concurrency.py [--writers 8] [--events 25] [--database-url URL]
+По умолчанию используется временная база SQLite, чтобы не трогать рабочие данные.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Параллельная запись событий и сверка денежного потока')
+    parser.add_argument('--writers', type=int, default=8, help='Количество параллельных потоков')
+    parser.add_argument('--events', type=int, default=25, help='Событий на один поток')
+    parser.add_argument('--database-url', help='База для проверки (по умолчанию временная SQLite)')
+    return parser.parse_args()
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fleet_check.db')
+
+from models import db, CashFlow, EventJournal, MonthlyEventStats
+from services import init_database
+from app import create_app
+
+app = create_app()
+init_database(app)
+
+# Дата и суммы подобраны так, чтобы итоги считались точно
+CHECK_DATE = '2000-01-01'
+EVENT_KINDS = [
+    ('надходження', 'ОРЕНДА', 100.0),
+    ('видатки', 'ПОЛОМКА', 30.0),
+    ('інвестиції', 'КРЕДИТ', 20.0),
+]
+
+def run_writers(count, target):
+    """Запускает `count` потоков и ждет их завершения; возвращает список ошибок"""
+    errors = []
+    start = threading.Barrier(count)
+
+    def worker(number):
+        try:
+            client = app.test_client()
+            client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+            start.wait()
+            target(client, number)
+        except Exception as e:
+            errors.append(f'поток {number}: {e}')
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+def cashflow_row():
+    with app.app_context():
+        entry = CashFlow.query.filter_by(date=datetime.strptime(CHECK_DATE, '%Y-%m-%d').date()).first()
+        if entry is None:
+            return None
+        return entry.income, entry.expenses, entry.credit_load, entry.balance
+
+def monthly_rows():
+    """Счетчики помесячной сводки за месяц CHECK_DATE: тип -> (количество, сумма)"""
+    with app.app_context():
+        rows = MonthlyEventStats.query.filter_by(month=datetime.strptime(CHECK_DATE, '%Y-%m-%d').date()).all()
+        return {row.event_type: (row.events_count, row.total_amount) for row in rows}
+
+def main():
+    marker = f'check-concurrency-{uuid.uuid4().hex[:8]}'
+    total_events = args.writers * args.events
+
+    def add_events(client, number):
+        for index in range(args.events):
+            event_type, subtype, amount = EVENT_KINDS[(number + index) % len(EVENT_KINDS)]
+            response = client.post('/events/add', data={
+                'date': CHECK_DATE,
+                'event_type': event_type,
+                'subtype': subtype,
+                'vehicle_id': '',
+                'contractor_id': '',
+                'amount': str(amount),
+                'description': marker,
+            })
+            if response.status_code != 302 or '/events/add' in response.headers.get('Location', ''):
+                raise RuntimeError(f'событие не добавлено (HTTP {response.status_code})')
+
+    print(f"🚀 {args.writers} потоков добавляют по {args.events} событий на {CHECK_DATE}...")
+    errors = run_writers(args.writers, add_events)
+
+    expected_income = expected_expenses = expected_credit = 0.0
+    expected_monthly = {}
+    for number in range(args.writers):
+        for index in range(args.events):
+            event_type, subtype, amount = EVENT_KINDS[(number + index) % len(EVENT_KINDS)]
+            count, total = expected_monthly.get(event_type, (0, 0.0))
+            expected_monthly[event_type] = (count + 1, total + amount)
+            if event_type == 'надходження':
+                expected_income += amount
+            elif subtype == 'КРЕДИТ':
+                expected_credit += amount
+            else:
+                expected_expenses += amount
+    expected = (expected_income, expected_expenses, expected_credit,
+                expected_income - expected_expenses - expected_credit)
+
+    with app.app_context():
+        stored_events = EventJournal.query.filter_by(description=marker).count()
+        event_ids = [row[0] for row in db.session.query(EventJournal.id).filter_by(description=marker).all()]
+    actual = cashflow_row()
+    monthly = monthly_rows()
+
+    failed = bool(errors)
+    for error in errors:
+        print(f"❌ {error}")
+    if stored_events != total_events:
+        failed = True
+        print(f"❌ Событий записано {stored_events}, ожидалось {total_events}")
+    if actual != expected:
+        failed = True
+        print(f"❌ Денежный поток {actual}, ожидалось {expected}")
+    else:
+        print(f"✅ Денежный поток точный: income={actual[0]:.2f} expenses={actual[1]:.2f} "
+              f"credit_load={actual[2]:.2f} balance={actual[3]:.2f}")
+
+    if monthly != expected_monthly:
+        failed = True
+        print(f"❌ Помесячная сводка {monthly}, ожидалось {expected_monthly}")
+    else:
+        print(f"✅ Помесячная сводка точная: {sum(count for count, _ in monthly.values())} событий")
+
+    # Параллельно удаляем все события - запись за день должна исчезнуть
+    def delete_events(client, number):
+        for event_id in event_ids[number::args.writers]:
+            client.post(f'/events/delete/{event_id}')
+
+    print(f"🧹 {args.writers} потоков удаляют {len(event_ids)} событий...")
+    errors = run_writers(args.writers, delete_events)
+    for error in errors:
+        failed = True
+        print(f"❌ {error}")
+    remaining = cashflow_row()
+    if remaining is not None:
+        failed = True
+        print(f"❌ После удаления осталась запись денежного потока: {remaining}")
+    else:
+        print("✅ После удаления всех событий запись денежного потока удалена")
+    leftover = {event_type: row for event_type, row in monthly_rows().items() if row[0] or abs(row[1]) > 0.005}
+    if leftover:
+        failed = True
+        print(f"❌ После удаления в помесячной сводке остались события: {leftover}")
+
+    if failed:
+        return 1
+    print("🎉 Параллельная запись не теряет обновлений")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Проверка, что счетчики версий таблиц (кеш PDF-отчетов и ETag API) увеличиваются
+при любом способе записи: объекты ORM, массовые db.session.execute и исправление
+денежного потока через reconcile_cashflow(apply=True).
+
+Запуск: python check_data_versions.py [--database-url URL]
+По умолчанию используется временная база SQLite, чтобы не трогать рабочие данные.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Проверка счетчиков версий таблиц')
+    parser.add_argument('--database-url', help='База для проверки (по умолчанию временная SQLite)')
+    return parser.parse_args()
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fleet_check.db')
+
+from models import db, CashFlow, EventJournal
+from services import get_data_versions, init_database, reconcile_cashflow
+from app import create_app
+
+app = create_app()
+init_database(app)
+
+# Даты подобраны так, чтобы не пересекаться с рабочими данными
+DAYS = [date(2000, 2, 1), date(2000, 2, 2), date(2000, 2, 3)]
+
+def cashflow_version():
+    db.session.rollback()
+    return get_data_versions({'cash_flow'})['cash_flow']
+
+def main():
+    failed = False
+
+    def check(title, change):
+        nonlocal failed
+        before = cashflow_version()
+        change()
+        after = cashflow_version()
+        if after > before:
+            print(f"✅ {title}: версия cash_flow {before} -> {after}")
+        else:
+            failed = True
+            print(f"❌ {title}: версия cash_flow не изменилась ({before})")
+
+    with app.app_context():
+        def add_events():
+            db.session.add_all(
+                EventJournal(date=datetime.combine(day, datetime.min.time()), event_type='надходження',
+                             subtype='ОРЕНДА', amount=100.0, description='check-data-versions')
+                for day in DAYS[:2]
+            )
+            db.session.add(CashFlow(date=DAYS[0], income=100.0, expenses=0, credit_load=0, balance=100.0))
+            db.session.commit()
+        check('добавление через ORM', add_events)
+
+        def corrupt():
+            db.session.execute(db.update(CashFlow).where(CashFlow.date == DAYS[0]).values(income=1.0, balance=1.0))
+            db.session.add(CashFlow(date=DAYS[2], income=5.0, expenses=0, credit_load=0, balance=5.0))
+            db.session.commit()
+        check('массовый UPDATE', corrupt)
+
+        # Расхождение, нет записи и лишняя запись - все три ветки исправления
+        def apply_reconcile():
+            summary, _ = reconcile_cashflow(apply=True)
+            print(f"   расхождений: {summary['mismatched']}, нет записи: {summary['missing']}, "
+                  f"лишних: {summary['extra']}")
+        check('reconcile_cashflow(apply=True)', apply_reconcile)
+
+        for kind, apply_only in (('UPDATE', 'mismatched'), ('INSERT', 'missing')):
+            def break_one():
+                if apply_only == 'mismatched':
+                    db.session.execute(db.update(CashFlow).where(CashFlow.date == DAYS[1]).values(income=2.0))
+                else:
+                    db.session.execute(db.delete(CashFlow).where(CashFlow.date == DAYS[1]))
+                db.session.commit()
+            break_one()
+            check(f'reconcile_cashflow(apply=True), только {kind}', lambda: reconcile_cashflow(apply=True))
+
+        summary, _ = reconcile_cashflow()
+        if summary['mismatched'] or summary['missing'] or summary['extra']:
+            failed = True
+            print(f"❌ После исправления остались расхождения: {summary}")
+
+    if failed:
+        return 1
+    print("🎉 Версии таблиц увеличиваются при любом способе записи")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
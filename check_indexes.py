@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Проверка, что горячие запросы используют свои индексы (EXPLAIN)
+Запуск: python check_indexes.py  (использует DATABASE_URL приложения)
+"""
+
+import sys
+from datetime import date
+
+from sqlalchemy import inspect
+
+from models import db, EventJournal, Notification
+from services import rental_events_batch
+from app import create_app
+
+def hot_queries():
+    """Горячие запросы приложения и индексы, которые они должны использовать"""
+    return [
+        ('events_by_vehicle',
+         EventJournal.query.filter_by(vehicle_id=1).order_by(EventJournal.date.desc()),
+         'ix_event_journal_vehicle_date'),
+        ('events_by_contractor',
+         EventJournal.query.filter_by(contractor_id=1).order_by(EventJournal.date.desc()),
+         'ix_event_journal_contractor_date'),
+        # Пачка генератора уведомлений: арендные события после водяного знака
+        ('rental_notifications_batch',
+         rental_events_batch(watermark=0),
+         'ix_event_journal_type_subtype_id'),
+        ('dashboard_recent_events',
+         EventJournal.query.order_by(EventJournal.date.desc()).limit(10),
+         'ix_event_journal_date_id'),
+        ('events_journal_page',
+         EventJournal.query.order_by(EventJournal.date.desc(), EventJournal.id.desc()).limit(51),
+         'ix_event_journal_date_id'),
+        ('notification_dedup',
+         Notification.query.filter_by(type='rental_payment', vehicle_id=1, contractor_id=1, due_date=date.today()),
+         'ix_notification_dedup'),
+        ('unread_notifications_count',
+         db.session.query(db.func.count(Notification.id)).filter(Notification.is_read == False),
+         'ix_notification_is_read'),
+    ]
+
+def explain(connection, query):
+    """Возвращает план выполнения запроса одной строкой"""
+    compiled = query.statement.compile(dialect=connection.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+        return ' | '.join(str(row[-1]) for row in rows)
+
+    # На маленьких таблицах PostgreSQL предпочитает seq scan - запрещаем его на время проверки
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    rows = connection.exec_driver_sql(f'EXPLAIN {compiled}', params).fetchall()
+    return ' | '.join(str(row[0]) for row in rows)
+
+# Команда, которая создает таблицы и индексы
+INIT_DB_COMMAND = 'flask --app app init-db'
+
+def main():
+    failed = 0
+    with create_app().app_context():
+        inspector = inspect(db.engine)
+        missing = [model.__tablename__ for model in (EventJournal, Notification)
+                   if not inspector.has_table(model.__tablename__)]
+        if missing:
+            print(f"❌ Нет таблиц: {', '.join(missing)}. Запустите {INIT_DB_COMMAND}")
+            return 1
+
+        with db.engine.begin() as connection:
+            for name, query, index_name in hot_queries():
+                plan = explain(connection, query)
+                if index_name in plan:
+                    print(f"✅ {name}: {index_name}")
+                else:
+                    failed += 1
+                    print(f"❌ {name}: ожидался {index_name}")
+                    print(f"   план: {plan}")
+
+    if failed:
+        print(f"❌ Запросов без индекса: {failed}. Запустите {INIT_DB_COMMAND} для добавления индексов")
+        return 1
+    print("🎉 Все горячие запросы используют индексы")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Проверка, что память при верстке PDF-отчета не растет с числом строк: отчет
+больше REPORT_PART_ROWS строк пишется несколькими PDF, и пик памяти определяется
+размером части. Отчет по событиям строится на --rows строках (по умолчанию 40 000)
+и на четверти от них, пик памяти (tracemalloc) сравнивается с порогами: рост на
+1000 строк должен быть почти нулевым. Строки синтетические, в формате
+events_report_query, поэтому база не нужна.
+
+Запуск: python check_report_memory.py [--rows 40000] [--max-mb 20] [--max-growth-kb 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Проверка памяти при верстке PDF-отчета')
+    parser.add_argument('--rows', type=int, default=40000, help='Строк в отчете')
+    parser.add_argument('--max-mb', type=float, default=20, help='Допустимый пик памяти на --rows строках, МБ')
+    parser.add_argument('--max-growth-kb', type=float, default=50,
+                        help='Допустимый рост пика на каждые 1000 строк, КБ (линейный рост - ошибка)')
+    return parser.parse_args()
+
+args = parse_args()
+# Приложению нужна база при импорте, отчет ее не читает
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fleet_check.db')
+
+from reporting import generate_events_report
+from services import EVENT_TYPES, EVENT_SUBTYPES
+
+DESCRIPTIONS = ['Заміна масла та фільтрів', 'Діагностика ходової частини', 'Оренда за тиждень',
+                'Заміна гальмівних колодок і дисків, балансування коліс', 'Мийка', '']
+
+def event_rows(count):
+    rng = random.Random(42)
+    start = datetime(2023, 1, 1)
+    for number in range(count):
+        event_type = rng.choice(EVENT_TYPES)
+        yield SimpleNamespace(
+            date=start + timedelta(hours=number),
+            event_type=event_type,
+            subtype=rng.choice(EVENT_SUBTYPES[event_type]),
+            call_sign=f'FM-{rng.randint(1, 1000):05d}',
+            contractor_name=rng.choice(['СТО Київ', 'ФОП Петренко', None]),
+            amount=rng.uniform(100, 20000),
+            description=rng.choice(DESCRIPTIONS) * rng.randint(1, 3),
+        )
+
+def measure(count):
+    """Пик памяти (МБ), время и размер файла отчета на count строках"""
+    with tempfile.TemporaryFile() as output:
+        tracemalloc.start()
+        started = time.perf_counter()
+        generate_events_report(event_rows(count), output)
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = output.tell()
+        output.seek(0)
+        output_is_zip = output.read(4) == b'PK\x03\x04'
+    kind = 'zip' if output_is_zip else 'PDF'
+    print(f"   {count} строк ({kind}): пик {peak / 1024 / 1024:.1f} МБ, {seconds:.0f} с, файл {size / 1024 / 1024:.1f} МБ")
+    return peak / 1024 / 1024
+
+def main():
+    print(f"📄 Верстаем отчет по событиям на {args.rows // 4} и {args.rows} строк...")
+    small = measure(args.rows // 4)
+    large = measure(args.rows)
+    growth_kb = (large - small) * 1024 / ((args.rows - args.rows // 4) / 1000)
+
+    failed = False
+    if large > args.max_mb:
+        failed = True
+        print(f"❌ Пик {large:.1f} МБ больше допустимых {args.max_mb:g} МБ")
+    if growth_kb > args.max_growth_kb:
+        failed = True
+        print(f"❌ Пик растет на {growth_kb:.0f} КБ на 1000 строк, допустимо {args.max_growth_kb:g} КБ")
+    if failed:
+        return 1
+    print(f"🎉 Память ограничена: пик {large:.1f} МБ, рост {growth_kb:.0f} КБ на 1000 строк")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
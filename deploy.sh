@@ -42,7 +42,7 @@ pip install -r requirements.txt
 
 # Инициализируем базу данных
 echo "🗄️ Инициализируем базу данных..."
-python -c "from app import app, db; app.app_context().push(); db.create_all()"
+flask --app app init-db
 
 echo "✅ Готово к деплою!"
 echo ""
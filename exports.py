@@ -0,0 +1,230 @@
+"""Выгрузки таблиц в CSV и XLSX: запросы строк и потоковая запись файлов"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+import csv
+import io
+import math
+import zipfile
+
+from models import db, Vehicle, Contractor, EventJournal, CashFlow
+
+# Сколько строк читать из БД за раз при выгрузке и отдавать одним куском CSV
+EXPORT_CHUNK_SIZE = 1000
+
+# Служебные части XLSX: лист один, стили - только формат даты (1) и даты со временем (2)
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd h:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_END = '</sheetData></worksheet>'
+
+def vehicles_export_query():
+    return db.session.query(
+        Vehicle.id, Vehicle.call_sign, Vehicle.brand, Vehicle.model, Vehicle.year,
+        Vehicle.engine_volume, Vehicle.vin_code, Vehicle.license_plate, Vehicle.mileage,
+        Vehicle.last_to_date, Vehicle.cost, Vehicle.payback_weeks, Vehicle.status, Vehicle.created_at
+    ).order_by(Vehicle.id).yield_per(EXPORT_CHUNK_SIZE)
+
+def contractors_export_query():
+    return db.session.query(
+        Contractor.id, Contractor.contractor_type, Contractor.subtype, Contractor.name,
+        Contractor.phone, Contractor.location, Contractor.notes, Contractor.created_at
+    ).order_by(Contractor.id).yield_per(EXPORT_CHUNK_SIZE)
+
+def events_export_query():
+    return db.session.query(
+        EventJournal.id, EventJournal.date, EventJournal.event_type, EventJournal.subtype,
+        Vehicle.call_sign, Contractor.name, EventJournal.amount, EventJournal.description
+    ).select_from(EventJournal).outerjoin(
+        Vehicle, EventJournal.vehicle_id == Vehicle.id
+    ).outerjoin(
+        Contractor, EventJournal.contractor_id == Contractor.id
+    ).order_by(EventJournal.date, EventJournal.id).yield_per(EXPORT_CHUNK_SIZE)
+
+def cashflow_export_query():
+    return db.session.query(
+        CashFlow.date, CashFlow.income, CashFlow.expenses, CashFlow.credit_load, CashFlow.balance
+    ).order_by(CashFlow.date).yield_per(EXPORT_CHUNK_SIZE)
+
+# Выгрузки: набор данных -> (заголовок, запрос строк)
+EXPORTS = {
+    'vehicles': (
+        ['ID', 'Позывной', 'Марка', 'Модель', 'Год', 'Объем двигателя', 'VIN', 'Госномер',
+         'Пробег', 'Последнее ТО', 'Стоимость', 'Недель до окупаемости', 'Статус', 'Создано'],
+        vehicles_export_query
+    ),
+    'contractors': (
+        ['ID', 'Тип', 'Подтип', 'Наименование', 'Телефон', 'Геолокация', 'Примечания', 'Создано'],
+        contractors_export_query
+    ),
+    'events': (
+        ['ID', 'Дата', 'Тип', 'Подтип', 'ТС', 'Контрагент', 'Сумма', 'Описание'],
+        events_export_query
+    ),
+    'cashflow': (
+        ['Дата', 'Надходження', 'Видатки', 'Кредитне навантаження', 'Сальдо'],
+        cashflow_export_query
+    ),
+}
+
+def stream_csv(header, query):
+    """
+    Отдает CSV кусками по EXPORT_CHUNK_SIZE строк. Заголовок уходит клиенту
+    до выполнения запроса, в памяти только текущий кусок.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, чтобы Excel открыл UTF-8 с кириллицей
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for count, row in enumerate(query(), 1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+class ZipOutput:
+    """Поток без seek для zipfile: записанные байты забираются кусками через take()"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+def xlsx_cell(value, clean, to_excel):
+    """
+    XML ячейки строки листа. Строки пишутся inline без управляющих символов
+    (в XML их записать нельзя), даты - числом Excel с форматом даты,
+    NaN и бесконечности - пустой ячейкой.
+    """
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        if isinstance(value, float) and not math.isfinite(value):
+            return '<c/>'
+        if isinstance(value, Decimal) and not value.is_finite():
+            return '<c/>'
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        return f'<c s="2"><v>{to_excel(value)}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="1"><v>{to_excel(value)}</v></c>'
+    text = escape(clean.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def stream_xlsx(title, header, query):
+    """
+    Отдает XLSX, собирая zip по ходу чтения запроса: служебные части и заголовок
+    листа уходят клиенту сразу, строки - сжатыми кусками по EXPORT_CHUNK_SIZE.
+    Ни временного файла, ни всей выгрузки в памяти. openpyxl (и за ним Pillow)
+    импортируется здесь, а не при старте: из него берутся только очистка строк
+    и перевод дат в числа Excel.
+    """
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    from openpyxl.utils.datetime import to_excel
+
+    output = ZipOutput()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(title=escape(title, {'"': '&quot;'})))
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', XLSX_STYLES)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            rows = [XLSX_SHEET_START, '<row>']
+            rows.extend(xlsx_cell(value, ILLEGAL_CHARACTERS_RE, to_excel) for value in header)
+            rows.append('</row>')
+            sheet.write(''.join(rows).encode('utf-8'))
+            yield output.take()
+
+            rows = []
+            for count, row in enumerate(query(), 1):
+                rows.append('<row>')
+                rows.extend(xlsx_cell(value, ILLEGAL_CHARACTERS_RE, to_excel) for value in row)
+                rows.append('</row>')
+                if count % EXPORT_CHUNK_SIZE == 0:
+                    sheet.write(''.join(rows).encode('utf-8'))
+                    rows = []
+                    chunk = output.take()
+                    if chunk:
+                        yield chunk
+            rows.append(XLSX_SHEET_END)
+            sheet.write(''.join(rows).encode('utf-8'))
+    yield output.take()
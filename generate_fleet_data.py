@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетического автопарка для нагрузочных тестов и бенчмарков.
+Заполняет пустую базу ТС, контрагентами, журналом событий и уведомлениями;
+при одинаковых --seed и --end-date данные получаются одинаковыми.
+Строки пишутся пачками мимо ORM (SQLite - executemany, PostgreSQL - COPY), индексы
+журнала и полнотекстовый индекс на время загрузки снимаются и строятся заново,
+денежный поток, помесячная сводка и счетчики пересчитываются из журнала в конце.
+
+Запуск: python generate_fleet_data.py [--vehicles 5000] [--contractors 2000] [--events 2000000]
+        [--notifications 20000] [--days 730] [--seed 42] [--end-date 2026-01-31] [--database-url URL]
+По умолчанию используется DATABASE_URL приложения; база должна быть пустой.
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+from types import SimpleNamespace
+
+BRANDS = {
+    'Toyota': ['Camry', 'Corolla', 'Prius', 'RAV4'],
+    'Skoda': ['Octavia', 'Superb', 'Fabia'],
+    'Volkswagen': ['Passat', 'Golf', 'Jetta'],
+    'Hyundai': ['Elantra', 'Sonata', 'Tucson'],
+    'Kia': ['Ceed', 'Optima', 'Sportage'],
+    'Renault': ['Logan', 'Megane', 'Duster'],
+    'Nissan': ['Leaf', 'Qashqai'],
+}
+CITIES = ['Київ', 'Львів', 'Одеса', 'Дніпро', 'Харків', 'Вінниця', 'Полтава']
+PLATE_LETTERS = 'ABCEHIKMOPTX'
+
+# (тип, подтип, доля, минимальная и максимальная сумма, нужен ли контрагент)
+EVENT_MIX = [
+    ('надходження', 'ОРЕНДА', 50, 1500, 6000, True),
+    ('надходження', 'ЗАВДАТОК', 2, 5000, 20000, True),
+    ('надходження', 'КОМПЕНСАЦІЯ', 2, 500, 10000, True),
+    ('видатки', 'ПОЛОМКА', 8, 300, 15000, True),
+    ('видатки', 'ПЛАНОВИЙ РЕМОНТ', 6, 1000, 8000, True),
+    ('видатки', 'ПОСТАНОВКА НА ТО', 4, 800, 3000, True),
+    ('видатки', 'ЗАРПЛАТА', 6, 8000, 25000, False),
+    ('видатки', 'ЛОГІСТИКА', 4, 200, 3000, False),
+    ('видатки', 'ДТП', 1, 2000, 60000, True),
+    ('державні', 'ШТРАФ', 3, 340, 3400, False),
+    ('державні', 'ПОДАТКИ', 3, 1000, 20000, False),
+    ('державні', 'СТАХУВАННЯ', 4, 2000, 12000, True),
+    ('інвестиції', 'КРЕДИТ', 3, 10000, 100000, True),
+    ('інвестиції', 'ОБЛАДНАННЯ', 4, 1000, 30000, True),
+]
+EVENT_NOTES = [
+    'плановий платіж', 'заміна масла', 'гальмівні колодки', 'шини', 'мийка', 'ремонт підвіски',
+    'доставка запчастин', 'оплата за тиждень', 'поліс ОСЦПВ', 'діагностика', 'кузовний ремонт',
+]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Синтетический автопарк для бенчмарков')
+    parser.add_argument('--vehicles', type=int, default=5000, help='Количество ТС')
+    parser.add_argument('--contractors', type=int, default=2000, help='Количество контрагентов')
+    parser.add_argument('--events', type=int, default=2000000, help='Событий в журнале')
+    parser.add_argument('--notifications', type=int, default=20000, help='Уведомлений')
+    parser.add_argument('--days', type=int, default=730, help='За сколько дней до --end-date распределить события')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help='Последний день журнала (по умолчанию сегодня)')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора случайных чисел')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Строк в одной пачке вставки')
+    parser.add_argument('--database-url', help='База для заполнения (по умолчанию DATABASE_URL)')
+    return parser.parse_args(argv)
+
+def timestamp(day, seconds):
+    """Дата-время в формате, в котором SQLAlchemy хранит DateTime в SQLite (PostgreSQL его тоже принимает)"""
+    return f'{day} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.000000'
+
+def bulk_insert(connection, table, columns, rows):
+    """Вставляет пачку кортежей: PostgreSQL - COPY, SQLite - executemany, прочие - INSERT через SQLAlchemy"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+    elif dialect == 'sqlite':
+        connection.exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        )
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+def vehicle_rows(rng, count, today):
+    for number in range(1, count + 1):
+        brand = rng.choice(list(BRANDS))
+        yield (
+            number, brand, rng.choice(BRANDS[brand]), rng.randint(2012, 2024), rng.choice([1.4, 1.6, 1.8, 2.0, 2.5]),
+            f'SYN{number:014d}',
+            f'{rng.choice(PLATE_LETTERS)}{rng.choice(PLATE_LETTERS)}{number:06d}{rng.choice(PLATE_LETTERS)}',
+            f'FM-{number:05d}', rng.randint(10000, 400000), round(rng.uniform(6000, 30000), 2),
+            'active' if rng.random() < 0.9 else 'inactive', f'{today} 00:00:00.000000',
+        )
+
+def contractor_rows(rng, count, contractor_types, today):
+    for number in range(1, count + 1):
+        # Каждый второй контрагент - арендатор: аренда - самый частый тип события
+        contractor_type = 'Орендар' if number % 2 else rng.choice(contractor_types)
+        yield (
+            number, contractor_type, f'{contractor_type} {number}', f'+380{rng.randint(500000000, 999999999)}',
+            rng.choice(CITIES), f'{today} 00:00:00.000000',
+        )
+
+def event_rows(rng, count, first_day, days, vehicles, renters, contractors, admin_id):
+    """
+    События по возрастанию даты: id растет вместе с датой, как при обычной работе.
+    Это самый горячий цикл генератора, поэтому веса, подписи дат и времени считаются заранее,
+    а вместо randint/uniform используется random()
+    """
+    kinds = [(event_type, subtype, low, high - low, with_contractor, subtype.lower())
+             for event_type, subtype, _, low, high, with_contractor in EVENT_MIX]
+    cum_weights = list(accumulate(kind[2] for kind in EVENT_MIX))
+    day_labels = [(first_day + timedelta(days=offset)).isoformat() for offset in range(days)]
+    # Время событий - с 8:00 до 20:00
+    time_labels = [timestamp('', 8 * 3600 + seconds)[1:] for seconds in range(12 * 3600)]
+    per_day = count / days
+    random_value = rng.random
+    choose = rng.choices
+    renter_count = len(renters)
+    for number in range(1, count + 1):
+        event_type, subtype, low, spread, with_contractor, label = choose(kinds, cum_weights=cum_weights)[0]
+        vehicle_id = int(random_value() * vehicles) + 1
+        contractor_id = None
+        if with_contractor:
+            if subtype == 'ОРЕНДА':
+                contractor_id = renters[int(random_value() * renter_count)]
+            else:
+                contractor_id = int(random_value() * contractors) + 1
+        created = f'{day_labels[min(int((number - 1) / per_day), days - 1)]} {time_labels[(number * 37) % 43200]}'
+        yield (
+            number, created, event_type, subtype, vehicle_id, contractor_id, round(low + spread * random_value(), 2),
+            f'{label} FM-{vehicle_id:05d} {EVENT_NOTES[int(random_value() * len(EVENT_NOTES))]}', admin_id, created,
+        )
+
+def notification_rows(rng, count, vehicles, renters, end_date, vehicle_labels, renter_names):
+    from services import rental_payment_message, RENTAL_NOTIFICATION_TITLE
+    for number in range(1, count + 1):
+        vehicle_id = rng.randint(1, vehicles)
+        vehicle = SimpleNamespace(**vehicle_labels[vehicle_id])
+        due_date = end_date + timedelta(days=rng.randint(-30, 14))
+        is_read = rng.random() < 0.7
+        if rng.random() < 0.8:
+            contractor_id = rng.choice(renters)
+            amount = round(rng.uniform(1500, 6000), 2)
+            message = rental_payment_message(
+                vehicle, SimpleNamespace(name=renter_names[contractor_id]), amount
+            )
+            row = ('rental_payment', RENTAL_NOTIFICATION_TITLE, message, vehicle_id, contractor_id, amount)
+        else:
+            message = (f'Страховка для {vehicle.brand} {vehicle.model} ({vehicle.license_plate}) закінчується '
+                       f'через 7 днів ({(due_date + timedelta(days=7)).strftime("%d.%m.%Y")})')
+            row = ('insurance', 'Нагадування про страховку', message, vehicle_id, None, 0)
+        yield (number,) + row + (
+            due_date.isoformat(), int(is_read), int(is_read and due_date < end_date),
+            f'{due_date - timedelta(days=7)} 09:00:00.000000',
+        )
+
+def insert_batches(connection, table, columns, rows, batch_size):
+    batch = []
+    inserted = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            bulk_insert(connection, table, columns, batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        bulk_insert(connection, table, columns, batch)
+        inserted += len(batch)
+    advance_id_sequence(connection, table)
+    return inserted
+
+def advance_id_sequence(connection, table):
+    """
+    Строки загружены с явными id, поэтому последовательность PostgreSQL не сдвинулась:
+    ставим ее за максимальный id, иначе первая обычная вставка из приложения получит занятый ключ
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT coalesce(max(id), 0) + 1 FROM {table.name}), false)"
+        )
+
+def drop_load_indexes(connection):
+    """
+    Снимает вторичные индексы журнала и уведомлений и полнотекстовый индекс:
+    вставка без них в разы быстрее, после загрузки все строится заново одним проходом
+    """
+    from models import EventJournal, Notification
+    from services import SEARCH_SOURCES
+
+    for model in (EventJournal, Notification):
+        for index in model.__table__.indexes:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS {index.name}')
+    if connection.dialect.name == 'sqlite':
+        for table, _, _ in SEARCH_SOURCES.values():
+            for action in ('insert', 'delete', 'update'):
+                connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS search_index_{table}_{action}')
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
+    elif connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('DROP INDEX IF EXISTS ix_event_journal_search_vector')
+
+def generate(vehicles=5000, contractors=2000, events=2000000, notifications=20000, days=730,
+             end_date=None, seed=42, batch_size=50000):
+    """
+    Заполняет пустую базу приложения (DATABASE_URL должен быть задан до вызова).
+    Возвращает количество строк по таблицам и время загрузки в секундах.
+    """
+    import services
+    from app import create_app
+    from models import db, Vehicle, Contractor, EventJournal, Notification, AppCounter, User
+
+    app = create_app()
+    services.init_database(app)
+    end_date = end_date or date.today()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    with app.app_context():
+        if db.session.query(Vehicle.id).first() or db.session.query(EventJournal.id).first():
+            raise RuntimeError('база не пуста: генератор заполняет только новую базу')
+        admin_id = db.session.query(User.id).filter_by(username='admin').scalar()
+        today = date.today().isoformat()
+
+        vehicle_columns = ['id', 'brand', 'model', 'year', 'engine_volume', 'vin_code', 'license_plate',
+                           'call_sign', 'mileage', 'cost', 'status', 'created_at']
+        vehicle_data = list(vehicle_rows(rng, vehicles, today))
+        vehicle_labels = {row[0]: {'brand': row[1], 'model': row[2], 'license_plate': row[6]} for row in vehicle_data}
+        contractor_data = list(contractor_rows(rng, contractors, services.CONTRACTOR_TYPES, today))
+        renters = [row[0] for row in contractor_data if row[1] == 'Орендар']
+        renter_names = {row[0]: row[2] for row in contractor_data if row[1] == 'Орендар'}
+
+        with db.engine.begin() as connection:
+            drop_load_indexes(connection)
+            insert_batches(connection, Vehicle.__table__, vehicle_columns, vehicle_data, batch_size)
+            insert_batches(connection, Contractor.__table__,
+                           ['id', 'contractor_type', 'name', 'phone', 'location', 'created_at'],
+                           contractor_data, batch_size)
+            print(f"🚗 ТС: {vehicles}, контрагентов: {contractors} ({time.perf_counter() - started:.1f} с)")
+
+            insert_batches(connection, EventJournal.__table__,
+                           ['id', 'date', 'event_type', 'subtype', 'vehicle_id', 'contractor_id', 'amount',
+                            'description', 'created_by', 'created_at'],
+                           event_rows(rng, events, end_date - timedelta(days=days - 1), days,
+                                      vehicles, renters, contractors, admin_id),
+                           batch_size)
+            print(f"📒 Событий: {events} ({time.perf_counter() - started:.1f} с)")
+
+            insert_batches(connection, Notification.__table__,
+                           ['id', 'type', 'title', 'message', 'vehicle_id', 'contractor_id', 'amount',
+                            'due_date', 'is_read', 'is_processed', 'created_at'],
+                           notification_rows(rng, notifications, vehicles, renters, end_date,
+                                             vehicle_labels, renter_names),
+                           batch_size)
+            print(f"🔔 Уведомлений: {notifications} ({time.perf_counter() - started:.1f} с)")
+
+        # Индексы, поиск и производные таблицы строятся по уже загруженным данным
+        services.ensure_indexes()
+        services.ensure_search_index()
+        print(f"🗂️ Индексы построены ({time.perf_counter() - started:.1f} с)")
+
+        services.reconcile_cashflow(apply=True)
+        services.rebuild_monthly_stats()
+        services.recount_unread_notifications()
+        # Сгенерированные события считаются уже обработанными генератором уведомлений
+        services.get_rental_watermark()
+        db.session.execute(
+            db.update(AppCounter)
+            .where(AppCounter.name == services.RENTAL_NOTIFICATIONS_WATERMARK)
+            .values(value=events)
+        )
+        # Данные записаны мимо ORM - версии всех таблиц увеличатся при COMMIT
+        services.mark_changed_tables(db.session, services.VERSIONED_TABLES)
+        db.session.commit()
+        if db.engine.dialect.name in ('sqlite', 'postgresql'):
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql('ANALYZE')
+        print(f"📊 Денежный поток и сводки пересчитаны ({time.perf_counter() - started:.1f} с)")
+
+    return {
+        'vehicles': vehicles,
+        'contractors': contractors,
+        'events': events,
+        'notifications': notifications,
+        'seconds': round(time.perf_counter() - started, 1),
+    }
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    try:
+        result = generate(args.vehicles, args.contractors, args.events, args.notifications, args.days,
+                          args.end_date, args.seed, args.batch_size)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"🎉 База заполнена за {result['seconds']} с")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Настройки gunicorn (файл подхватывается автоматически из рабочей папки).
+С preload приложение импортируется один раз в мастере, а воркеры получают его
+через fork и делят страницы памяти copy-on-write. GUNICORN_PRELOAD=0 отключает.
+"""
+
+import gc
+import os
+import tempfile
+
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+# Метрики Prometheus: каждый воркер пишет свои значения в файлы этой папки,
+# /metrics суммирует их. Переменная должна быть задана до импорта приложения
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), f'fleet-metrics-{os.getpid()}'))
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from prometheus_client import multiprocess
+
+def on_starting(server):
+    # Значения от прошлого запуска не должны попасть в счетчики
+    folder = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+
+def pre_fork(server, worker):
+    # Объекты, созданные при импорте, больше не трогаются сборщиком мусора,
+    # иначе он пишет в их заголовки и страницы копируются в каждый воркер
+    gc.freeze()
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # Соединения из пула мастера не должны попасть в воркеры. С preload приложение
+    # уже собрано в мастере (app:create_app()) - берем его у gunicorn
+    from models import db
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
+
+def child_exit(server, worker):
+    # Живые показатели (запросы в обработке, пул) умершего воркера больше не учитываются
+    multiprocess.mark_process_dead(worker.pid)
@@ -4,11 +4,9 @@
 Запускается отдельно после деплоя
 """
 
-import os
-from app import app, db, init_database
+from app import create_app, init_database
 
 if __name__ == '__main__':
-    with app.app_context():
-        print("🗄️ Инициализация базы данных...")
-        init_database()
-        print("✅ База данных успешно инициализирована!")
+    print("🗄️ Инициализация базы данных...")
+    init_database(create_app())
+    print("✅ База данных успешно инициализирована!")
@@ -0,0 +1,148 @@
+"""
+Замер SQL (Server-Timing и журнал медленных запросов) и метрики Prometheus.
+Обработчики подключаются к приложению и движку БД в app.create_app.
+"""
+
+from flask import current_app, request, g, has_request_context
+from functools import lru_cache
+from prometheus_client import Counter, Gauge, Histogram
+import json
+import logging
+import os
+import re
+import time
+
+# Логи замера SQL: по строке JSON на запрос и на медленное выражение
+sql_log = logging.getLogger('fleet.sql')
+sql_log.setLevel(logging.INFO)
+sql_log.propagate = False
+
+def setup_sql_log(path):
+    """Журнал медленных запросов пишется в файл path или в stderr; обработчик ставится один раз"""
+    if sql_log.handlers:
+        return
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    sql_log.addHandler(handler)
+
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|(?<!:):\w+|\$\d+")
+SQL_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+SQL_VALUES_RE = re.compile(r'(VALUES\s*\(\?\))(?:\s*,\s*\(\?\))+', re.IGNORECASE)
+SQL_STATEMENT_MAX_LENGTH = 500
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement):
+    """
+    Приводит выражение к шаблону: литералы и параметры -> ?, списки IN и строки VALUES
+    сворачиваются, пробелы схлопываются. Одинаковые запросы с разными значениями дают одну строку.
+    """
+    statement = ' '.join(statement.split())
+    statement = SQL_LITERAL_RE.sub('?', statement)
+    statement = SQL_LIST_RE.sub('(?)', statement)
+    statement = SQL_VALUES_RE.sub(r'\1', statement)
+    return statement[:SQL_STATEMENT_MAX_LENGTH]
+
+def before_sql_execute(conn, cursor, statement, parameters, context, executemany):
+    context.sql_started = time.perf_counter()
+
+def after_sql_execute(config, conn, cursor, statement, parameters, context, executemany):
+    """Учитывает выражение в статистике текущего HTTP-запроса и в журнале медленных"""
+    elapsed_ms = (time.perf_counter() - context.sql_started) * 1000
+    stats = g.get('sql_stats') if has_request_context() else None
+    if stats is not None:
+        stats['count'] += 1
+        stats['time_ms'] += elapsed_ms
+        slowest = stats['slowest']
+        if len(slowest) < config['SQL_TIMING_TOP'] or elapsed_ms > slowest[-1][0]:
+            slowest.append((elapsed_ms, statement))
+            slowest.sort(key=lambda item: item[0], reverse=True)
+            del slowest[config['SQL_TIMING_TOP']:]
+    if elapsed_ms >= config['SLOW_QUERY_MS']:
+        sql_log.warning(json.dumps({
+            'event': 'slow_query',
+            'ms': round(elapsed_ms, 2),
+            'statement': normalize_sql(statement),
+            'executemany': executemany,
+            'path': request.path if has_request_context() else None,
+        }, ensure_ascii=False))
+
+def start_sql_timing():
+    g.sql_stats = {'count': 0, 'time_ms': 0.0, 'slowest': [], 'started': time.perf_counter()}
+
+def report_sql_timing(response):
+    """Server-Timing и строка лога со статистикой SQL запроса"""
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    total_ms = (time.perf_counter() - stats['started']) * 1000
+    response.headers.add('Server-Timing', f'db;dur={stats["time_ms"]:.1f};desc="{stats["count"]} queries"')
+    response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+    line = json.dumps({
+        'event': 'request',
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'ms': round(total_ms, 2),
+        'db_ms': round(stats['time_ms'], 2),
+        'queries': stats['count'],
+        'slowest': [{'ms': round(ms, 2), 'statement': normalize_sql(statement)} for ms, statement in stats['slowest']],
+    }, ensure_ascii=False)
+    if stats['count'] >= current_app.config['SLOW_REQUEST_QUERIES']:
+        sql_log.warning(line)
+    else:
+        sql_log.info(line)
+    return response
+
+# Метрики Prometheus. Под gunicorn значения каждого воркера пишутся в файлы папки
+# PROMETHEUS_MULTIPROC_DIR (задается в gunicorn.conf.py) и суммируются при выдаче /metrics
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+REPORT_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+REPORT_SIZE_BUCKETS = (10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7, 5 * 10 ** 7, 10 ** 8, 5 * 10 ** 8)
+
+HTTP_REQUESTS = Counter('fleet_http_requests_total', 'HTTP-запросы', ['method', 'endpoint', 'status'])
+HTTP_LATENCY = Histogram('fleet_http_request_duration_seconds', 'Время обработки HTTP-запроса',
+                         ['method', 'endpoint'], buckets=HTTP_LATENCY_BUCKETS)
+HTTP_IN_PROGRESS = Gauge('fleet_http_requests_in_progress', 'Запросы в обработке', multiprocess_mode='livesum')
+DB_POOL_CHECKED_OUT = Gauge('fleet_db_pool_checked_out', 'Соединения БД, выданные из пула',
+                            multiprocess_mode='livesum')
+DB_POOL_OVERFLOW = Gauge('fleet_db_pool_overflow', 'Соединения БД сверх pool_size', multiprocess_mode='livesum')
+REPORTS_TOTAL = Counter('fleet_reports_total', 'Выданные PDF-отчеты', ['report_type', 'mode', 'source'])
+REPORT_DURATION = Histogram('fleet_report_duration_seconds', 'Время верстки PDF-отчета',
+                            ['report_type', 'mode'], buckets=REPORT_DURATION_BUCKETS)
+REPORT_SIZE = Histogram('fleet_report_size_bytes', 'Размер PDF-отчета', ['report_type'], buckets=REPORT_SIZE_BUCKETS)
+
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    HTTP_IN_PROGRESS.inc()
+
+def record_request_metrics(error=None):
+    """Учитывает запрос в метриках; выполняется и после необработанного исключения"""
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    HTTP_IN_PROGRESS.dec()
+    endpoint = request.endpoint or 'unknown'
+    status = 500 if error is not None else g.pop('response_status', 500)
+    HTTP_REQUESTS.labels(request.method, endpoint, status).inc()
+    HTTP_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+
+def remember_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+def update_pool_metrics(engine, *args):
+    """Обновляет метрики пула при выдаче и возврате соединения"""
+    pool = engine.pool
+    if hasattr(pool, 'checkedout'):
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+def observe_report(report_type, mode, started, path):
+    """Записывает время верстки и размер отчета; started=None - отчет взят из кеша"""
+    if started is None:
+        REPORTS_TOTAL.labels(report_type, mode, 'cache').inc()
+        return
+    REPORTS_TOTAL.labels(report_type, mode, 'built').inc()
+    REPORT_DURATION.labels(report_type, mode).observe(time.perf_counter() - started)
+    REPORT_SIZE.labels(report_type).observe(os.path.getsize(path))
@@ -0,0 +1,143 @@
+"""Модели данных; объект БД подключается к приложению в app.create_app"""
+
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
+from datetime import datetime
+
+db = SQLAlchemy()
+
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(120), nullable=False)
+    role = db.Column(db.String(20), default='user')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Vehicle(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    brand = db.Column(db.String(50), nullable=False)  # Марка
+    model = db.Column(db.String(50), nullable=False)  # Модель
+    year = db.Column(db.Integer, nullable=False)  # Год
+    engine_volume = db.Column(db.Float)  # Объем двигателя
+    vin_code = db.Column(db.String(17), unique=True, nullable=False)  # VIN код
+    license_plate = db.Column(db.String(20), unique=True, nullable=False)  # Госномер
+    call_sign = db.Column(db.String(20), unique=True, nullable=False)  # Позывной
+    mileage = db.Column(db.Integer, default=0)  # Пробег
+    last_to_date = db.Column(db.Date)  # Дата последнего ТО (из журнала событий)
+    breakdown_history = db.Column(db.Text)  # История поломок (из журнала событий)
+    cost = db.Column(db.Float, default=0)  # Стоимость
+    payback_weeks = db.Column(db.Integer)  # Недель до окупаемости
+    payment_history = db.Column(db.Text)  # История платежей (из журнала событий)
+    status = db.Column(db.String(20), default='active')
+    photo_filename = db.Column(db.String(255))  # Имя файла фото
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CashFlow(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)  # Дата
+    income = db.Column(db.Float, default=0)  # Надходження
+    expenses = db.Column(db.Float, default=0)  # Видатки
+    balance = db.Column(db.Float, default=0)  # Сальдо
+    credit_load = db.Column(db.Float, default=0)  # Кредитне навантаження
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Одна запись на день - цель атомарного upsert в apply_cashflow_delta
+        db.Index('uq_cash_flow_date', 'date', unique=True),
+    )
+
+class Contractor(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    contractor_type = db.Column(db.String(50), nullable=False)  # Тип контрагента
+    subtype = db.Column(db.String(100))  # Підтип
+    name = db.Column(db.String(200), nullable=False)  # Найменування
+    phone = db.Column(db.String(20))  # Телефон
+    location = db.Column(db.String(200))  # Геолокація
+    notes = db.Column(db.Text)  # Примітки
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class EventJournal(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Дата события
+    event_type = db.Column(db.String(50), nullable=False)  # ТИП события
+    subtype = db.Column(db.String(100), nullable=False)  # ПІДТИП события
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))  # ОБ'ЄКТ (ТС)
+    contractor_id = db.Column(db.Integer, db.ForeignKey('contractor.id'))  # Контрагент
+    amount = db.Column(db.Float, default=0)  # Сумма
+    description = db.Column(db.Text)  # Описание события
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    vehicle = db.relationship('Vehicle', backref='events')
+    contractor = db.relationship('Contractor', backref='events')
+    user = db.relationship('User', backref='events')
+
+    __table_args__ = (
+        # События по ТС / контрагенту, отсортированные по дате
+        db.Index('ix_event_journal_vehicle_date', 'vehicle_id', 'date'),
+        db.Index('ix_event_journal_contractor_date', 'contractor_id', 'date'),
+        # Арендные платежи (тип + подтип) после водяного знака генератора уведомлений, по id
+        db.Index('ix_event_journal_type_subtype_id', 'event_type', 'subtype', 'id'),
+        # Лента журнала и keyset-пагинация по (date, id)
+        db.Index('ix_event_journal_date_id', 'date', 'id'),
+    )
+
+class MonthlyEventStats(db.Model):
+    """Помесячная сводка журнала событий по типам (для графиков панели управления)"""
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, nullable=False)  # Первый день месяца
+    event_type = db.Column(db.String(50), nullable=False)  # ТИП события
+    events_count = db.Column(db.Integer, nullable=False, default=0)  # Количество событий
+    total_amount = db.Column(db.Float, nullable=False, default=0)  # Сумма событий
+
+    __table_args__ = (
+        db.UniqueConstraint('month', 'event_type', name='uq_monthly_event_stats_month_type'),
+    )
+
+class Notification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(50), nullable=False)  # 'insurance' или 'rental_payment'
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'))
+    contractor_id = db.Column(db.Integer, db.ForeignKey('contractor.id'))
+    due_date = db.Column(db.Date, nullable=False)  # Дата, когда должно произойти событие
+    amount = db.Column(db.Float, default=0)  # Сумма для платежа
+    is_read = db.Column(db.Boolean, default=False)
+    is_processed = db.Column(db.Boolean, default=False)  # Обработано ли уведомление
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    vehicle = db.relationship('Vehicle', backref='notifications')
+    contractor = db.relationship('Contractor', backref='notifications')
+
+    __table_args__ = (
+        # Проверка дубликатов перед созданием уведомления
+        db.Index('ix_notification_dedup', 'type', 'vehicle_id', 'contractor_id', 'due_date'),
+        # Счетчик непрочитанных
+        db.Index('ix_notification_is_read', 'is_read'),
+    )
+
+class ReportJob(db.Model):
+    """Задача фоновой генерации отчета"""
+    id = db.Column(db.Integer, primary_key=True)
+    report_type = db.Column(db.String(20), nullable=False)  # vehicles / events / cashflow
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued / running / done / failed
+    total_rows = db.Column(db.Integer)  # Оценка количества строк (для прогресса)
+    file_path = db.Column(db.String(255))  # Готовый PDF
+    file_size = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # История отчетов пользователя
+        db.Index('ix_report_job_created_by', 'created_by', 'created_at'),
+    )
+
+class AppCounter(db.Model):
+    """Денормализованные счетчики, общие для всех воркеров (вместо COUNT(*) на каждый запрос)"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
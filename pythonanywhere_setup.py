@@ -79,7 +79,8 @@ path = '/home/yourusername/fleet-management'
 if path not in sys.path:
     sys.path.append(path)
 
-from app import app as application
+from app import create_app
+application = create_app()
 ```
 
 ## Шаг 5: Установите зависимости
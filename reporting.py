@@ -0,0 +1,490 @@
+"""
+PDF-отчеты: верстка кусками, кеш готовых файлов и фоновые задачи в пулах процессов.
+"""
+
+from flask import current_app, url_for
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, islice
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from models import db, Vehicle, Contractor, EventJournal, CashFlow, ReportJob
+from services import get_data_versions
+from instrumentation import observe_report
+
+# Сколько строк отчета читать из БД и верстать одним куском таблицы
+REPORT_CHUNK_SIZE = 500
+
+# Сколько строк верстать в один PDF. ReportLab держит готовые страницы в памяти до
+# сохранения файла, поэтому отчет длиннее пишется zip-архивом из нескольких PDF:
+# пик памяти определяется размером части, а не числом строк
+REPORT_PART_ROWS = 10000
+
+# Первые байты zip-архива - так при отдаче отличается отчет из нескольких частей
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+def build_pdf_report(output, title, header, rows, col_fractions, header_font_size=12):
+    """
+    Верстает отчет-таблицу в файл output: до REPORT_PART_ROWS строк - один PDF,
+    больше - zip с частями part_001.pdf, part_002.pdf, ... по REPORT_PART_ROWS строк.
+    Каждая часть верстается во временный файл и переносится в output потоком.
+    """
+    rows = iter(rows)
+    with tempfile.TemporaryFile() as part_file:
+        build_pdf_part(part_file, title, header, islice(rows, REPORT_PART_ROWS), col_fractions, header_font_size)
+        next_row = next(rows, None)
+        part_file.seek(0)
+        if next_row is None:
+            shutil.copyfileobj(part_file, output)
+            return
+
+        # PDF уже сжат постранично, в архиве части только хранятся
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+            part = 1
+            while True:
+                with archive.open(f'part_{part:03d}.pdf', 'w', force_zip64=True) as entry:
+                    shutil.copyfileobj(part_file, entry)
+                if next_row is None:
+                    break
+                part += 1
+                part_file.seek(0)
+                part_file.truncate()
+                part_rows = chain([next_row], islice(rows, REPORT_PART_ROWS - 1))
+                build_pdf_part(part_file, f'{title} (часть {part})', header, part_rows,
+                               col_fractions, header_font_size)
+                next_row = next(rows, None)
+                part_file.seek(0)
+
+def build_pdf_part(output, title, header, rows, col_fractions, header_font_size):
+    """
+    Верстает один PDF в файл output. Строки читаются из итератора и
+    складываются в LongTable по REPORT_CHUNK_SIZE строк с повтором заголовка на каждой странице;
+    куски создаются по мере верстки, страницы сжимаются при сохранении (pageCompression).
+    col_fractions - доли ширины страницы для колонок (фиксированная ширина одинакова у всех кусков)
+    """
+    # ReportLab нужен только для PDF-отчетов, поэтому импортируется при первой верстке
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, LongTable, TableStyle
+
+    class ChunkedDocTemplate(SimpleDocTemplate):
+        """
+        Документ, который берет куски таблицы из итератора по мере верстки: перед каждым
+        flowable в очереди держится следующий кусок, в памяти одновременно лишь пара кусков.
+        """
+        def build(self, flowables, chunks):
+            self.story = flowables
+            self.chunks = chunks
+            super().build(flowables)
+
+        def handle_flowable(self, flowables):
+            # Через handle_flowable проходят и служебные действия начала страницы - дополняется только story
+            if flowables is self.story and len(flowables) < 2:
+                flowables.extend(islice(self.chunks, 1))
+            super().handle_flowable(flowables)
+
+    doc = ChunkedDocTemplate(output, pagesize=A4, pageCompression=1)
+    col_widths = [doc.width * fraction for fraction in col_fractions]
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30
+    )
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+    def tables():
+        chunk = [header]
+        emitted = False
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) > REPORT_CHUNK_SIZE:
+                yield LongTable(chunk, colWidths=col_widths, repeatRows=1, style=table_style)
+                chunk = [header]
+                emitted = True
+        if len(chunk) > 1 or not emitted:
+            yield LongTable(chunk, colWidths=col_widths, repeatRows=1, style=table_style)
+
+    doc.build([Paragraph(title, title_style), Spacer(1, 12)], tables())
+
+def vehicles_report_query():
+    """Строки отчета по ТС - только нужные колонки, потоково"""
+    return db.session.query(
+        Vehicle.call_sign, Vehicle.brand, Vehicle.model, Vehicle.year,
+        Vehicle.license_plate, Vehicle.mileage, Vehicle.cost, Vehicle.status
+    ).order_by(Vehicle.id).yield_per(REPORT_CHUNK_SIZE)
+
+def events_report_query():
+    """Строки отчета по событиям - только нужные колонки, описание обрезано в БД"""
+    return db.session.query(
+        EventJournal.date, EventJournal.event_type, EventJournal.subtype,
+        Vehicle.call_sign, Contractor.name.label('contractor_name'), EventJournal.amount,
+        db.func.substr(EventJournal.description, 1, 51).label('description')
+    ).select_from(EventJournal).join(
+        Vehicle, EventJournal.vehicle_id == Vehicle.id
+    ).outerjoin(
+        Contractor, EventJournal.contractor_id == Contractor.id
+    ).order_by(EventJournal.date, EventJournal.id).yield_per(REPORT_CHUNK_SIZE)
+
+def cashflow_report_query():
+    """Строки отчета по денежному потоку, потоково"""
+    return db.session.query(
+        CashFlow.date, CashFlow.income, CashFlow.expenses, CashFlow.credit_load, CashFlow.balance
+    ).order_by(CashFlow.date).yield_per(REPORT_CHUNK_SIZE)
+
+def generate_vehicles_report(vehicles, output):
+    rows = (
+        [
+            vehicle.call_sign,
+            vehicle.brand,
+            vehicle.model,
+            str(vehicle.year),
+            vehicle.license_plate,
+            f"{vehicle.mileage or 0:,} км",
+            f"{vehicle.cost or 0:,.2f} ₴",
+            vehicle.status
+        ]
+        for vehicle in vehicles
+    )
+    build_pdf_report(
+        output,
+        "Отчет по транспортным средствам",
+        ['Позывной', 'Марка', 'Модель', 'Год', 'Гос. номер', 'Пробег', 'Стоимость', 'Статус'],
+        rows,
+        [0.11, 0.12, 0.12, 0.07, 0.13, 0.15, 0.18, 0.12]
+    )
+
+def generate_events_report(events, output):
+    rows = (
+        [
+            event.date.strftime('%d.%m.%Y'),
+            event.event_type,
+            event.subtype,
+            event.call_sign or '-',
+            event.contractor_name or '-',
+            f"{event.amount or 0:,.2f} ₴",
+            event.description[:50] + '...' if event.description and len(event.description) > 50 else event.description or '-'
+        ]
+        for event in events
+    )
+    build_pdf_report(
+        output,
+        "Отчет по событиям",
+        ['Дата', 'Тип', 'Подтип', 'ТС', 'Контрагент', 'Сумма', 'Описание'],
+        rows,
+        [0.11, 0.11, 0.14, 0.08, 0.14, 0.12, 0.30],
+        header_font_size=10
+    )
+
+def generate_cashflow_report(cashflow_entries, output):
+    rows = (
+        [
+            entry.date.strftime('%d.%m.%Y'),
+            f"{entry.income or 0:,.2f} ₴",
+            f"{entry.expenses or 0:,.2f} ₴",
+            f"{entry.credit_load or 0:,.2f} ₴",
+            f"{entry.balance or 0:,.2f} ₴"
+        ]
+        for entry in cashflow_entries
+    )
+    build_pdf_report(
+        output,
+        "Отчет по денежным потокам",
+        ['Дата', 'Надходження', 'Видатки', 'Кредитне навантаження', 'Сальдо'],
+        rows,
+        [0.16, 0.2, 0.2, 0.24, 0.2]
+    )
+
+# Тип отчета -> (запрос строк, верстка, имя файла)
+REPORTS = {
+    'vehicles': (vehicles_report_query, generate_vehicles_report, 'vehicles_report.pdf'),
+    'events': (events_report_query, generate_events_report, 'events_report.pdf'),
+    'cashflow': (cashflow_report_query, generate_cashflow_report, 'cashflow_report.pdf'),
+}
+
+# Таблица, по которой оценивается количество строк отчета
+REPORT_ROW_MODELS = {
+    'vehicles': Vehicle,
+    'events': EventJournal,
+    'cashflow': CashFlow,
+}
+
+# Таблицы, от которых зависит содержимое отчета (ключ кеша)
+REPORT_DATA_TABLES = {
+    'vehicles': ['vehicle'],
+    'events': ['event_journal', 'vehicle', 'contractor'],
+    'cashflow': ['cash_flow'],
+}
+
+def report_cache_key(report_type):
+    """Ключ кеша отчета: тип отчета и версии прочитанных им таблиц"""
+    versions = get_data_versions(REPORT_DATA_TABLES[report_type])
+    source = json.dumps([report_type, sorted(versions.items())])
+    return hashlib.sha256(source.encode()).hexdigest()[:32]
+
+def report_cache_path(report_type, key):
+    return os.path.abspath(os.path.join(current_app.config['REPORT_CACHE_FOLDER'], f'{report_type}-{key}.pdf'))
+
+def get_cached_report(report_type, key):
+    """Путь к готовому отчету из кеша или None; попадание освежает запись для LRU"""
+    path = report_cache_path(report_type, key)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+def link_or_copy(source, target):
+    """Жесткая ссылка (без копирования данных), а если нельзя - копия"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def store_cached_report(report_type, key, source_path):
+    """Кладет готовый отчет в кеш и вытесняет давно не использованные файлы сверх лимита"""
+    os.makedirs(current_app.config['REPORT_CACHE_FOLDER'], exist_ok=True)
+    path = report_cache_path(report_type, key)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    link_or_copy(source_path, temp_path)
+    os.replace(temp_path, path)
+    evict_report_cache()
+    return path
+
+def report_download(report_type, path):
+    """Имя файла и MIME-тип готового отчета: отчет из нескольких частей отдается zip-архивом"""
+    download_name = REPORTS[report_type][2]
+    with open(path, 'rb') as report_file:
+        if report_file.read(len(ZIP_SIGNATURE)) == ZIP_SIGNATURE:
+            return download_name.replace('.pdf', '.zip'), 'application/zip'
+    return download_name, 'application/pdf'
+
+def evict_report_cache():
+    """LRU по времени последнего обращения (mtime): удаляет старые файлы, пока кеш больше лимита"""
+    limit = current_app.config['REPORT_CACHE_MAX_MB'] * 1024 * 1024
+    entries = []
+    with os.scandir(current_app.config['REPORT_CACHE_FOLDER']) as scanner:
+        for entry in scanner:
+            if entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+# Очередь отчета по типу: у каждой очереди свой пул процессов, поэтому короткий отчет
+# не ждет, пока в единственном процессе верстается журнал событий на сотни тысяч строк
+REPORT_QUEUES = {
+    'vehicles': 'small',
+    'events': 'large',
+    'cashflow': 'small',
+}
+
+# Настройка с размером пула очереди
+REPORT_QUEUE_WORKERS = {
+    'large': 'REPORT_WORKERS',
+    'small': 'REPORT_SMALL_WORKERS',
+}
+
+# Пулы процессов отчетов по очередям; создаются лениво в каждом воркере gunicorn (после fork)
+report_executors = {}
+report_executors_pid = None
+
+# Приложение процесса пула, создается в init_report_process
+report_app = None
+
+def init_report_process(config):
+    """
+    Процесс пула создает свое приложение с настройками воркера: у него свой движок БД,
+    и соединения, унаследованные от воркера, не используются
+    """
+    # Фабрика импортируется здесь: модуль app сам импортирует этот модуль через разделы
+    from app import create_app
+    global report_app
+    report_app = create_app(config)
+
+def get_report_executor(queue):
+    """Возвращает пул процессов очереди отчетов текущего воркера"""
+    global report_executors_pid
+    if report_executors_pid != os.getpid():
+        # Пулы, унаследованные при fork, принадлежат другому процессу
+        report_executors.clear()
+        report_executors_pid = os.getpid()
+    if queue not in report_executors:
+        report_executors[queue] = ProcessPoolExecutor(
+            max_workers=current_app.config[REPORT_QUEUE_WORKERS[queue]],
+            initializer=init_report_process,
+            initargs=(dict(current_app.config),)
+        )
+    return report_executors[queue]
+
+def report_progress_path(job_id):
+    return os.path.join(current_app.config['REPORTS_FOLDER'], f'job_{job_id}.progress')
+
+def track_report_progress(rows, job_id):
+    """
+    Пропускает строки отчета и раз в REPORT_CHUNK_SIZE строк записывает прогресс в файл рядом с отчетом.
+    Файл, а не БД: во время чтения курсор отчета держит транзакцию открытой.
+    """
+    path = report_progress_path(job_id)
+    count = 0
+    for count, row in enumerate(rows, 1):
+        yield row
+        if count % REPORT_CHUNK_SIZE == 0:
+            with open(path + '.tmp', 'w') as progress_file:
+                progress_file.write(str(count))
+            os.replace(path + '.tmp', path)
+
+def read_report_progress(job_id):
+    try:
+        with open(report_progress_path(job_id)) as progress_file:
+            return int(progress_file.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def run_report_job(job_id):
+    """Выполняется в процессе пула: верстает отчет в файл и обновляет статус задачи"""
+    with report_app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        query, builder, _ = REPORTS[job.report_type]
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        job.total_rows = db.session.query(db.func.count()).select_from(REPORT_ROW_MODELS[job.report_type]).scalar()
+        db.session.commit()
+
+        output_path = os.path.abspath(os.path.join(
+            current_app.config['REPORTS_FOLDER'], f'report_{job.id}_{job.report_type}.pdf'
+        ))
+        try:
+            key = report_cache_key(job.report_type)
+            cached_path = get_cached_report(job.report_type, key)
+            if cached_path:
+                link_or_copy(cached_path, output_path + '.part')
+                observe_report(job.report_type, 'job', None, cached_path)
+            else:
+                started = time.perf_counter()
+                with open(output_path + '.part', 'wb') as output:
+                    builder(track_report_progress(query(), job.id), output)
+                observe_report(job.report_type, 'job', started, output_path + '.part')
+                store_cached_report(job.report_type, key, output_path + '.part')
+            os.replace(output_path + '.part', output_path)
+            job.status = 'done'
+            job.file_path = output_path
+            job.file_size = os.path.getsize(output_path)
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(output_path + '.part'):
+                os.remove(output_path + '.part')
+            job = db.session.get(ReportJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            if os.path.exists(report_progress_path(job_id)):
+                os.remove(report_progress_path(job_id))
+
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def report_job_finished(app, job_id, future):
+    """Помечает задачу упавшей, если процесс пула завершился аварийно"""
+    error = 'cancelled' if future.cancelled() else future.exception()
+    if error is None:
+        return
+    with app.app_context():
+        db.session.execute(
+            db.update(ReportJob)
+            .where(ReportJob.id == job_id, ReportJob.status.in_(['queued', 'running']))
+            .values(status='failed', error=str(error), finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+def fail_stale_report_jobs():
+    """
+    Помечает упавшими задачи, которые дольше REPORT_JOB_TIMEOUT_MINUTES стоят в очереди
+    или выполняются: их пул погиб вместе с перезапущенным воркером, и статус уже не изменится
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=current_app.config['REPORT_JOB_TIMEOUT_MINUTES'])
+    failed = db.session.execute(
+        db.update(ReportJob)
+        .where(
+            ReportJob.status.in_(['queued', 'running']),
+            db.func.coalesce(ReportJob.started_at, ReportJob.created_at) < cutoff
+        )
+        .values(status='failed', error='timeout', finished_at=datetime.utcnow())
+        .execution_options(synchronize_session='fetch')
+    ).rowcount
+    db.session.commit()
+    return failed
+
+def cleanup_report_jobs():
+    """Помечает упавшими зависшие задачи и удаляет задачи и файлы отчетов старше REPORT_JOB_TTL_HOURS"""
+    fail_stale_report_jobs()
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config['REPORT_JOB_TTL_HOURS'])
+    expired = ReportJob.query.filter(
+        ReportJob.created_at < cutoff,
+        ReportJob.status.in_(['done', 'failed'])
+    ).all()
+    for job in expired:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        db.session.delete(job)
+    db.session.commit()
+
+def submit_report_job(report_type, user_id):
+    """Создает задачу отчета и отправляет ее в пул процессов очереди этого типа отчета"""
+    cleanup_report_jobs()
+    os.makedirs(current_app.config['REPORTS_FOLDER'], exist_ok=True)
+
+    job = ReportJob(report_type=report_type, created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+
+    future = get_report_executor(REPORT_QUEUES[report_type]).submit(run_report_job, job.id)
+    # Колбэк выполняется в служебном потоке пула, без контекста - приложение передается явно
+    future.add_done_callback(partial(report_job_finished, current_app._get_current_object(), job.id))
+    return job
+
+def report_job_status(job):
+    """Статус задачи для JSON-ответа"""
+    progress = job.total_rows if job.status == 'done' else read_report_progress(job.id)
+    status = {
+        'id': job.id,
+        'report_type': job.report_type,
+        'status': job.status,
+        'progress': progress,
+        'total_rows': job.total_rows,
+        'percent': min(100, round(100 * progress / job.total_rows)) if job.total_rows else None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'file_size': job.file_size,
+        'error': job.error,
+    }
+    if job.status == 'done':
+        status['download_url'] = url_for('reports.download_report_job', job_id=job.id)
+    return status
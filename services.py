@@ -0,0 +1,1566 @@
+"""
+Сервисы приложения: счетчики и версии данных, схема БД, вход, журнал событий, поиск,
+денежный поток, уведомления и импорт. Маршруты (views) и команды flask вызывают их отсюда.
+"""
+
+from flask import current_app, url_for
+from flask_login import LoginManager, UserMixin, current_user
+from sqlalchemy import and_, or_, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
+import csv
+import io
+import logging
+import re
+import time
+
+from models import (
+    db, User, Vehicle, CashFlow, Contractor, EventJournal, MonthlyEventStats, Notification, AppCounter,
+)
+
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+
+# Имя счетчика непрочитанных уведомлений
+UNREAD_NOTIFICATIONS_COUNTER = 'unread_notifications'
+
+# Локальный кеш воркера: имя счетчика -> (значение, время истечения)
+counter_cache = {}
+
+def adjust_counter(name, delta):
+    """
+    Атомарно изменяет счетчик в текущей транзакции (UPDATE ... SET value = value + delta).
+    Если строки счетчика еще нет, она будет пересчитана при следующем чтении.
+    """
+    if delta:
+        db.session.execute(
+            db.update(AppCounter)
+            .where(AppCounter.name == name)
+            .values(value=AppCounter.value + delta)
+            .execution_options(synchronize_session=False)
+        )
+    counter_cache.pop(name, None)
+
+def set_notification_read(notification_id):
+    """
+    Отмечает уведомление прочитанным условным UPDATE и уменьшает счетчик,
+    только если уведомление действительно было непрочитанным (без двойного списания).
+    """
+    changed = db.session.execute(
+        db.update(Notification)
+        .where(Notification.id == notification_id, Notification.is_read == False)
+        .values(is_read=True)
+        .execution_options(synchronize_session='fetch')
+    ).rowcount
+    adjust_counter(UNREAD_NOTIFICATIONS_COUNTER, -changed)
+
+# Таблицы со счетчиком изменений: версия данных для кеша отчетов, ETag API и кеша пользователей
+VERSIONED_TABLES = {'vehicle', 'contractor', 'event_journal', 'cash_flow', 'notification', 'user'}
+
+def data_version_counter(table_name):
+    return f'data_version:{table_name}'
+
+def bump_data_versions(session, table_names):
+    """
+    Одним коротким запросом увеличивает счетчики изменений таблиц в текущей транзакции.
+    Недостающий счетчик создается со значением 1 - версия 0 остается за неизмененной таблицей.
+    """
+    names = sorted(data_version_counter(table_name) for table_name in set(table_names) & VERSIONED_TABLES)
+    if not names:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        statement = insert(AppCounter).values([{'name': name, 'value': 1} for name in names])
+        statement = statement.on_conflict_do_update(
+            index_elements=[AppCounter.name],
+            set_={'value': AppCounter.value + 1}
+        )
+    else:
+        statement = (
+            db.update(AppCounter)
+            .where(AppCounter.name.in_(names))
+            .values(value=AppCounter.value + 1)
+        )
+    session.connection().execute(statement)
+
+def mark_changed_tables(session, table_names):
+    """Запоминает измененные таблицы; их версии увеличиваются один раз перед COMMIT"""
+    session.info.setdefault('changed_tables', set()).update(set(table_names) & VERSIONED_TABLES)
+
+@db.event.listens_for(db.session, 'after_flush')
+def mark_tables_after_flush(session, flush_context):
+    """Изменения через объекты ORM (add/delete/изменение атрибутов)"""
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    mark_changed_tables(session, {obj.__table__.name for obj in changed})
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def mark_tables_on_execute(orm_execute_state):
+    """Массовые INSERT/UPDATE/DELETE через db.session.execute"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_changed_tables(orm_execute_state.session, {orm_execute_state.statement.table.name})
+
+@db.event.listens_for(db.session, 'before_commit')
+def bump_versions_before_commit(session):
+    """
+    Строки счетчиков общие для всех запросов, поэтому они обновляются в самом конце
+    транзакции: блокировка держится только до COMMIT, а не всю транзакцию записи.
+    """
+    # before_commit срабатывает до последнего flush - сбрасываем изменения сами,
+    # чтобы их таблицы тоже попали в счетчики
+    session.flush()
+    bump_data_versions(session, session.info.pop('changed_tables', ()))
+
+@db.event.listens_for(db.session, 'after_transaction_end')
+def reset_changed_tables(session, transaction):
+    """Откат всей транзакции отменяет и ее изменения - увеличивать нечего"""
+    if transaction.parent is None:
+        session.info.pop('changed_tables', None)
+
+def seed_data_versions():
+    """Создает недостающие счетчики версий (шаг init-db), чтобы чтение версий ничего не писало"""
+    names = {data_version_counter(table_name) for table_name in VERSIONED_TABLES}
+    existing = {name for name, in db.session.query(AppCounter.name).filter(AppCounter.name.in_(names))}
+    db.session.add_all(AppCounter(name=name, value=0) for name in sorted(names - existing))
+    db.session.commit()
+
+def get_data_versions(table_names):
+    """Текущие версии таблиц; таблица без счетчика еще не менялась - версия 0"""
+    names = {data_version_counter(table_name): table_name for table_name in table_names}
+    versions = {table_name: 0 for table_name in table_names}
+    versions.update(
+        (names[name], value)
+        for name, value in db.session.query(AppCounter.name, AppCounter.value).filter(AppCounter.name.in_(names))
+    )
+    return versions
+
+def recount_unread_notifications():
+    """Пересчитывает счетчик непрочитанных уведомлений по таблице уведомлений"""
+    unread = Notification.query.filter_by(is_read=False).count()
+    counter = db.session.get(AppCounter, UNREAD_NOTIFICATIONS_COUNTER)
+    if counter:
+        counter.value = unread
+    else:
+        db.session.add(AppCounter(name=UNREAD_NOTIFICATIONS_COUNTER, value=unread))
+    db.session.commit()
+    counter_cache.pop(UNREAD_NOTIFICATIONS_COUNTER, None)
+    return unread
+
+def get_unread_notifications_count():
+    """
+    Количество непрочитанных уведомлений из кеша воркера.
+    В БД обращаемся не чаще раза в COUNTER_CACHE_TTL секунд, и это чтение строки по ключу.
+    """
+    cached = counter_cache.get(UNREAD_NOTIFICATIONS_COUNTER)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    value = db.session.query(AppCounter.value).filter_by(name=UNREAD_NOTIFICATIONS_COUNTER).scalar()
+    if value is None:
+        value = recount_unread_notifications()
+    counter_cache[UNREAD_NOTIFICATIONS_COUNTER] = (value, time.monotonic() + current_app.config['COUNTER_CACHE_TTL'])
+    return value
+
+# Индексы, которые больше не нужны ни одному запросу: таблица -> имена
+OBSOLETE_INDEXES = {
+    # Заменен ix_event_journal_type_subtype_id: генератор уведомлений читает арендные события по id
+    'event_journal': ['ix_event_journal_type_subtype_date'],
+}
+
+def ensure_indexes():
+    """
+    Создает недостающие индексы в уже существующих таблицах и удаляет устаревшие.
+    db.create_all() не трогает существующие таблицы, поэтому для старых баз
+    SQLite/PostgreSQL индексы добавляются отдельно (CREATE INDEX, если его нет).
+    """
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for name in OBSOLETE_INDEXES.get(table.name, []):
+            if name in existing:
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql(f'DROP INDEX {name}')
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+# Полнотекстовый поиск: тип документа -> (таблица, индексируемые колонки, код типа)
+SEARCH_SOURCES = {
+    'event': ('event_journal', ['description'], 1),
+    'vehicle': ('vehicle', ['brand', 'model', 'license_plate', 'call_sign', 'vin_code'], 2),
+    'contractor': ('contractor', ['name', 'notes', 'location'], 3),
+}
+
+# В SQLite документ хранится в FTS5 под rowid = id * SEARCH_ROWID_FACTOR + код типа
+SEARCH_ROWID_FACTOR = 4
+
+def search_document_sql(prefix, columns):
+    """SQL-выражение текста документа из колонок строки (prefix - new/old в триггере или пусто)"""
+    prefix = f'{prefix}.' if prefix else ''
+    return " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in columns)
+
+def ensure_search_index():
+    """
+    Создает полнотекстовый индекс, если его еще нет.
+    SQLite: таблица FTS5 search_index, которую триггеры обновляют при любой записи
+    в журнал, ТС и контрагентов (в том числе массовой). PostgreSQL: вычисляемая
+    колонка tsvector в каждой таблице и GIN-индекс по ней.
+    Возвращает True, если индекс был создан сейчас.
+    """
+    dialect = db.engine.dialect.name
+    inspector = inspect(db.engine)
+    # Поиск в этом процессе заново проверит, есть ли индекс
+    search_backends.pop(db.engine, None)
+
+    if dialect == 'sqlite':
+        if 'search_index' in inspector.get_table_names():
+            return False
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE VIRTUAL TABLE search_index USING fts5(body, prefix='2 3', tokenize='unicode61')"
+            )
+            for table, columns, code in SEARCH_SOURCES.values():
+                rowid = f'{{0}}.id * {SEARCH_ROWID_FACTOR} + {code}'
+                insert = (f"INSERT INTO search_index(rowid, body) "
+                          f"VALUES ({rowid.format('new')}, {search_document_sql('new', columns)});")
+                delete = f"DELETE FROM search_index WHERE rowid = {rowid.format('old')};"
+                connection.exec_driver_sql(
+                    f"CREATE TRIGGER search_index_{table}_insert AFTER INSERT ON {table} BEGIN {insert} END"
+                )
+                connection.exec_driver_sql(
+                    f"CREATE TRIGGER search_index_{table}_delete AFTER DELETE ON {table} BEGIN {delete} END"
+                )
+                connection.exec_driver_sql(
+                    f"CREATE TRIGGER search_index_{table}_update AFTER UPDATE OF {', '.join(columns)} ON {table} "
+                    f"BEGIN {delete} {insert} END"
+                )
+                connection.exec_driver_sql(
+                    f"INSERT INTO search_index(rowid, body) "
+                    f"SELECT id * {SEARCH_ROWID_FACTOR} + {code}, {search_document_sql('', columns)} FROM {table}"
+                )
+        return True
+
+    if dialect == 'postgresql':
+        if all('search_vector' in {column['name'] for column in inspector.get_columns(table)} and
+               f'ix_{table}_search_vector' in {index['name'] for index in inspector.get_indexes(table)}
+               for table, _, _ in SEARCH_SOURCES.values()):
+            return False
+        with db.engine.begin() as connection:
+            for table, columns, _ in SEARCH_SOURCES.values():
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                    f"GENERATED ALWAYS AS (to_tsvector('simple', {search_document_sql('', columns)})) STORED"
+                )
+                connection.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+                )
+        return True
+
+    return False
+
+def rebuild_monthly_stats():
+    """Полностью пересчитывает помесячную сводку из журнала событий одним GROUP BY"""
+    year = db.extract('year', EventJournal.date)
+    month = db.extract('month', EventJournal.date)
+    rows = db.session.query(
+        year, month, EventJournal.event_type,
+        db.func.count(EventJournal.id), db.func.coalesce(db.func.sum(EventJournal.amount), 0)
+    ).group_by(year, month, EventJournal.event_type).all()
+
+    MonthlyEventStats.query.delete()
+    db.session.add_all([
+        MonthlyEventStats(
+            month=datetime(int(row_year), int(row_month), 1).date(),
+            event_type=event_type,
+            events_count=events_count,
+            total_amount=total_amount
+        )
+        for row_year, row_month, event_type, events_count, total_amount in rows
+    ])
+    db.session.commit()
+    return len(rows)
+
+def merge_duplicate_cashflow_dates():
+    """
+    Сливает дубликаты дневных записей денежного потока в одну запись.
+    Нужно для старых баз перед созданием уникального индекса по дате.
+    """
+    duplicate_dates = [row[0] for row in db.session.query(CashFlow.date).group_by(
+        CashFlow.date
+    ).having(db.func.count(CashFlow.id) > 1).all()]
+
+    for day in duplicate_dates:
+        entries = CashFlow.query.filter_by(date=day).order_by(CashFlow.id).all()
+        kept = entries[0]
+        for entry in entries[1:]:
+            kept.income = (kept.income or 0) + (entry.income or 0)
+            kept.expenses = (kept.expenses or 0) + (entry.expenses or 0)
+            kept.credit_load = (kept.credit_load or 0) + (entry.credit_load or 0)
+            db.session.delete(entry)
+        kept.balance = kept.income - kept.expenses - kept.credit_load
+    db.session.commit()
+    return len(duplicate_dates)
+
+# Создание схемы и миграции данных: выполняется один раз командой `flask init-db`
+# (шаг релиза), а не при импорте в каждом воркере
+def init_database(app=None):
+    """
+    Создает схему в базе текущего приложения. Скрипты без контекста передают
+    приложение явно: init_database(create_app())
+    """
+    if app is not None:
+        with app.app_context():
+            return init_database()
+
+    try:
+        print("🗄️ Создаем таблицы базы данных...")
+        db.create_all()
+        print("✅ Таблицы созданы успешно")
+
+        merged_dates = merge_duplicate_cashflow_dates()
+        if merged_dates:
+            print(f"✅ Объединены дубликаты денежного потока: {merged_dates} дат")
+
+        created_indexes = ensure_indexes()
+        if created_indexes:
+            print(f"✅ Добавлены индексы: {', '.join(created_indexes)}")
+
+        if ensure_search_index():
+            print("✅ Создан полнотекстовый индекс")
+
+        # Заполняем помесячную сводку для баз, созданных до ее появления
+        if not MonthlyEventStats.query.first() and EventJournal.query.first():
+            months = rebuild_monthly_stats()
+            print(f"✅ Помесячная сводка заполнена: {months} записей")
+
+        # Сверяем счетчик непрочитанных уведомлений
+        recount_unread_notifications()
+
+        # Счетчики версий таблиц для кеша отчетов, ETag API и кеша пользователей
+        seed_data_versions()
+        
+        # Создаем администратора по умолчанию
+        print("👤 Проверяем администратора...")
+        admin = User.query.filter_by(username='admin').first()
+        if not admin:
+            admin = User(
+                username='admin',
+                email='admin@fleet.com',
+                password_hash=generate_password_hash('admin123'),
+                role='admin'
+            )
+            db.session.add(admin)
+            db.session.commit()
+            print("✅ Администратор создан: admin/admin123")
+        else:
+            print("ℹ️ Администратор уже существует")
+            
+        print("🎉 База данных инициализирована успешно!")
+        
+    except Exception as e:
+        print(f"❌ Ошибка инициализации БД: {e}")
+        db.session.rollback()
+        raise
+
+class UserIdentity(UserMixin):
+    """Легкий объект пользователя для Flask-Login: только id, имя и роль, без сессии БД"""
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+# Локальный кеш воркера: id пользователя -> (UserIdentity, время истечения, версия таблицы user)
+user_cache = {}
+
+def users_version():
+    """
+    Версия таблицы user (увеличивается при любой записи пользователей в любом воркере).
+    Как и счетчик непрочитанных, читается из БД не чаще раза в COUNTER_CACHE_TTL секунд.
+    """
+    name = data_version_counter('user')
+    cached = counter_cache.get(name)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    value = get_data_versions({'user'})['user']
+    counter_cache[name] = (value, time.monotonic() + current_app.config['COUNTER_CACHE_TTL'])
+    return value
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    """
+    Сбрасывает закешированного пользователя в этом воркере сразу. Остальные воркеры
+    увидят новую версию таблицы user не позже чем через COUNTER_CACHE_TTL секунд.
+    """
+    user_cache.pop(target.id, None)
+    counter_cache.pop(data_version_counter('user'), None)
+
+@login_manager.user_loader
+def load_user(user_id):
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        return None
+
+    version = users_version()
+    cached = user_cache.get(user_id)
+    if cached and cached[1] > time.monotonic() and cached[2] == version:
+        return cached[0]
+
+    row = db.session.query(User.id, User.username, User.role).filter_by(id=user_id).first()
+    if row is None:
+        user_cache.pop(user_id, None)
+        return None
+
+    identity = UserIdentity(row.id, row.username, row.role)
+    user_cache[user_id] = (identity, time.monotonic() + current_app.config['USER_CACHE_TTL'], version)
+    return identity
+
+def inject_unread_notifications():
+    """Добавляет количество непрочитанных уведомлений во все шаблоны"""
+    if current_user.is_authenticated:
+        unread_count = get_unread_notifications_count()
+        return {
+            'unread_notifications': unread_count,
+            'timedelta': timedelta,
+            'now': datetime.now()
+        }
+    return {
+        'unread_notifications': 0,
+        'timedelta': timedelta,
+        'now': datetime.now()
+    }
+
+# Константы для типов событий
+EVENT_TYPES = [
+    'інвестиції', 'видатки', 'надходження', 'державні'
+]
+
+EVENT_SUBTYPES = {
+    'інвестиції': ['ЛІЗИНГ', 'ПОКУПКА', 'ГОТІВКА', 'ОБЛАДНАННЯ', 'КРЕДИТ'],
+    'видатки': ['ПОСТАНОВКА НА ТО', 'ПОЛОМКА', 'ПЛАНОВИЙ РЕМОНТ', 'ПОЗАПЛАНОВИЙ РЕМОНТ', 'ЗАРПЛАТА', 'ЛОГІСТИКА', 'ДТП'],
+    'надходження': ['ОРЕНДА', 'ЗАВДАТОК', 'КОМПЕНСАЦІЯ', 'ПРОДАЖ ЗА РОЗТЕРМІНУВАННЯМ', 'ПРОДАЖ'],
+    'державні': ['ДОКУМЕНТИ', 'ШТРАФ', 'СТАХУВАННЯ', 'ПОДАТКИ']
+}
+
+# Размер страницы журнала событий
+EVENTS_PER_PAGE = 50
+EVENTS_MAX_PER_PAGE = 200
+
+def encode_event_cursor(event):
+    """Кодирует позицию события (date, id) в курсор для keyset-пагинации"""
+    return f"{event.date.strftime('%Y%m%d%H%M%S%f')}-{event.id}"
+
+def decode_event_cursor(cursor):
+    """Разбирает курсор в пару (date, id); None если курсор пустой или битый"""
+    if not cursor:
+        return None
+    try:
+        date_part, id_part = cursor.split('-', 1)
+        return datetime.strptime(date_part, '%Y%m%d%H%M%S%f'), int(id_part)
+    except ValueError:
+        return None
+
+# Сколько последних событий показывать в карточке ТС / контрагента
+LATEST_EVENTS_LIMIT = 5
+
+# Сколько ТС / контрагентов передавать в одном IN (...)
+EVENTS_SUMMARY_CHUNK_SIZE = 500
+
+def events_summary_by(column, owner_ids, limit=LATEST_EVENTS_LIMIT):
+    """
+    Возвращает количество событий и последние `limit` событий для показанных ТС
+    или контрагентов вместо ленивой загрузки backref.
+    Количество - GROUP BY по индексу (владелец, дата), последние события - LIMIT на каждого
+    владельца по тому же индексу (PostgreSQL - LATERAL, иначе коррелированный подзапрос),
+    поэтому весь журнал не сортируется и не нумеруется.
+    column: EventJournal.vehicle_id или EventJournal.contractor_id
+    """
+    owner_id = next(iter(column.foreign_keys)).column
+    recent = aliased(EventJournal)
+    recent_order = (recent.date.desc(), recent.id.desc())
+    lateral = db.session.get_bind().dialect.name == 'postgresql'
+
+    event_counts = {}
+    latest_events = {}
+    owner_ids = list(owner_ids)
+    for start in range(0, len(owner_ids), EVENTS_SUMMARY_CHUNK_SIZE):
+        chunk = owner_ids[start:start + EVENTS_SUMMARY_CHUNK_SIZE]
+        event_counts.update(db.session.query(column, db.func.count(EventJournal.id)).filter(
+            column.in_(chunk)
+        ).group_by(column))
+
+        if lateral:
+            latest = db.select(recent).where(getattr(recent, column.key) == owner_id).order_by(
+                *recent_order
+            ).limit(limit).lateral()
+            latest_event = aliased(EventJournal, latest)
+            query = db.session.query(latest_event).select_from(owner_id.table).join(latest, db.true())
+        else:
+            latest_ids = db.select(recent.id).where(getattr(recent, column.key) == owner_id).order_by(
+                *recent_order
+            ).limit(limit).correlate(owner_id.table)
+            latest_event = EventJournal
+            query = db.session.query(EventJournal).select_from(owner_id.table).join(
+                EventJournal, EventJournal.id.in_(latest_ids)
+            )
+
+        for event in query.filter(owner_id.in_(chunk)).order_by(
+            owner_id, latest_event.date.desc(), latest_event.id.desc()
+        ):
+            latest_events.setdefault(getattr(event, column.key), []).append(event)
+    return event_counts, latest_events
+
+def escape_like(value):
+    """Экранирует спецсимволы LIKE в пользовательском поиске"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+# Сколько результатов поиска отдавать и сколько слов запроса учитывать
+SEARCH_RESULTS_LIMIT = 20
+SEARCH_MAX_RESULTS_LIMIT = 100
+SEARCH_MAX_TERMS = 8
+
+SEARCH_TERM_RE = re.compile(r'\w+')
+
+def search_terms(text):
+    """Слова запроса в нижнем регистре (спецсимволы синтаксиса FTS отбрасываются)"""
+    return SEARCH_TERM_RE.findall(text.lower())[:SEARCH_MAX_TERMS]
+
+# Движок БД -> найденный полнотекстовый индекс (проверяется один раз на процесс)
+search_backends = {}
+
+def detect_search_backend():
+    """Есть ли в БД полнотекстовый индекс, созданный ensure_search_index"""
+    dialect = db.engine.dialect.name
+    inspector = inspect(db.engine)
+    if dialect == 'sqlite' and 'search_index' in inspector.get_table_names():
+        return 'sqlite'
+    if dialect == 'postgresql' and all(
+        'search_vector' in {column['name'] for column in inspector.get_columns(table)}
+        for table, _, _ in SEARCH_SOURCES.values()
+    ):
+        return 'postgresql'
+    return None
+
+def search_backend():
+    """
+    Полнотекстовый индекс текущей БД (sqlite / postgresql) или None, если поиск идет через LIKE:
+    другая БД или база создана одним db.create_all() без init_database
+    """
+    engine = db.engine
+    if engine not in search_backends:
+        search_backends[engine] = detect_search_backend()
+    return search_backends[engine]
+
+def search_match_condition(kind, terms):
+    """
+    Условие "запись типа kind содержит все слова запроса (по префиксу)" для фильтра запроса ORM.
+    SQLite - подзапрос к FTS5, PostgreSQL - tsvector @@ tsquery, иначе - LIKE по колонкам.
+    """
+    table, columns, code = SEARCH_SOURCES[kind]
+    model = db.Model.metadata.tables[table]
+    backend = search_backend()
+    if backend == 'sqlite':
+        matched = db.select(db.literal_column(f'rowid / {SEARCH_ROWID_FACTOR}')).select_from(
+            db.table('search_index')
+        ).where(
+            db.text('search_index MATCH :search_query').bindparams(
+                search_query=' '.join(f'"{term}"*' for term in terms)
+            ),
+            db.literal_column(f'rowid % {SEARCH_ROWID_FACTOR}') == code
+        )
+        return model.c.id.in_(matched)
+    if backend == 'postgresql':
+        return db.literal_column(f'{table}.search_vector').op('@@')(
+            db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        )
+    return and_(*(
+        or_(*(model.c[column].ilike(f'%{escape_like(term)}%', escape='\\') for column in columns))
+        for term in terms
+    ))
+
+def search_ranked_ids(terms, kinds, limit):
+    """Найденные записи по убыванию релевантности: список (kind, id)"""
+    backend = search_backend()
+    if backend == 'sqlite':
+        codes = {SEARCH_SOURCES[kind][2]: kind for kind in kinds}
+        rows = db.session.execute(
+            db.text(
+                f"SELECT rowid FROM search_index WHERE search_index MATCH :search_query "
+                f"AND rowid % {SEARCH_ROWID_FACTOR} IN ({', '.join(str(code) for code in codes)}) "
+                f"ORDER BY bm25(search_index) LIMIT :limit"
+            ),
+            {'search_query': ' '.join(f'"{term}"*' for term in terms), 'limit': limit}
+        )
+        return [(codes[rowid % SEARCH_ROWID_FACTOR], rowid // SEARCH_ROWID_FACTOR) for rowid, in rows]
+
+    ranked = []
+    for kind in kinds:
+        table = db.Model.metadata.tables[SEARCH_SOURCES[kind][0]]
+        if backend == 'postgresql':
+            rank = db.func.ts_rank_cd(
+                db.literal_column(f'{table.name}.search_vector'),
+                db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+            )
+        else:
+            rank = db.literal(0)
+        rows = db.session.execute(
+            db.select(table.c.id, rank.label('rank'))
+            .where(search_match_condition(kind, terms))
+            .order_by(db.desc('rank'), table.c.id.desc())
+            .limit(limit)
+        )
+        ranked.extend((row.rank, kind, row.id) for row in rows)
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return [(kind, record_id) for _, kind, record_id in ranked[:limit]]
+
+def search_records(text, kinds=None, limit=SEARCH_RESULTS_LIMIT):
+    """
+    Полнотекстовый поиск по журналу, ТС и контрагентам.
+    Возвращает результаты по релевантности: dict с kind, id, title, subtitle, url.
+    """
+    terms = search_terms(text)
+    kinds = [kind for kind in (kinds or SEARCH_SOURCES) if kind in SEARCH_SOURCES]
+    if not terms or not kinds:
+        return []
+
+    found = search_ranked_ids(terms, kinds, limit)
+    ids = {kind: [record_id for found_kind, record_id in found if found_kind == kind] for kind in kinds}
+
+    records = {}
+    if ids.get('event'):
+        for row in db.session.query(
+            EventJournal.id, EventJournal.date, EventJournal.event_type, EventJournal.subtype,
+            EventJournal.description, EventJournal.vehicle_id, Vehicle.call_sign
+        ).outerjoin(Vehicle, EventJournal.vehicle_id == Vehicle.id).filter(EventJournal.id.in_(ids['event'])):
+            records[('event', row.id)] = {
+                'title': f"{row.date.strftime('%d.%m.%Y')} {row.event_type} / {row.subtype}",
+                'subtitle': ' - '.join(part for part in (row.call_sign, row.description) if part),
+                'url': url_for('events.events_by_vehicle', vehicle_id=row.vehicle_id) if row.vehicle_id else url_for('events.events'),
+            }
+    if ids.get('vehicle'):
+        for row in db.session.query(
+            Vehicle.id, Vehicle.call_sign, Vehicle.brand, Vehicle.model, Vehicle.license_plate, Vehicle.vin_code
+        ).filter(Vehicle.id.in_(ids['vehicle'])):
+            records[('vehicle', row.id)] = {
+                'title': f'{row.call_sign} - {row.brand} {row.model}',
+                'subtitle': f'{row.license_plate}, VIN {row.vin_code}',
+                'url': url_for('events.events_by_vehicle', vehicle_id=row.id),
+            }
+    if ids.get('contractor'):
+        for row in db.session.query(
+            Contractor.id, Contractor.name, Contractor.contractor_type, Contractor.location
+        ).filter(Contractor.id.in_(ids['contractor'])):
+            records[('contractor', row.id)] = {
+                'title': row.name,
+                'subtitle': ', '.join(part for part in (row.contractor_type, row.location) if part),
+                'url': url_for('events.events_by_contractor', contractor_id=row.id),
+            }
+
+    return [
+        dict(kind=kind, id=record_id, **records[(kind, record_id)])
+        for kind, record_id in found if (kind, record_id) in records
+    ]
+
+def filter_events_query(query, search='', event_type='', amount_filter=''):
+    """Применяет фильтры журнала (поиск, тип, сумма) на стороне БД"""
+    terms = search_terms(search)
+    if terms:
+        # Поиск слов по полнотекстовому индексу (с совпадением по началу слова)
+        query = query.filter(search_match_condition('event', terms))
+    elif search:
+        query = query.filter(EventJournal.description.ilike(f'%{escape_like(search)}%', escape='\\'))
+    if event_type:
+        query = query.filter(EventJournal.event_type == event_type)
+    if amount_filter == 'positive':
+        query = query.filter(EventJournal.amount > 0)
+    elif amount_filter == 'negative':
+        query = query.filter(EventJournal.amount < 0)
+    elif amount_filter == 'zero':
+        query = query.filter(EventJournal.amount == 0)
+    return query
+
+def cashflow_delta_for_event(event_type, event_subtype, amount):
+    """Раскладывает сумму события по статьям денежного потока: (income, expenses, credit_load)"""
+    if event_type == 'надходження':
+        return amount, 0, 0
+    if event_type in ['видатки', 'державні']:
+        # Расходы и государственные платежи идут в расходы
+        return 0, amount, 0
+    if event_type == 'інвестиції':
+        # Кредиты идут в кредитное нагружение, остальные инвестиции - в расходы
+        if event_subtype == 'КРЕДИТ':
+            return 0, 0, amount
+        return 0, amount, 0
+    return 0, 0, 0
+
+def apply_cashflow_delta(day, income=0, expenses=0, credit_load=0):
+    """
+    Атомарно прибавляет суммы к записи денежного потока за день.
+    На SQLite и PostgreSQL это один INSERT ... ON CONFLICT (date) DO UPDATE SET income = income + ...,
+    на других БД - UPDATE ... SET income = income + ... и INSERT, если записи не было.
+    Работает в текущей транзакции: фиксирует изменения вызывающий код.
+    """
+    balance = income - expenses - credit_load
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        statement = insert(CashFlow).values(
+            date=day,
+            income=income,
+            expenses=expenses,
+            credit_load=credit_load,
+            balance=balance,
+            created_at=datetime.utcnow()
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[CashFlow.date],
+            set_={
+                'income': CashFlow.income + statement.excluded.income,
+                'expenses': CashFlow.expenses + statement.excluded.expenses,
+                'credit_load': CashFlow.credit_load + statement.excluded.credit_load,
+                'balance': CashFlow.balance + statement.excluded.balance,
+            }
+        )
+        db.session.execute(statement)
+    else:
+        updated = db.session.execute(
+            db.update(CashFlow)
+            .where(CashFlow.date == day)
+            .values(
+                income=CashFlow.income + income,
+                expenses=CashFlow.expenses + expenses,
+                credit_load=CashFlow.credit_load + credit_load,
+                balance=CashFlow.balance + balance
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.session.add(CashFlow(
+                date=day,
+                income=income,
+                expenses=expenses,
+                credit_load=credit_load,
+                balance=balance
+            ))
+            db.session.flush()
+
+    # Если после списания все суммы стали 0, удаляем запись
+    if income < 0 or expenses < 0 or credit_load < 0:
+        db.session.execute(
+            db.delete(CashFlow)
+            .where(
+                CashFlow.date == day,
+                db.func.abs(CashFlow.income) < CASHFLOW_EPSILON,
+                db.func.abs(CashFlow.expenses) < CASHFLOW_EPSILON,
+                db.func.abs(CashFlow.credit_load) < CASHFLOW_EPSILON
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+# Суммы меньше полкопейки считаем нулевыми (накопленная ошибка float)
+CASHFLOW_EPSILON = 0.005
+
+def update_cashflow_from_event(event_date, event_type, event_subtype, amount, operation='add'):
+    """
+    Автоматически обновляет денежный поток при добавлении или удалении события
+    operation: 'add' для добавления, 'remove' для удаления
+    Изменение выполняется в текущей транзакции вместе с самим событием.
+    """
+    # Получаем дату события
+    event_date_only = event_date.date() if hasattr(event_date, 'date') else event_date
+    
+    # Определяем множитель: +1 для добавления, -1 для удаления
+    multiplier = 1 if operation == 'add' else -1
+    income, expenses, credit_load = cashflow_delta_for_event(event_type, event_subtype, amount)
+    
+    if income or expenses or credit_load:
+        apply_cashflow_delta(
+            event_date_only,
+            income=income * multiplier,
+            expenses=expenses * multiplier,
+            credit_load=credit_load * multiplier
+        )
+
+# Сколько строк читать из БД за раз при сверке денежного потока
+RECONCILE_CHUNK_SIZE = 1000
+
+def as_date(value):
+    """Приводит результат date() из БД к date (SQLite возвращает строку)"""
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    return value.date() if isinstance(value, datetime) else value
+
+def computed_cashflow_rows(chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Пересчитывает денежный поток по дням из журнала событий одним GROUP BY.
+    Правила те же, что в cashflow_delta_for_event; события с нулевой суммой не учитываются.
+    Отдает (date, income, expenses, credit_load) по возрастанию даты, читая результат пачками.
+    """
+    day = db.func.date(EventJournal.date)
+    is_credit = and_(EventJournal.event_type == 'інвестиції', EventJournal.subtype == 'КРЕДИТ')
+    is_expense = or_(
+        EventJournal.event_type.in_(['видатки', 'державні']),
+        and_(EventJournal.event_type == 'інвестиції', EventJournal.subtype != 'КРЕДИТ')
+    )
+
+    def total(condition):
+        return db.func.coalesce(db.func.sum(db.case((condition, EventJournal.amount), else_=0)), 0)
+
+    query = db.session.query(
+        day,
+        total(EventJournal.event_type == 'надходження'),
+        total(is_expense),
+        total(is_credit)
+    ).filter(
+        EventJournal.amount > 0,
+        EventJournal.event_type.in_(EVENT_TYPES)
+    ).group_by(day).order_by(day).yield_per(chunk_size)
+
+    for row_day, income, expenses, credit_load in query:
+        yield as_date(row_day), float(income), float(expenses), float(credit_load)
+
+def reconcile_cashflow(apply=False, chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Сверяет сохраненный денежный поток с пересчитанным из журнала.
+    Обе стороны читаются потоково по возрастанию даты и сливаются за один проход.
+    apply=True - исправляет расхождения пачками в одной транзакции.
+    Возвращает сводку и список расхождений (date, сохранено, пересчитано).
+    """
+    stored_rows = db.session.query(
+        CashFlow.id, CashFlow.date, CashFlow.income, CashFlow.expenses, CashFlow.credit_load, CashFlow.balance
+    ).order_by(CashFlow.date).yield_per(chunk_size)
+
+    def stored_values(row):
+        income, expenses, credit_load = row.income or 0, row.expenses or 0, row.credit_load or 0
+        return {'id': row.id, 'income': income, 'expenses': expenses,
+                'credit_load': credit_load, 'balance': row.balance or 0}
+
+    def computed_values(row):
+        row_day, income, expenses, credit_load = row
+        return {'income': income, 'expenses': expenses,
+                'credit_load': credit_load, 'balance': income - expenses - credit_load}
+
+    def differs(stored, computed):
+        return any(abs(stored[key] - computed[key]) >= CASHFLOW_EPSILON
+                   for key in ('income', 'expenses', 'credit_load', 'balance'))
+
+    differences = []
+    days_checked = 0
+    stored_iter = iter(stored_rows)
+    computed_iter = computed_cashflow_rows(chunk_size)
+    stored_row = next(stored_iter, None)
+    computed_row = next(computed_iter, None)
+
+    while stored_row is not None or computed_row is not None:
+        days_checked += 1
+        stored_day = stored_row.date if stored_row is not None else None
+        computed_day = computed_row[0] if computed_row is not None else None
+
+        if computed_row is None or (stored_row is not None and stored_day < computed_day):
+            # Запись есть, а событий за день нет
+            differences.append((stored_day, stored_values(stored_row), None))
+            stored_row = next(stored_iter, None)
+        elif stored_row is None or computed_day < stored_day:
+            # События есть, а записи нет
+            differences.append((computed_day, None, computed_values(computed_row)))
+            computed_row = next(computed_iter, None)
+        else:
+            stored, computed = stored_values(stored_row), computed_values(computed_row)
+            if differs(stored, computed):
+                differences.append((stored_day, stored, computed))
+            stored_row = next(stored_iter, None)
+            computed_row = next(computed_iter, None)
+
+    summary = {
+        'days_checked': days_checked,
+        'mismatched': sum(1 for _, stored, computed in differences if stored and computed),
+        'missing': sum(1 for _, stored, _ in differences if stored is None),
+        'extra': sum(1 for _, _, computed in differences if computed is None),
+        'applied': False,
+    }
+
+    if apply and differences:
+        updates = [dict(computed, id=stored['id']) for _, stored, computed in differences if stored and computed]
+        inserts = [dict(computed, date=day) for day, stored, computed in differences if stored is None]
+        deletes = [stored['id'] for _, stored, computed in differences if computed is None]
+
+        # Через session.execute, а не bulk_*_mappings: так срабатывает do_orm_execute
+        # и версия cash_flow для кеша отчетов и ETag увеличивается
+        if updates:
+            db.session.execute(db.update(CashFlow), updates)
+        if inserts:
+            db.session.execute(db.insert(CashFlow), inserts)
+        for start in range(0, len(deletes), chunk_size):
+            db.session.execute(
+                db.delete(CashFlow)
+                .where(CashFlow.id.in_(deletes[start:start + chunk_size]))
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        summary['applied'] = True
+
+    return summary, differences
+
+def format_cashflow_difference(day, stored, computed):
+    """Строка расхождения для вывода в консоль / JSON"""
+    def values(side):
+        if side is None:
+            return None
+        return {key: round(side[key], 2) for key in ('income', 'expenses', 'credit_load', 'balance')}
+    return {'date': day.isoformat(), 'stored': values(stored), 'computed': values(computed)}
+
+def month_start(value):
+    """Первый день месяца для даты / datetime"""
+    value = value.date() if hasattr(value, 'date') else value
+    return value.replace(day=1)
+
+def update_monthly_stats(event_date, event_type, amount, operation='add', events_count=1):
+    """
+    Инкрементально обновляет помесячную сводку при добавлении или удалении события.
+    Изменения попадают в текущую сессию и фиксируются вместе с самим событием.
+    operation: 'add' для добавления, 'remove' для удаления
+    events_count и amount могут быть суммой по нескольким событиям одного месяца (массовый импорт)
+    """
+    multiplier = 1 if operation == 'add' else -1
+    month = month_start(event_date)
+    amount = amount or 0
+    dialect = db.session.get_bind().dialect.name
+
+    # Как в apply_cashflow_delta: один INSERT ... ON CONFLICT, чтобы параллельные
+    # события нового месяца не упирались в uq_monthly_event_stats_month_type
+    if operation == 'add' and dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        statement = insert(MonthlyEventStats).values(
+            month=month,
+            event_type=event_type,
+            events_count=events_count,
+            total_amount=amount
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[MonthlyEventStats.month, MonthlyEventStats.event_type],
+            set_={
+                'events_count': MonthlyEventStats.events_count + statement.excluded.events_count,
+                'total_amount': MonthlyEventStats.total_amount + statement.excluded.total_amount,
+            }
+        )
+        db.session.execute(statement)
+        return
+
+    updated = db.session.execute(
+        db.update(MonthlyEventStats)
+        .where(MonthlyEventStats.month == month, MonthlyEventStats.event_type == event_type)
+        .values(
+            events_count=MonthlyEventStats.events_count + events_count * multiplier,
+            total_amount=MonthlyEventStats.total_amount + amount * multiplier
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    if not updated and operation == 'add':
+        db.session.add(MonthlyEventStats(
+            month=month,
+            event_type=event_type,
+            events_count=events_count,
+            total_amount=amount
+        ))
+
+# Сколько месяцев показывать на финансовом графике
+DASHBOARD_MONTHS = 6
+
+def dashboard_chart_data(months=DASHBOARD_MONTHS):
+    """Данные для графиков панели управления из помесячной сводки"""
+    type_totals = dict(db.session.query(
+        MonthlyEventStats.event_type, db.func.sum(MonthlyEventStats.events_count)
+    ).group_by(MonthlyEventStats.event_type).all())
+
+    # Последние N месяцев, включая текущий
+    current = month_start(datetime.now())
+    month_list = []
+    for _ in range(months):
+        month_list.insert(0, current)
+        current = (current - timedelta(days=1)).replace(day=1)
+
+    amounts = {}
+    for stats in MonthlyEventStats.query.filter(MonthlyEventStats.month >= month_list[0]).all():
+        amounts[(stats.month, stats.event_type)] = stats.total_amount
+
+    def series(*event_types):
+        return [
+            round(sum(amounts.get((month, event_type), 0) for event_type in event_types), 2)
+            for month in month_list
+        ]
+
+    return {
+        'types': {
+            'labels': [event_type.capitalize() for event_type in EVENT_TYPES],
+            'counts': [type_totals.get(event_type, 0) for event_type in EVENT_TYPES],
+        },
+        'finance': {
+            'labels': [month.strftime('%m.%Y') for month in month_list],
+            'income': series('надходження'),
+            'expenses': series('видатки', 'державні'),
+            'investments': series('інвестиції'),
+        },
+    }
+
+CONTRACTOR_TYPES = [
+    'Постачальник', 'СТО', 'Орендар', 'Продавець', 'Лізингодавець', 
+    'Банк', 'Покупець', 'Послуги', 'Державні установи'
+]
+
+RENTAL_NOTIFICATION_TITLE = 'Нагадування про орендний платіж'
+
+def rental_payment_message(vehicle, contractor, amount):
+    """Текст уведомления об арендном платеже"""
+    return f'Сьогодні має бути черговий платіж за оренду {vehicle.brand} {vehicle.model} ({vehicle.license_plate}) від {contractor.name}. Сума: {amount:,.2f} ₴'
+
+def create_insurance_notification(vehicle, insurance_date):
+    """Создает уведомление о страховке за 7 дней до окончания (в текущей транзакции)"""
+    # Уведомление за 7 дней до окончания страховки
+    reminder_date = insurance_date - timedelta(days=7)
+    
+    notification = Notification(
+        type='insurance',
+        title=f'Нагадування про страховку',
+        message=f'Страховка для {vehicle.brand} {vehicle.model} ({vehicle.license_plate}) закінчується через 7 днів ({insurance_date.strftime("%d.%m.%Y")})',
+        vehicle_id=vehicle.id,
+        due_date=reminder_date,
+        amount=0
+    )
+    db.session.add(notification)
+    adjust_counter(UNREAD_NOTIFICATIONS_COUNTER, 1)
+
+# Имя счетчика-водяного знака: id последнего обработанного арендного события
+RENTAL_NOTIFICATIONS_WATERMARK = 'rental_notifications_watermark'
+
+# Сколько арендных событий обрабатывать за одну транзакцию
+NOTIFICATIONS_BATCH_SIZE = 1000
+
+def get_rental_watermark():
+    """Возвращает водяной знак генератора уведомлений, создавая его при необходимости"""
+    watermark = db.session.query(AppCounter.value).filter_by(name=RENTAL_NOTIFICATIONS_WATERMARK).scalar()
+    if watermark is None:
+        try:
+            db.session.add(AppCounter(name=RENTAL_NOTIFICATIONS_WATERMARK, value=0))
+            db.session.commit()
+        except IntegrityError:
+            # Другой воркер создал водяной знак одновременно с нами
+            db.session.rollback()
+        watermark = db.session.query(AppCounter.value).filter_by(name=RENTAL_NOTIFICATIONS_WATERMARK).scalar()
+    return watermark
+
+def rental_events_batch(watermark, batch_size=NOTIFICATIONS_BATCH_SIZE):
+    """Пачка арендных платежей после водяного знака, по возрастанию id (индекс ix_event_journal_type_subtype_id)"""
+    return db.session.query(
+        EventJournal.id, EventJournal.date, EventJournal.amount, Vehicle, Contractor
+    ).join(Vehicle, EventJournal.vehicle_id == Vehicle.id).join(
+        Contractor, EventJournal.contractor_id == Contractor.id
+    ).filter(
+        EventJournal.event_type == 'надходження',
+        EventJournal.subtype == 'ОРЕНДА',
+        EventJournal.id > watermark
+    ).order_by(EventJournal.id).limit(batch_size)
+
+def check_and_create_notifications(batch_size=NOTIFICATIONS_BATCH_SIZE):
+    """
+    Создает уведомления о следующих арендных платежах только для событий,
+    добавленных после водяного знака. Дубликаты отсекаются одним запросом на пачку,
+    новые уведомления вставляются пачкой, водяной знак сдвигается в той же транзакции.
+    Возвращает количество созданных уведомлений.
+    """
+    today = datetime.now().date()
+    created = 0
+    watermark = get_rental_watermark()
+
+    while True:
+        rows = rental_events_batch(watermark, batch_size).all()
+
+        if not rows:
+            break
+
+        # Следующий платеж через неделю после последнего; прошедшие даты пропускаем
+        candidates = {}
+        for event_id, event_date, amount, vehicle, contractor in rows:
+            next_payment_date = event_date.date() + timedelta(days=7)
+            if next_payment_date >= today:
+                candidates[(vehicle.id, contractor.id, next_payment_date)] = (vehicle, contractor, amount)
+
+        new_notifications = []
+        if candidates:
+            due_dates = [key[2] for key in candidates]
+            existing = set(db.session.query(
+                Notification.vehicle_id, Notification.contractor_id, Notification.due_date
+            ).filter(
+                Notification.type == 'rental_payment',
+                Notification.vehicle_id.in_({key[0] for key in candidates}),
+                Notification.due_date.between(min(due_dates), max(due_dates))
+            ).all())
+
+            new_notifications = [
+                {
+                    'type': 'rental_payment',
+                    'title': RENTAL_NOTIFICATION_TITLE,
+                    'message': rental_payment_message(vehicle, contractor, amount),
+                    'vehicle_id': vehicle_id,
+                    'contractor_id': contractor_id,
+                    'due_date': due_date,
+                    'amount': amount,
+                }
+                for (vehicle_id, contractor_id, due_date), (vehicle, contractor, amount) in candidates.items()
+                if (vehicle_id, contractor_id, due_date) not in existing
+            ]
+            if new_notifications:
+                db.session.execute(db.insert(Notification), new_notifications)
+                adjust_counter(UNREAD_NOTIFICATIONS_COUNTER, len(new_notifications))
+
+        # Сдвигаем водяной знак, только если его не сдвинул параллельный генератор
+        new_watermark = rows[-1][0]
+        advanced = db.session.execute(
+            db.update(AppCounter)
+            .where(AppCounter.name == RENTAL_NOTIFICATIONS_WATERMARK, AppCounter.value == watermark)
+            .values(value=new_watermark)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not advanced:
+            db.session.rollback()
+            break
+
+        db.session.commit()
+        created += len(new_notifications)
+        watermark = new_watermark
+
+    # Проверяем страховки (здесь нужно будет добавить логику для отслеживания дат страховки)
+    return created
+
+notifications_log = logging.getLogger('fleet.notifications')
+
+def notify_new_rental_events():
+    """
+    Запускает генератор уведомлений сразу после записи событий: он обработает только
+    события после водяного знака, поэтому при обычном добавлении это пара запросов.
+    Сбой генератора не отменяет уже сохраненные события - их подберет следующий запуск.
+    """
+    try:
+        return check_and_create_notifications()
+    except Exception:
+        db.session.rollback()
+        notifications_log.exception('Генератор уведомлений не отработал после записи событий')
+        return 0
+
+# Сколько событий вставлять одним INSERT при импорте
+IMPORT_BATCH_SIZE = 5000
+
+# Сколько ошибок строк показывать пользователю
+IMPORT_MAX_ERRORS = 50
+
+# Колонки файла импорта: поле -> допустимые заголовки (совпадают с выгрузкой /export/events)
+IMPORT_COLUMNS = {
+    'date': ['дата', 'date'],
+    'event_type': ['тип', 'event_type'],
+    'subtype': ['подтип', 'підтип', 'subtype'],
+    'vehicle': ['тс', 'позывной', 'госномер', 'vehicle'],
+    'contractor': ['контрагент', 'contractor'],
+    'amount': ['сумма', 'сума', 'amount'],
+    'description': ['описание', 'опис', 'description'],
+}
+
+# Названия полей импорта (событий и ТС) в сообщениях об ошибках
+IMPORT_FIELD_TITLES = {
+    'date': 'дата',
+    'event_type': 'тип',
+    'subtype': 'підтип',
+    'vehicle': 'ТЗ',
+    'contractor': 'контрагент',
+    'amount': 'сума',
+    'description': 'опис',
+    'call_sign': 'позивний',
+    'brand': 'марка',
+    'model': 'модель',
+    'year': 'рік',
+    'engine_volume': "об'єм двигуна",
+    'vin_code': 'VIN-код',
+    'license_plate': 'номер',
+    'mileage': 'пробіг',
+    'cost': 'вартість',
+}
+
+IMPORT_DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d', '%d.%m.%Y %H:%M', '%d.%m.%Y']
+
+class ImportRowError(Exception):
+    """Ошибка в строке файла импорта"""
+
+def read_import_rows(file, filename):
+    """Построчно читает CSV или XLSX; возвращает итератор списков значений, первая строка - заголовок"""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        for row in workbook.active.iter_rows(values_only=True):
+            yield list(row)
+        workbook.close()
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        yield from csv.reader(text)
+
+def import_column_positions(header, columns=IMPORT_COLUMNS, required=('date', 'event_type', 'subtype')):
+    """Номера колонок файла для полей; без обязательных колонок импорт невозможен"""
+    aliases = {alias: field for field, names in columns.items() for alias in names}
+    positions = {}
+    for index, title in enumerate(header):
+        field = aliases.get(str(title or '').strip().lower())
+        if field and field not in positions:
+            positions[field] = index
+    missing = [field for field in required if field not in positions]
+    if missing:
+        raise ImportRowError(f"немає колонок: {', '.join(IMPORT_FIELD_TITLES[field] for field in missing)}")
+    return positions
+
+def parse_import_date(value):
+    if isinstance(value, datetime):
+        return value
+    if hasattr(value, 'year'):
+        return datetime(value.year, value.month, value.day)
+    value = str(value or '').strip()
+    # ISO-формат (как в выгрузке) разбирается быстро, остальные - перебором форматов
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for date_format in IMPORT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ImportRowError(f"невірна дата '{value}'")
+
+def parse_import_amount(value):
+    if value is None or value == '':
+        return 0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(' ', '').replace('\xa0', '').replace(',', '.'))
+    except ValueError:
+        raise ImportRowError(f"невірна сума '{value}'")
+
+def import_lookup_maps():
+    """
+    Справочники для импорта одним запросом на таблицу:
+    ТС по позывному и госномеру, контрагенты по наименованию (None - имя неоднозначно)
+    """
+    vehicles = {}
+    for vehicle_id, call_sign, license_plate in db.session.query(Vehicle.id, Vehicle.call_sign, Vehicle.license_plate):
+        vehicles[call_sign.strip().upper()] = vehicle_id
+        vehicles[license_plate.strip().upper()] = vehicle_id
+    contractors = {}
+    for contractor_id, name in db.session.query(Contractor.id, Contractor.name):
+        key = name.strip().lower()
+        contractors[key] = None if key in contractors else contractor_id
+    return vehicles, contractors
+
+def import_events(rows, created_by=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Массовый импорт событий журнала одной транзакцией.
+    ТС и контрагенты ищутся по справочникам в памяти, события вставляются пачками,
+    денежный поток и помесячная сводка обновляются одним изменением на дату / месяц.
+    При любой ошибке в строках ничего не сохраняется.
+    Возвращает (количество событий, список ошибок).
+    Уведомления об аренде по новым событиям создает генератор уведомлений.
+    """
+    rows = iter(rows)
+    try:
+        positions = import_column_positions(next(rows, None) or [])
+    except ImportRowError as e:
+        return 0, [f'Заголовок: {e}']
+
+    vehicles, contractors = import_lookup_maps()
+    cashflow_deltas = {}
+    monthly_deltas = {}
+    errors = []
+    imported = 0
+    batch = []
+    created_at = datetime.utcnow()
+
+    def value(row, field):
+        index = positions.get(field)
+        return row[index] if index is not None and index < len(row) else None
+
+    try:
+        for line_number, row in enumerate(rows, 2):
+            if not any(cell not in (None, '') for cell in row):
+                continue
+            try:
+                event_date = parse_import_date(value(row, 'date'))
+                event_type = str(value(row, 'event_type') or '').strip().lower()
+                subtype = str(value(row, 'subtype') or '').strip().upper()
+                if event_type not in EVENT_SUBTYPES:
+                    raise ImportRowError(f"невідомий тип '{event_type}'")
+                if subtype not in EVENT_SUBTYPES[event_type]:
+                    raise ImportRowError(f"невідомий підтип '{subtype}' для типу '{event_type}'")
+
+                vehicle_id = None
+                vehicle_key = str(value(row, 'vehicle') or '').strip().upper()
+                if vehicle_key:
+                    vehicle_id = vehicles.get(vehicle_key)
+                    if vehicle_id is None:
+                        raise ImportRowError(f"ТЗ '{vehicle_key}' не знайдено")
+
+                contractor_id = None
+                contractor_key = str(value(row, 'contractor') or '').strip().lower()
+                if contractor_key:
+                    if contractor_key not in contractors:
+                        raise ImportRowError(f"контрагента '{contractor_key}' не знайдено")
+                    contractor_id = contractors[contractor_key]
+                    if contractor_id is None:
+                        raise ImportRowError(f"кілька контрагентів з назвою '{contractor_key}'")
+
+                amount = parse_import_amount(value(row, 'amount'))
+            except ImportRowError as e:
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append(f'Рядок {line_number}: {e}')
+                else:
+                    errors[-1] = f'... та інші помилки (показано перші {IMPORT_MAX_ERRORS - 1})'
+                continue
+
+            if errors:
+                # Сохранять все равно не будем - только проверяем остальные строки
+                continue
+
+            batch.append({
+                'date': event_date,
+                'event_type': event_type,
+                'subtype': subtype,
+                'vehicle_id': vehicle_id,
+                'contractor_id': contractor_id,
+                'amount': amount,
+                'description': str(value(row, 'description') or ''),
+                'created_by': created_by,
+                'created_at': created_at,
+            })
+
+            # Как в add_event: денежный поток меняют только события с положительной суммой
+            if amount > 0:
+                delta = cashflow_delta_for_event(event_type, subtype, amount)
+                totals = cashflow_deltas.setdefault(event_date.date(), [0, 0, 0])
+                for index, part in enumerate(delta):
+                    totals[index] += part
+
+            month_totals = monthly_deltas.setdefault((month_start(event_date), event_type), [0, 0])
+            month_totals[0] += 1
+            month_totals[1] += amount
+
+            if len(batch) >= batch_size:
+                db.session.execute(db.insert(EventJournal), batch)
+                imported += len(batch)
+                batch = []
+
+        if errors:
+            db.session.rollback()
+            return 0, errors
+
+        if batch:
+            db.session.execute(db.insert(EventJournal), batch)
+            imported += len(batch)
+
+        for day, (income, expenses, credit_load) in sorted(cashflow_deltas.items()):
+            if income or expenses or credit_load:
+                apply_cashflow_delta(day, income=income, expenses=expenses, credit_load=credit_load)
+        for (month, event_type), (count, amount) in sorted(monthly_deltas.items()):
+            update_monthly_stats(month, event_type, amount, events_count=count)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return imported, errors
+
+# Сколько ТС проверять и вставлять за раз при импорте
+VEHICLE_IMPORT_BATCH_SIZE = 500
+
+# Колонки файла импорта ТС (совпадают с выгрузкой /export/vehicles)
+VEHICLE_IMPORT_COLUMNS = {
+    'call_sign': ['позывной', 'позивний', 'call_sign'],
+    'brand': ['марка', 'brand'],
+    'model': ['модель', 'model'],
+    'year': ['год', 'рік', 'year'],
+    'engine_volume': ['объем двигателя', "об'єм двигуна", 'engine_volume'],
+    'vin_code': ['vin', 'vin_code'],
+    'license_plate': ['госномер', 'номер', 'license_plate'],
+    'mileage': ['пробег', 'пробіг', 'mileage'],
+    'cost': ['стоимость', 'вартість', 'cost'],
+}
+
+# Уникальные колонки ТС и их названия в отчете об ошибках
+VEHICLE_UNIQUE_FIELDS = {
+    'vin_code': 'VIN-код',
+    'license_plate': 'номер',
+    'call_sign': 'позивний',
+}
+
+def parse_vehicle_row(row, positions):
+    """Значения ТС из строки файла; список ошибок вместо исключения, чтобы показать все сразу"""
+    def value(field):
+        index = positions.get(field)
+        cell = row[index] if index is not None and index < len(row) else None
+        return '' if cell is None else str(cell).strip()
+
+    def number(field, cast, default):
+        raw = value(field).replace(' ', '').replace(',', '.')
+        if not raw:
+            return default
+        try:
+            return cast(float(raw))
+        except ValueError:
+            errors.append(f"невірне значення поля «{IMPORT_FIELD_TITLES[field]}» '{raw}'")
+            return default
+
+    errors = []
+    vehicle = {field: value(field) for field in ('brand', 'model', 'vin_code', 'license_plate', 'call_sign')}
+    for field, text in vehicle.items():
+        if not text:
+            errors.append(f'не заповнено поле «{IMPORT_FIELD_TITLES[field]}»')
+    if len(vehicle['vin_code']) > 17:
+        errors.append(f"VIN '{vehicle['vin_code']}' довший за 17 символів")
+    if not value('year'):
+        errors.append(f"не заповнено поле «{IMPORT_FIELD_TITLES['year']}»")
+    vehicle['year'] = number('year', int, None)
+    vehicle['engine_volume'] = number('engine_volume', float, None)
+    vehicle['mileage'] = number('mileage', int, 0)
+    vehicle['cost'] = number('cost', float, 0)
+    return vehicle, errors
+
+def existing_vehicle_values(vehicles):
+    """Уже занятые в БД VIN, номера и позывные из пачки - один запрос IN (...) на колонку"""
+    taken = {}
+    for field in VEHICLE_UNIQUE_FIELDS:
+        column = getattr(Vehicle, field)
+        values = {vehicle[field] for vehicle in vehicles}
+        taken[field] = {row[0] for row in db.session.query(column).filter(column.in_(values))} if values else set()
+    return taken
+
+def insert_vehicles(batch):
+    """
+    Вставляет пачку ТС в SAVEPOINT. Если параллельный запрос успел занять значение
+    (нарушение уникальности), пачка вставляется построчно, чтобы найти конфликтные строки.
+    Возвращает (количество вставленных, ошибки по строкам).
+    """
+    rows = [vehicle for _, vehicle in batch]
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(Vehicle), rows)
+        return len(rows), []
+    except IntegrityError:
+        pass
+
+    inserted, errors = 0, []
+    for line_number, vehicle in batch:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(Vehicle), [vehicle])
+            inserted += 1
+        except IntegrityError:
+            errors.append((line_number, 'ТЗ з таким VIN-кодом, номером або позивним вже існує'))
+    return inserted, errors
+
+def import_vehicles(rows, batch_size=VEHICLE_IMPORT_BATCH_SIZE):
+    """
+    Массовое добавление ТС. Уникальность VIN, номера и позывного проверяется
+    пачками против БД (IN-запросы) и внутри файла (в памяти); гонки с параллельными
+    вставками ловят уникальные индексы. Корректные строки сохраняются,
+    по остальным возвращается отчет. Возвращает (количество ТС, список ошибок по строкам).
+    """
+    rows = iter(rows)
+    try:
+        positions = import_column_positions(
+            next(rows, None) or [], VEHICLE_IMPORT_COLUMNS,
+            ('brand', 'model', 'year', 'vin_code', 'license_plate', 'call_sign')
+        )
+    except ImportRowError as e:
+        return 0, [f'Заголовок: {e}']
+
+    seen = {field: {} for field in VEHICLE_UNIQUE_FIELDS}
+    imported = 0
+    errors = []
+
+    def flush(pending):
+        nonlocal imported
+        if not pending:
+            return
+        taken = existing_vehicle_values([vehicle for _, vehicle in pending])
+        batch = []
+        for line_number, vehicle in pending:
+            conflicts = [
+                f"{title} {vehicle[field]} вже існує"
+                for field, title in VEHICLE_UNIQUE_FIELDS.items()
+                if vehicle[field] in taken[field]
+            ]
+            if conflicts:
+                errors.append((line_number, '; '.join(conflicts)))
+            else:
+                batch.append((line_number, vehicle))
+        if batch:
+            inserted, batch_errors = insert_vehicles(batch)
+            imported += inserted
+            errors.extend(batch_errors)
+
+    try:
+        pending = []
+        for line_number, row in enumerate(rows, 2):
+            if not any(cell not in (None, '') for cell in row):
+                continue
+            vehicle, row_errors = parse_vehicle_row(row, positions)
+            for field, title in VEHICLE_UNIQUE_FIELDS.items():
+                first_line = seen[field].get(vehicle[field])
+                if vehicle[field] and first_line:
+                    row_errors.append(f"{title} {vehicle[field]} повторює рядок {first_line}")
+            if row_errors:
+                errors.append((line_number, '; '.join(row_errors)))
+                continue
+            for field in VEHICLE_UNIQUE_FIELDS:
+                seen[field][vehicle[field]] = line_number
+
+            pending.append((line_number, vehicle))
+            if len(pending) >= batch_size:
+                flush(pending)
+                pending = []
+        flush(pending)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return imported, [f'Рядок {line_number}: {message}' for line_number, message in sorted(errors)]
+
+def vehicle_payback(vehicle, events):
+    """
+    Окупаемость ТС по его событиям за один проход: полная стоимость (цена + інвестиції + видатки),
+    доход, сальдо и недели до окупаемости по сумме последнего в списке арендного платежа
+    """
+    totals = {'інвестиції': 0, 'видатки': 0, 'надходження': 0}
+    last_rental = None
+    for event in events:
+        if event.event_type in totals:
+            totals[event.event_type] += event.amount
+        if event.subtype == 'ОРЕНДА':
+            last_rental = event
+
+    total_cost = vehicle.cost + totals['інвестиції'] + totals['видатки']
+    balance = totals['надходження'] - total_cost
+    weeks_to_payback = None
+    if last_rental and last_rental.amount > 0:
+        weeks_to_payback = round(balance / last_rental.amount, 1)
+    return {
+        'total_cost': total_cost,
+        'income': totals['надходження'],
+        'balance': balance,
+        'weeks_to_payback': weeks_to_payback,
+    }
@@ -1,14 +1,13 @@
-from app import app, db
+import os
 
-with app.app_context():
-    print("Создаем таблицы...")
-    db.create_all()
-    print("Таблицы созданы!")
-    
-    # Проверяем, что файл создался
-    import os
-    if os.path.exists('fleet.db'):
-        print("✅ База данных создана!")
-        print(f"Размер: {os.path.getsize('fleet.db')} байт")
-    else:
-        print("❌ База данных не создана!")
+from app import create_app, init_database
+
+# Таблицы, индексы и полнотекстовый поиск - как `flask --app app init-db`
+init_database(create_app())
+
+# Проверяем, что файл создался
+if os.path.exists('fleet.db'):
+    print("✅ База данных создана!")
+    print(f"Размер: {os.path.getsize('fleet.db')} байт")
+else:
+    print("❌ База данных не создана!")
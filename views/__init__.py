@@ -0,0 +1 @@
+"""Разделы приложения (blueprints); регистрируются в app.create_app"""
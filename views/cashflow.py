@@ -0,0 +1,54 @@
+"""Денежный поток: таблица по дням, ручные записи и сверка с журналом"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from datetime import datetime
+
+from models import db, CashFlow
+from services import apply_cashflow_delta, format_cashflow_difference, reconcile_cashflow
+
+cashflow_bp = Blueprint('cashflow', __name__)
+
+@cashflow_bp.route('/cashflow')
+@login_required
+def cashflow():
+    cashflow_entries = CashFlow.query.order_by(CashFlow.date.desc()).all()
+    return render_template('cashflow.html', cashflow_entries=cashflow_entries)
+
+@cashflow_bp.route('/cashflow/add', methods=['GET', 'POST'])
+@login_required
+def add_cashflow():
+    if request.method == 'POST':
+        # Проверяем, существует ли уже запись на эту дату
+        entry_date = datetime.strptime(request.form['date'], '%Y-%m-%d').date()
+        existing_entry = db.session.query(CashFlow.id).filter_by(date=entry_date).first()
+
+        # Прибавляем суммы атомарным upsert (сальдо пересчитывается там же)
+        apply_cashflow_delta(
+            entry_date,
+            income=float(request.form['income']) if request.form['income'] else 0,
+            expenses=float(request.form['expenses']) if request.form['expenses'] else 0,
+            credit_load=float(request.form['credit_load']) if request.form['credit_load'] else 0
+        )
+        db.session.commit()
+        flash('Запис оновлено' if existing_entry else 'Запис додано', 'success')
+        return redirect(url_for('cashflow.cashflow'))
+    
+    return render_template('add_cashflow.html')
+
+# Сколько расхождений отдавать в ответе сверки
+RECONCILE_RESPONSE_LIMIT = 500
+
+@cashflow_bp.route('/cashflow/reconcile', methods=['GET', 'POST'])
+@login_required
+def reconcile_cashflow_route():
+    """Сверка денежного потока с журналом (GET - показать, POST - исправить), только для администратора"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Forbidden'}), 403
+
+    summary, differences = reconcile_cashflow(apply=request.method == 'POST')
+    summary['differences'] = [
+        format_cashflow_difference(*difference) for difference in differences[:RECONCILE_RESPONSE_LIMIT]
+    ]
+    summary['truncated'] = len(differences) > RECONCILE_RESPONSE_LIMIT
+    return jsonify(summary)
@@ -0,0 +1,199 @@
+"""Журнал событий: лента, добавление, импорт, удаление и события по ТС / контрагенту"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager
+from datetime import datetime
+
+from models import db, Vehicle, Contractor, EventJournal
+from services import (
+    EVENT_TYPES, EVENT_SUBTYPES, EVENTS_PER_PAGE, EVENTS_MAX_PER_PAGE, decode_event_cursor,
+    encode_event_cursor, filter_events_query, import_events, notify_new_rental_events, read_import_rows,
+    update_cashflow_from_event, update_monthly_stats, vehicle_payback,
+)
+
+events_bp = Blueprint('events', __name__)
+
+@events_bp.route('/events')
+@login_required
+def events():
+    """Журнал событий с keyset-пагинацией по (date, id) и фильтрами в SQL"""
+    filters = {
+        'q': request.args.get('q', '').strip(),
+        'type': request.args.get('type', '').strip(),
+        'amount': request.args.get('amount', '').strip(),
+    }
+    filters = {key: value for key, value in filters.items() if value}
+    per_page = request.args.get('per_page', EVENTS_PER_PAGE, type=int)
+    per_page = max(1, min(per_page, EVENTS_MAX_PER_PAGE))
+    before = decode_event_cursor(request.args.get('before'))
+    after = decode_event_cursor(request.args.get('after'))
+
+    base_query = EventJournal.query.join(Vehicle).outerjoin(Contractor).options(
+        contains_eager(EventJournal.vehicle),
+        contains_eager(EventJournal.contractor)
+    )
+    base_query = filter_events_query(
+        base_query,
+        search=filters.get('q', ''),
+        event_type=filters.get('type', ''),
+        amount_filter=filters.get('amount', '')
+    )
+
+    def newest_first(query):
+        return query.order_by(EventJournal.date.desc(), EventJournal.id.desc()).limit(per_page + 1).all()
+
+    if after:
+        # Листаем к более новым событиям: идем по возрастанию и разворачиваем страницу
+        page = base_query.filter(or_(
+            EventJournal.date > after[0],
+            and_(EventJournal.date == after[0], EventJournal.id > after[1])
+        )).order_by(EventJournal.date.asc(), EventJournal.id.asc()).limit(per_page + 1).all()
+        has_newer = len(page) > per_page
+        page = page[:per_page]
+        page.reverse()
+        if not has_newer:
+            # Дошли до начала журнала - показываем первую страницу целиком
+            page = newest_first(base_query)
+            has_older = len(page) > per_page
+            page = page[:per_page]
+        else:
+            has_older = True
+    else:
+        query = base_query
+        if before:
+            query = query.filter(or_(
+                EventJournal.date < before[0],
+                and_(EventJournal.date == before[0], EventJournal.id < before[1])
+            ))
+        page = newest_first(query)
+        has_older = len(page) > per_page
+        page = page[:per_page]
+        has_newer = before is not None
+
+    older_cursor = encode_event_cursor(page[-1]) if page and has_older else None
+    newer_cursor = encode_event_cursor(page[0]) if page and has_newer else None
+
+    return render_template('events.html',
+                         events=page,
+                         filters=filters,
+                         per_page=per_page,
+                         older_cursor=older_cursor,
+                         newer_cursor=newer_cursor,
+                         event_types=EVENT_TYPES)
+
+@events_bp.route('/events/add', methods=['GET', 'POST'])
+@login_required
+def add_event():
+    if request.method == 'POST':
+        # Гибкий парсинг даты - поддерживает как YYYY-MM-DD, так и YYYY-MM-DDTHH:MM
+        date_str = request.form['date']
+        try:
+            if 'T' in date_str:
+                event_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
+            else:
+                event_date = datetime.strptime(date_str, '%Y-%m-%d')
+        except ValueError:
+            # Если не удалось распарсить, используем текущую дату
+            event_date = datetime.now()
+            
+        amount = float(request.form['amount']) if request.form['amount'] else 0
+        
+        event = EventJournal(
+            date=event_date,
+            event_type=request.form['event_type'],
+            subtype=request.form['subtype'],
+            vehicle_id=int(request.form['vehicle_id']) if request.form['vehicle_id'] else None,
+            contractor_id=int(request.form['contractor_id']) if request.form['contractor_id'] else None,
+            amount=amount,
+            description=request.form['description'],
+            created_by=current_user.id
+        )
+        # Событие, сводка и денежный поток - одна транзакция. Уведомление о следующем
+        # арендном платеже создает генератор, он запускается после COMMIT
+        try:
+            db.session.add(event)
+            update_monthly_stats(event_date, event.event_type, amount)
+
+            if amount > 0:
+                # Автоматически обновляем денежный поток
+                update_cashflow_from_event(event_date, event.event_type, event.subtype, amount)
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Помилка при додаванні події: {str(e)}', 'error')
+            return redirect(url_for('events.add_event'))
+        notify_new_rental_events()
+
+        if amount > 0:
+            flash('Подію додано та оновлено грошовий потік', 'success')
+        else:
+            flash('Подію додано', 'success')
+            
+        return redirect(url_for('events.events'))
+    
+    vehicles = Vehicle.query.all()
+    contractors = Contractor.query.all()
+    return render_template('add_event.html', 
+                         vehicles=vehicles, 
+                         contractors=contractors,
+                         event_types=EVENT_TYPES,
+                         event_subtypes=EVENT_SUBTYPES)
+
+@events_bp.route('/events/import', methods=['POST'])
+@login_required
+def import_events_route():
+    file = request.files.get('file')
+    if not file or not file.filename:
+        flash('Виберіть файл CSV або XLSX', 'error')
+        return redirect(url_for('events.events'))
+    if not file.filename.lower().endswith(('.csv', '.xlsx')):
+        flash('Підтримуються лише файли CSV та XLSX', 'error')
+        return redirect(url_for('events.events'))
+
+    imported, errors = import_events(read_import_rows(file.stream, file.filename), created_by=current_user.id)
+    if imported:
+        notify_new_rental_events()
+    if errors:
+        flash('Файл не імпортовано: ' + '; '.join(errors[:10]), 'error')
+    else:
+        flash(f'Імпортовано подій: {imported}', 'success')
+    return redirect(url_for('events.events'))
+
+@events_bp.route('/events/delete/<int:event_id>', methods=['POST'])
+@login_required
+def delete_event(event_id):
+    event = EventJournal.query.get_or_404(event_id)
+    
+    try:
+        # Корректируем денежный поток при удалении события
+        if event.amount > 0:
+            update_cashflow_from_event(event.date, event.event_type, event.subtype, event.amount, 'remove')
+        
+        # Удаляем событие
+        update_monthly_stats(event.date, event.event_type, event.amount, 'remove')
+        db.session.delete(event)
+        db.session.commit()
+        flash('Подію видалено та оновлено грошовий потік', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Помилка при видаленні події: {str(e)}', 'error')
+    
+    return redirect(url_for('events.events'))
+
+@events_bp.route('/events/by_contractor/<int:contractor_id>')
+@login_required
+def events_by_contractor(contractor_id):
+    contractor = Contractor.query.get_or_404(contractor_id)
+    events = EventJournal.query.filter_by(contractor_id=contractor_id).order_by(EventJournal.date.desc()).all()
+    return render_template('events_by_contractor.html', events=events, contractor=contractor)
+
+@events_bp.route('/events/by_vehicle/<int:vehicle_id>')
+@login_required
+def events_by_vehicle(vehicle_id):
+    vehicle = Vehicle.query.get_or_404(vehicle_id)
+    events = EventJournal.query.filter_by(vehicle_id=vehicle_id).order_by(EventJournal.date.desc()).all()
+    return render_template('events_by_vehicle.html', events=events, vehicle=vehicle,
+                           payback=vehicle_payback(vehicle, events))
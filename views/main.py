@@ -0,0 +1,402 @@
+"""Вход, панель управления, поиск, контрагенты, служебные адреса и JSON API"""
+
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_user, login_required, logout_user, current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager
+from werkzeug.security import check_password_hash
+from datetime import datetime, date, timedelta
+from functools import wraps
+import os
+import json
+import hashlib
+import base64
+from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+
+from models import db, User, Vehicle, Contractor, EventJournal, CashFlow, Notification, AppCounter
+from services import (
+    CONTRACTOR_TYPES, RENTAL_NOTIFICATIONS_WATERMARK, SEARCH_RESULTS_LIMIT, SEARCH_MAX_RESULTS_LIMIT,
+    dashboard_chart_data, events_summary_by, get_data_versions, init_database, search_records,
+)
+
+main_bp = Blueprint('main', __name__)
+
+@main_bp.route('/')
+def index():
+    try:
+        if current_user.is_authenticated:
+            return redirect(url_for('main.dashboard'))
+        return render_template('index.html')
+    except Exception as e:
+        print(f"Error in index route: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@main_bp.route('/health')
+def health_check():
+    return jsonify({
+        'status': 'healthy', 
+        'timestamp': datetime.utcnow(),
+        'message': 'Application is running'
+    })
+
+def notification_backlog():
+    """Арендные события, которые генератор уведомлений еще не обработал"""
+    watermark = db.session.query(AppCounter.value).filter_by(name=RENTAL_NOTIFICATIONS_WATERMARK).scalar() or 0
+    return db.session.query(db.func.count(EventJournal.id)).filter(
+        EventJournal.event_type == 'надходження',
+        EventJournal.subtype == 'ОРЕНДА',
+        EventJournal.id > watermark
+    ).scalar()
+
+class ScrapeCollector:
+    """Метрики, которые считаются по БД в момент выдачи /metrics, а не копятся в воркерах"""
+    def collect(self):
+        yield GaugeMetricFamily('fleet_notification_backlog', 'Арендные события без уведомлений',
+                                value=notification_backlog())
+
+@main_bp.route('/metrics')
+def metrics():
+    """Метрики в формате Prometheus, суммарно по всем воркерам"""
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'error': 'Unauthorized'}), 401
+    elif not current_app.config['METRICS_PUBLIC']:
+        return jsonify({'error': 'Forbidden'}), 403
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        from prometheus_client import REGISTRY as registry
+    scrape_registry = CollectorRegistry()
+    scrape_registry.register(ScrapeCollector())
+    return Response(generate_latest(registry) + generate_latest(scrape_registry), content_type=CONTENT_TYPE_LATEST)
+
+@main_bp.route('/init-db', methods=['POST'])
+@login_required
+def init_db_route():
+    """Повторная инициализация схемы, только для администратора (обычно выполняется `flask init-db`)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Forbidden'}), 403
+
+    try:
+        init_database()
+        return jsonify({
+            'status': 'success',
+            'message': 'База данных инициализирована успешно'
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Ошибка инициализации: {str(e)}'
+        }), 500
+
+@main_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        try:
+            username = request.form['username']
+            password = request.form['password']
+
+            user = User.query.filter_by(username=username).first()
+            
+            if user and check_password_hash(user.password_hash, password):
+                login_user(user)
+                return redirect(url_for('main.dashboard'))
+            else:
+                flash('Невірне ім\'я користувача або пароль', 'error')
+        except Exception as e:
+            print(f"Ошибка при входе: {e}")
+            flash('Помилка підключення до бази даних. Спробуйте пізніше.', 'error')
+    
+    return render_template('login.html')
+
+@main_bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('main.index'))
+
+@main_bp.route('/dashboard')
+@login_required
+def dashboard():
+    # Статистика считается агрегатами в БД, без загрузки всех ТС
+    total_vehicles, active_vehicles = db.session.query(
+        db.func.count(Vehicle.id),
+        db.func.count(db.case((Vehicle.status == 'active', Vehicle.id)))
+    ).one()
+    total_contractors = db.session.query(db.func.count(Contractor.id)).scalar()
+
+    today_start = datetime.combine(datetime.now().date(), datetime.min.time())
+    events_today = db.session.query(db.func.count(EventJournal.id)).filter(
+        EventJournal.date >= today_start,
+        EventJournal.date < today_start + timedelta(days=1)
+    ).scalar()
+
+    # Последние события
+    latest_events = EventJournal.query.join(Vehicle).outerjoin(Contractor).options(
+        contains_eager(EventJournal.vehicle),
+        contains_eager(EventJournal.contractor)
+    ).order_by(EventJournal.date.desc(), EventJournal.id.desc()).limit(5).all()
+    
+    return render_template('dashboard.html', 
+                         total_vehicles=total_vehicles,
+                         active_vehicles=active_vehicles,
+                         total_contractors=total_contractors,
+                         events_today=events_today,
+                         latest_events=latest_events,
+                         chart_data=dashboard_chart_data())
+
+@main_bp.route('/search')
+@login_required
+def search():
+    """Поиск по журналу, ТС и контрагентам; JSON для API-клиентов, иначе страница результатов"""
+    query_text = request.args.get('q', '').strip()
+    kinds = request.args.getlist('kind') or None
+    limit = min(request.args.get('limit', SEARCH_RESULTS_LIMIT, type=int), SEARCH_MAX_RESULTS_LIMIT)
+    results = search_records(query_text, kinds=kinds, limit=max(limit, 1))
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'query': query_text, 'results': results})
+    return render_template('search.html', query=query_text, results=results)
+
+@main_bp.route('/contractors')
+@login_required
+def contractors():
+    contractors = Contractor.query.all()
+    event_counts, latest_events = events_summary_by(EventJournal.contractor_id, [contractor.id for contractor in contractors])
+    return render_template('contractors.html',
+                         contractors=contractors,
+                         event_counts=event_counts,
+                         latest_events=latest_events)
+
+@main_bp.route('/contractors/add', methods=['GET', 'POST'])
+@login_required
+def add_contractor():
+    if request.method == 'POST':
+        contractor = Contractor(
+            contractor_type=request.form['contractor_type'],
+            subtype=request.form['subtype'],
+            name=request.form['name'],
+            phone=request.form['phone'],
+            location=request.form['location'],
+            notes=request.form['notes']
+        )
+        db.session.add(contractor)
+        db.session.commit()
+        flash('Контрагента додано', 'success')
+        return redirect(url_for('main.contractors'))
+    
+    return render_template('add_contractor.html', contractor_types=CONTRACTOR_TYPES)
+
+# JSON API: размер страницы по умолчанию и максимальный
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+# Ресурсы API: поля (имя -> колонка), таблицы для ETag, порядок keyset-пагинации и фильтры
+API_RESOURCES = {
+    'vehicles': {
+        'fields': {
+            'id': Vehicle.id, 'call_sign': Vehicle.call_sign, 'brand': Vehicle.brand, 'model': Vehicle.model,
+            'year': Vehicle.year, 'engine_volume': Vehicle.engine_volume, 'vin_code': Vehicle.vin_code,
+            'license_plate': Vehicle.license_plate, 'mileage': Vehicle.mileage, 'last_to_date': Vehicle.last_to_date,
+            'cost': Vehicle.cost, 'payback_weeks': Vehicle.payback_weeks, 'status': Vehicle.status,
+            'created_at': Vehicle.created_at,
+        },
+        'tables': ['vehicle'],
+        'order': [Vehicle.id],
+        'descending': False,
+        'filters': {'status': Vehicle.status},
+    },
+    'contractors': {
+        'fields': {
+            'id': Contractor.id, 'contractor_type': Contractor.contractor_type, 'subtype': Contractor.subtype,
+            'name': Contractor.name, 'phone': Contractor.phone, 'location': Contractor.location,
+            'notes': Contractor.notes, 'created_at': Contractor.created_at,
+        },
+        'tables': ['contractor'],
+        'order': [Contractor.id],
+        'descending': False,
+        'filters': {'contractor_type': Contractor.contractor_type},
+    },
+    'events': {
+        'fields': {
+            'id': EventJournal.id, 'date': EventJournal.date, 'event_type': EventJournal.event_type,
+            'subtype': EventJournal.subtype, 'vehicle_id': EventJournal.vehicle_id,
+            'vehicle_call_sign': Vehicle.call_sign, 'contractor_id': EventJournal.contractor_id,
+            'contractor_name': Contractor.name, 'amount': EventJournal.amount,
+            'description': EventJournal.description, 'created_at': EventJournal.created_at,
+        },
+        'tables': ['event_journal', 'vehicle', 'contractor'],
+        'joins': lambda query: query.outerjoin(Vehicle, EventJournal.vehicle_id == Vehicle.id).outerjoin(
+            Contractor, EventJournal.contractor_id == Contractor.id
+        ),
+        'order': [EventJournal.date, EventJournal.id],
+        'descending': True,
+        'filters': {
+            'event_type': EventJournal.event_type,
+            'vehicle_id': EventJournal.vehicle_id,
+            'contractor_id': EventJournal.contractor_id,
+        },
+    },
+    'cashflow': {
+        'fields': {
+            'date': CashFlow.date, 'income': CashFlow.income, 'expenses': CashFlow.expenses,
+            'credit_load': CashFlow.credit_load, 'balance': CashFlow.balance,
+        },
+        'tables': ['cash_flow'],
+        'order': [CashFlow.date],
+        'descending': True,
+        'filters': {},
+    },
+    'notifications': {
+        'fields': {
+            'id': Notification.id, 'type': Notification.type, 'title': Notification.title,
+            'message': Notification.message, 'vehicle_id': Notification.vehicle_id,
+            'contractor_id': Notification.contractor_id, 'due_date': Notification.due_date,
+            'amount': Notification.amount, 'is_read': Notification.is_read,
+            'is_processed': Notification.is_processed, 'created_at': Notification.created_at,
+        },
+        'tables': ['notification'],
+        'order': [Notification.id],
+        'descending': True,
+        'filters': {'type': Notification.type, 'is_read': Notification.is_read, 'is_processed': Notification.is_processed},
+    },
+}
+
+class ApiError(Exception):
+    """Ошибка запроса к API - отдается клиенту как 400 с текстом"""
+
+def api_login_required(view):
+    """Как login_required, но без редиректа на форму входа: API-клиент получает 401"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def api_json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def api_json_response(payload, status=200):
+    """Компактный JSON без пробелов и без экранирования кириллицы"""
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=api_json_value)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+def encode_api_cursor(values):
+    """Курсор - значения колонок порядка последней строки страницы"""
+    raw = json.dumps([api_json_value(value) if isinstance(value, (datetime, date)) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_api_cursor(cursor, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if len(values) != len(columns):
+            raise ValueError
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type in (datetime, date):
+                decoded.append(python_type.fromisoformat(value))
+            else:
+                decoded.append(python_type(value))
+        return decoded
+    except (ValueError, TypeError):
+        raise ApiError('invalid cursor')
+
+def keyset_condition(columns, values, descending):
+    """Строки после курсора в порядке columns: (a, b) < (x, y), развернутое в OR для любой БД"""
+    conditions = []
+    for index, column in enumerate(columns):
+        compare = column < values[index] if descending else column > values[index]
+        conditions.append(and_(*(previous == value for previous, value in zip(columns[:index], values[:index])), compare))
+    return or_(*conditions)
+
+def api_filter_value(column, raw):
+    python_type = column.type.python_type
+    if python_type is bool:
+        if raw.lower() not in ('1', '0', 'true', 'false'):
+            raise ApiError(f'invalid boolean {raw!r}')
+        return raw.lower() in ('1', 'true')
+    try:
+        return python_type(raw)
+    except ValueError:
+        raise ApiError(f'invalid value {raw!r}')
+
+def api_list(resource_name):
+    """
+    Страница ресурса: только запрошенные колонки (?fields=), фильтры по равенству,
+    keyset-пагинация (?cursor=, ?limit=). ETag считается по версиям таблиц до запроса к данным,
+    поэтому опрос без изменений получает 304 без выборки строк.
+    """
+    resource = API_RESOURCES[resource_name]
+    args = request.args
+
+    field_names = [name.strip() for name in args.get('fields', '').split(',') if name.strip()] or list(resource['fields'])
+    unknown = [name for name in field_names if name not in resource['fields']]
+    if unknown:
+        raise ApiError(f"unknown fields: {', '.join(unknown)}")
+    limit = args.get('limit', API_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+
+    versions = get_data_versions(resource['tables'])
+    etag_source = json.dumps([resource_name, sorted(versions.items()), sorted(args.items(multi=True))])
+    etag = hashlib.sha256(etag_source.encode()).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        order = resource['order']
+        query = db.select(
+            *(resource['fields'][name].label(name) for name in field_names),
+            *(column.label(f'_cursor_{index}') for index, column in enumerate(order))
+        ).select_from(order[0].class_)
+        if 'joins' in resource:
+            query = resource['joins'](query)
+        for name, column in resource['filters'].items():
+            if name in args:
+                query = query.where(column == api_filter_value(column, args[name]))
+        if args.get('cursor'):
+            query = query.where(keyset_condition(order, decode_api_cursor(args['cursor'], order), resource['descending']))
+        query = query.order_by(*(column.desc() if resource['descending'] else column for column in order))
+
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        response = api_json_response({
+            'data': [dict(zip(field_names, row[:len(field_names)])) for row in rows],
+            'next_cursor': encode_api_cursor(rows[-1][len(field_names):]) if has_more else None,
+        })
+
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@main_bp.route('/api/v1')
+@api_login_required
+def api_index():
+    """Список ресурсов API и их полей"""
+    return api_json_response({
+        name: {
+            'url': url_for('main.api_resource', resource_name=name),
+            'fields': list(resource['fields']),
+            'filters': list(resource['filters']),
+        }
+        for name, resource in API_RESOURCES.items()
+    })
+
+@main_bp.route('/api/v1/<resource_name>')
+@api_login_required
+def api_resource(resource_name):
+    if resource_name not in API_RESOURCES:
+        return api_json_response({'error': 'Unknown resource'}, 404)
+    try:
+        return api_list(resource_name)
+    except ApiError as e:
+        return api_json_response({'error': str(e)}, 400)
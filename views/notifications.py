@@ -0,0 +1,99 @@
+"""Уведомления: входящие, генерация по журналу и проведение арендных платежей"""
+
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+from datetime import datetime
+
+from models import db, EventJournal, Notification
+from services import (
+    check_and_create_notifications, notify_new_rental_events, set_notification_read,
+    update_cashflow_from_event, update_monthly_stats,
+)
+
+notifications_bp = Blueprint('notifications', __name__)
+
+@notifications_bp.route('/notifications')
+@login_required
+def notifications():
+    """Страница входящих уведомлений (только чтение, генерация - в check_and_create_notifications)"""
+    # Получаем все уведомления, отсортированные: непроведенные вверху, проведенные внизу
+    notifications_list = Notification.query.order_by(
+        Notification.is_processed.asc(),  # Сначала непроведенные (False)
+        Notification.created_at.desc()    # Затем по дате создания
+    ).all()
+    
+    return render_template('notifications.html', notifications=notifications_list)
+
+@notifications_bp.route('/notifications/refresh', methods=['POST'])
+@login_required
+def refresh_notifications():
+    """Запускает генерацию уведомлений по новым событиям по запросу пользователя"""
+    created = check_and_create_notifications()
+    flash(f'Нових повідомлень: {created}', 'success' if created else 'info')
+    return redirect(url_for('notifications.notifications'))
+
+@notifications_bp.route('/notifications/mark_read/<int:notification_id>', methods=['POST'])
+@login_required
+def mark_notification_read(notification_id):
+    """Отмечает уведомление как прочитанное"""
+    notification = Notification.query.get_or_404(notification_id)
+    set_notification_read(notification.id)
+    db.session.commit()
+    return redirect(url_for('notifications.notifications'))
+
+@notifications_bp.route('/notifications/process_payment/<int:notification_id>', methods=['POST'])
+@login_required
+def process_payment_notification(notification_id):
+    """Обрабатывает уведомление о платеже - создает событие и обновляет кешфлоу"""
+    notification = Notification.query.get_or_404(notification_id)
+    
+    if notification.type == 'rental_payment' and notification.vehicle and notification.contractor:
+        # Все изменения - одна транзакция; уведомление "захватываем" условным UPDATE,
+        # чтобы повторный или параллельный клик не провел платеж дважды
+        try:
+            claimed = db.session.execute(
+                db.update(Notification)
+                .where(Notification.id == notification.id, Notification.is_processed == False)
+                .values(is_processed=True)
+                .execution_options(synchronize_session='fetch')
+            ).rowcount
+            if not claimed:
+                db.session.rollback()
+                flash('Платіж уже проведено', 'info')
+                return redirect(url_for('notifications.notifications'))
+
+            # Создаем событие о получении арендного платежа
+            event = EventJournal(
+                date=datetime.now(),
+                event_type='надходження',
+                subtype='ОРЕНДА',
+                vehicle_id=notification.vehicle.id,
+                contractor_id=notification.contractor.id,
+                amount=notification.amount,
+                description=f'Орендний платіж від {notification.contractor.name}',
+                created_by=current_user.id
+            )
+            db.session.add(event)
+            update_monthly_stats(event.date, event.event_type, event.amount)
+
+            # Обновляем денежный поток
+            update_cashflow_from_event(
+                event.date,
+                event.event_type,
+                event.subtype,
+                event.amount
+            )
+
+            # Уведомление о следующем платеже по этому событию создаст генератор после COMMIT
+
+            # Отмечаем текущее уведомление как прочитанное
+            set_notification_read(notification.id)
+
+            db.session.commit()
+            notify_new_rental_events()
+            flash('Платіж проведено успішно!', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Помилка при проведенні платежу: {str(e)}', 'error')
+    
+    return redirect(url_for('notifications.notifications'))
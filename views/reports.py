@@ -0,0 +1,127 @@
+"""Документы: PDF-отчеты (из кеша или фоновой задачей) и выгрузки CSV / XLSX"""
+
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify, send_file, stream_with_context
+from flask_login import login_required, current_user
+from datetime import datetime
+import os
+
+from models import db, ReportJob
+from reporting import (
+    REPORTS, fail_stale_report_jobs, get_cached_report, report_cache_key, report_download,
+    report_job_status, submit_report_job,
+)
+from instrumentation import observe_report
+from exports import EXPORTS, stream_csv, stream_xlsx
+
+reports_bp = Blueprint('reports', __name__)
+
+# Сколько последних отчетов показывать в истории документов
+REPORT_HISTORY_LIMIT = 20
+
+@reports_bp.route('/documents')
+@login_required
+def documents():
+    report_jobs = ReportJob.query.filter_by(created_by=current_user.id).order_by(
+        ReportJob.created_at.desc()
+    ).limit(REPORT_HISTORY_LIMIT).all()
+    # Большой отчет готов zip-архивом из нескольких PDF - в истории показывается его имя
+    download_names = {
+        job.id: report_download(job.report_type, job.file_path)[0]
+        for job in report_jobs
+        if job.status == 'done' and job.file_path and os.path.exists(job.file_path)
+    }
+    return render_template('documents.html', report_jobs=report_jobs, download_names=download_names)
+
+@reports_bp.route('/reports/<report_type>', methods=['POST'])
+@login_required
+def create_report_job(report_type):
+    """Ставит генерацию отчета в очередь пула процессов"""
+    if report_type not in REPORTS:
+        return jsonify({'error': 'Unknown report type'}), 404
+
+    job = submit_report_job(report_type, current_user.id)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(report_job_status(job)), 202
+    flash('Звіт поставлено в чергу, він з\'явиться в історії документів', 'success')
+    return redirect(url_for('reports.documents'))
+
+@reports_bp.route('/reports/jobs/<int:job_id>')
+@login_required
+def report_job(job_id):
+    """Статус и прогресс задачи генерации отчета"""
+    job = ReportJob.query.get_or_404(job_id)
+    if job.created_by != current_user.id and current_user.role != 'admin':
+        return jsonify({'error': 'Forbidden'}), 403
+    if job.status in ('queued', 'running') and fail_stale_report_jobs():
+        # Страница документов опрашивает статус - зависшая задача не должна опрашиваться бесконечно
+        db.session.refresh(job)
+    return jsonify(report_job_status(job))
+
+@reports_bp.route('/reports/jobs/<int:job_id>/download')
+@login_required
+def download_report_job(job_id):
+    """Отдает готовый отчет задачи (PDF или zip из нескольких PDF)"""
+    job = ReportJob.query.get_or_404(job_id)
+    if job.created_by != current_user.id and current_user.role != 'admin':
+        return jsonify({'error': 'Forbidden'}), 403
+    if job.status != 'done' or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({'error': 'Report is not ready'}), 409
+    download_name, mimetype = report_download(job.report_type, job.file_path)
+    return send_file(job.file_path, as_attachment=True, download_name=download_name, mimetype=mimetype)
+
+@reports_bp.route('/generate_report/<report_type>')
+@login_required
+def generate_report(report_type):
+    """
+    Отдает готовый отчет из кеша (или 304 по ETag). Если данные менялись, отчет
+    в веб-воркере не верстается: ставится задача в пул (или берется уже поставленная)
+    и возвращается 202 со ссылкой на ее статус.
+    """
+    if report_type not in REPORTS:
+        return redirect(url_for('reports.documents'))
+
+    key = report_cache_key(report_type)
+    path = get_cached_report(report_type, key)
+    if path is None:
+        job = ReportJob.query.filter(
+            ReportJob.created_by == current_user.id,
+            ReportJob.report_type == report_type,
+            ReportJob.status.in_(['queued', 'running'])
+        ).order_by(ReportJob.id.desc()).first()
+        if job is None:
+            job = submit_report_job(report_type, current_user.id)
+        status_url = url_for('reports.report_job', job_id=job.id)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(report_job_status(job)), 202, {'Location': status_url}
+        flash('Звіт формується, він з\'явиться в історії документів', 'success')
+        return redirect(url_for('reports.documents'), 303)
+
+    observe_report(report_type, 'sync', None, path)
+    download_name, mimetype = report_download(report_type, path)
+    response = send_file(path, as_attachment=True, download_name=download_name,
+                         mimetype=mimetype, etag=key, conditional=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@reports_bp.route('/export/<dataset>.<file_format>')
+@login_required
+def export_data(dataset, file_format):
+    if dataset not in EXPORTS or file_format not in ('csv', 'xlsx'):
+        return jsonify({'error': 'Unknown export'}), 404
+
+    header, query = EXPORTS[dataset]
+    download_name = f"{dataset}_{datetime.now().strftime('%Y%m%d')}.{file_format}"
+
+    if file_format == 'csv':
+        return Response(
+            stream_with_context(stream_csv(header, query)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={download_name}'}
+        )
+
+    return Response(
+        stream_with_context(stream_xlsx(dataset, header, query)),
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        headers={'Content-Disposition': f'attachment; filename={download_name}'}
+    )
@@ -0,0 +1,260 @@
+"""Транспортные средства: список, добавление, массовый импорт и фото"""
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask_login import login_required
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+import os
+import io
+import hashlib
+
+from models import db, Vehicle, EventJournal
+from services import events_summary_by, import_vehicles, read_import_rows
+
+vehicles_bp = Blueprint('vehicles', __name__)
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+# Варианты фото ТС: размер -> наибольшая сторона в пикселях
+PHOTO_SIZES = {
+    'thumb': 320,
+    'card': 640,
+    'large': 1280,
+    'full': 2048,
+}
+PHOTO_JPEG_QUALITY = 85
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+@vehicles_bp.route('/vehicles')
+@login_required
+def vehicles():
+    vehicles = Vehicle.query.all()
+    event_counts, latest_events = events_summary_by(EventJournal.vehicle_id, [vehicle.id for vehicle in vehicles])
+    return render_template('vehicles.html',
+                         vehicles=vehicles,
+                         event_counts=event_counts,
+                         latest_events=latest_events)
+
+# Префикс фото, уже обработанных при загрузке (остальные - исходники старых загрузок)
+PROCESSED_PHOTO_PREFIX = 'photo_'
+
+class PhotoDecodeError(Exception):
+    """Файл поврежден или не является изображением"""
+
+def decode_photo(source, draft_size=None):
+    """
+    Открывает изображение и кодирует его в JPEG не больше draft_size/max_size.
+    Pillow импортируется здесь, а не при старте: он нужен только при работе с фото.
+    """
+    from PIL import Image
+    try:
+        with Image.open(source) as image:
+            if draft_size:
+                # Для JPEG декодируем сразу в уменьшенном масштабе - быстрее и меньше памяти
+                image.draft('RGB', (draft_size, draft_size))
+            image.load()
+            return encode_photo(image, draft_size or PHOTO_SIZES['full'])
+    except (OSError, Image.DecompressionBombError) as e:
+        # OSError: не изображение (UnidentifiedImageError) или обрезанный/поврежденный файл
+        raise PhotoDecodeError(str(e)) from e
+
+def encode_photo(image, max_size):
+    """
+    Уменьшает изображение до max_size по большей стороне и кодирует в JPEG.
+    Поворот из EXIF применяется к пикселям, сами EXIF (GPS, модель камеры) не сохраняются.
+    """
+    from PIL import Image, ImageOps
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=PHOTO_JPEG_QUALITY, optimize=True, progressive=True,
+               icc_profile=image.info.get('icc_profile'))
+    return output.getvalue()
+
+def write_file_atomic(path, data):
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as output:
+        output.write(data)
+    os.replace(temp_path, path)
+
+def save_vehicle_photo(upload, vehicle_id):
+    """
+    Сохраняет загруженное фото в размере full без EXIF и сразу готовит остальные варианты.
+    Имя файла содержит хеш содержимого - по нему строятся ETag и адрес с долгим кешированием.
+    """
+    data = decode_photo(upload)
+    filename = f"{PROCESSED_PHOTO_PREFIX}{vehicle_id}_{hashlib.sha256(data).hexdigest()[:16]}.jpg"
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    write_file_atomic(os.path.join(current_app.config['UPLOAD_FOLDER'], filename), data)
+    for size in PHOTO_SIZES:
+        photo_variant_path(filename, size)
+    return filename
+
+def delete_vehicle_photo(filename):
+    """Удаляет фото и его варианты - когда запись ТС с этим фото не сохранилась"""
+    folder = current_app.config['UPLOAD_FOLDER']
+    stem = os.path.splitext(filename)[0]
+    paths = [os.path.join(folder, filename)]
+    paths += [os.path.join(folder, 'variants', f'{stem}_{size}.jpg') for size in PHOTO_SIZES]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def photo_version(filename):
+    """Короткая версия фото для адреса и ETag: меняется вместе с файлом"""
+    return hashlib.sha256(filename.encode()).hexdigest()[:12]
+
+def photo_variant_path(filename, size):
+    """
+    Путь к варианту фото нужного размера; вариант создается при первом обращении и
+    дальше берется с диска. Для full обработанного фото это сам сохраненный файл.
+    """
+    original_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    if size == 'full' and filename.startswith(PROCESSED_PHOTO_PREFIX):
+        return original_path
+
+    variants_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'variants')
+    variant_path = os.path.join(variants_folder, f'{os.path.splitext(filename)[0]}_{size}.jpg')
+    if not os.path.exists(variant_path):
+        os.makedirs(variants_folder, exist_ok=True)
+        data = decode_photo(original_path, PHOTO_SIZES[size])
+        write_file_atomic(variant_path, data)
+    return variant_path
+
+def vehicle_photo_url(vehicle, size='card'):
+    """Адрес варианта фото с версией - такой адрес браузер может кешировать надолго"""
+    return url_for('vehicles.vehicle_photo', vehicle_id=vehicle.id, size=size, v=photo_version(vehicle.photo_filename))
+
+
+@vehicles_bp.route('/vehicles/add', methods=['GET', 'POST'])
+@login_required
+def add_vehicle():
+    if request.method == 'POST':
+        # Проверяем одним запросом, не существует ли уже автомобиль с таким номером, позывным или VIN-кодом
+        existing = db.session.query(Vehicle.license_plate, Vehicle.call_sign, Vehicle.vin_code).filter(or_(
+            Vehicle.license_plate == request.form['license_plate'],
+            Vehicle.call_sign == request.form['call_sign'],
+            Vehicle.vin_code == request.form['vin_code']
+        )).all()
+
+        if any(row.license_plate == request.form['license_plate'] for row in existing):
+            flash(f'Автомобіль з номером {request.form["license_plate"]} вже існує!', 'error')
+            return render_template('add_vehicle.html')
+        
+        if any(row.call_sign == request.form['call_sign'] for row in existing):
+            flash(f'Автомобіль з позивним {request.form["call_sign"]} вже існує!', 'error')
+            return render_template('add_vehicle.html')
+        
+        if any(row.vin_code == request.form['vin_code'] for row in existing):
+            flash(f'Автомобіль з VIN-кодом {request.form["vin_code"]} вже існує!', 'error')
+            return render_template('add_vehicle.html')
+        
+        # Файлы фото пишутся до COMMIT: если запись не сохранится, их нужно удалить
+        photo_filename = None
+        try:
+            vehicle = Vehicle(
+                brand=request.form['brand'],
+                model=request.form['model'],
+                year=int(request.form['year']),
+                engine_volume=float(request.form['engine_volume']) if request.form['engine_volume'] else None,
+                vin_code=request.form['vin_code'],
+                license_plate=request.form['license_plate'],
+                call_sign=request.form['call_sign'],
+                mileage=int(request.form['mileage']) if request.form['mileage'] else 0,
+                cost=float(request.form['cost']) if request.form['cost'] else 0
+            )
+            db.session.add(vehicle)
+            db.session.flush()  # Получаем ID автомобиля
+            
+            # Обрабатываем загруженное фото
+            if 'photo' in request.files and request.files['photo'].filename:
+                photo = request.files['photo']
+                if photo and allowed_file(photo.filename):
+                    try:
+                        photo_filename = save_vehicle_photo(photo.stream, vehicle.id)
+                        vehicle.photo_filename = photo_filename
+                    except PhotoDecodeError:
+                        db.session.rollback()
+                        flash('Не вдалося обробити фото: файл пошкоджений або не є зображенням', 'error')
+                        return render_template('add_vehicle.html')
+            
+            db.session.commit()
+            flash('Транспортний засіб додано', 'success')
+            return redirect(url_for('vehicles.vehicles'))
+        except IntegrityError:
+            # Тот же номер успел добавить параллельный запрос - уникальный индекс не пропустил
+            db.session.rollback()
+            if photo_filename:
+                delete_vehicle_photo(photo_filename)
+            flash('Автомобіль з таким номером, позивним або VIN-кодом вже існує!', 'error')
+            return render_template('add_vehicle.html')
+        except Exception as e:
+            db.session.rollback()
+            if photo_filename:
+                delete_vehicle_photo(photo_filename)
+            flash(f'Помилка при додаванні автомобіля: {str(e)}', 'error')
+            return render_template('add_vehicle.html')
+    
+    return render_template('add_vehicle.html')
+
+@vehicles_bp.route('/vehicles/import', methods=['POST'])
+@login_required
+def import_vehicles_route():
+    file = request.files.get('file')
+    if not file or not file.filename.lower().endswith(('.csv', '.xlsx')):
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'CSV or XLSX file required'}), 400
+        flash('Виберіть файл CSV або XLSX', 'error')
+        return redirect(url_for('vehicles.vehicles'))
+
+    imported, errors = import_vehicles(read_import_rows(file.stream, file.filename))
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'imported': imported, 'errors': errors})
+    flash(f'Додано ТЗ: {imported}', 'success' if imported else 'warning')
+    if errors:
+        more = f' (і ще {len(errors) - 10})' if len(errors) > 10 else ''
+        flash('Рядки з помилками: ' + '; '.join(errors[:10]) + more, 'error')
+    return redirect(url_for('vehicles.vehicles'))
+
+@vehicles_bp.route('/vehicles/photo/<int:vehicle_id>')
+@login_required
+def vehicle_photo(vehicle_id):
+    """
+    Отдает вариант фото автомобиля (?size=thumb|card|large|full).
+    Адрес с актуальной версией (?v=) кешируется браузером на год, без версии - проверяется по ETag.
+    """
+    size = request.args.get('size', 'large')
+    if size not in PHOTO_SIZES:
+        return '', 404
+    filename = db.session.query(Vehicle.photo_filename).filter_by(id=vehicle_id).scalar()
+    if not filename or not os.path.exists(os.path.join(current_app.config['UPLOAD_FOLDER'], filename)):
+        return '', 404
+
+    version = photo_version(filename)
+    try:
+        path = photo_variant_path(filename, size)
+    except PhotoDecodeError:
+        return '', 404
+
+    response = send_file(os.path.abspath(path), mimetype='image/jpeg', etag=f'{version}-{size}', conditional=True)
+    response.cache_control.private = True
+    if request.args.get('v') == version:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = 365 * 24 * 3600
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response